@@ -0,0 +1,86 @@
+"""Process-wide account index by IBAN and account number"""
+import threading
+
+INDEX_OPENED = 'opened'
+INDEX_CLOSED = 'closed'
+
+
+def _iban_key(iban):
+    return iban.replace(' ', '').upper()
+
+
+class AccountIndex:
+    """Open accounts by IBAN and by account number.
+
+    Kept up to date when accounts are opened or closed, so lookups are a
+    dict access however many accounts there are. Listeners registered with
+    subscribe() are called as listener(event, account) after every change,
+    with event INDEX_OPENED or INDEX_CLOSED.
+    """
+
+    def __init__(self, accounts=()):
+        self._by_iban = {}
+        self._by_number = {}
+        self._listeners = []
+        self._highest_number = 0
+        self._lock = threading.Lock()
+        for account in accounts:
+            self.add(account)
+
+    def __len__(self):
+        return len(self._by_iban)
+
+    def __iter__(self):
+        return iter(list(self._by_iban.values()))
+
+    def subscribe(self, listener):
+        self._listeners.append(listener)
+
+    def _notify(self, event, account):
+        for listener in self._listeners:
+            listener(event, account)
+
+    def add(self, account):
+        """Index an opened account; raises ValueError when its IBAN or number is taken"""
+        iban = _iban_key(account["IBAN"])
+        number = account.get("accountNumber")
+        with self._lock:
+            if iban in self._by_iban or (number and number in self._by_number):
+                raise ValueError(f"Account already exists: {number or iban}")
+            self._by_iban[iban] = account
+            if number:
+                self._by_number[number] = account
+                if number.isdigit():
+                    self._highest_number = max(self._highest_number, int(number))
+        self._notify(INDEX_OPENED, account)
+        return account
+
+    def close(self, key):
+        """Remove an account (by number or IBAN) from the index; returns it, or None"""
+        with self._lock:
+            account = self._by_number.get(key) or self._by_iban.get(_iban_key(key))
+            if account is None:
+                return None
+            del self._by_iban[_iban_key(account["IBAN"])]
+            if account.get("accountNumber"):
+                del self._by_number[account["accountNumber"]]
+        self._notify(INDEX_CLOSED, account)
+        return account
+
+    def by_iban(self, iban):
+        return self._by_iban.get(_iban_key(iban))
+
+    def by_number(self, account_number):
+        return self._by_number.get(account_number)
+
+    def get(self, key):
+        """Account by account number or IBAN, or None"""
+        if not key:
+            return None
+        return self._by_number.get(key) or self._by_iban.get(_iban_key(key))
+
+    def allocate_account_number(self):
+        """A new account number, one above the highest ever indexed"""
+        with self._lock:
+            self._highest_number += 1
+            return str(self._highest_number)
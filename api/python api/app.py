@@ -1,10 +1,20 @@
-from flask import Flask, jsonify, request
+from flask import Flask, jsonify, request, Response
 from flask_cors import CORS
+from werkzeug.http import is_resource_modified
 from datetime import datetime, date
 import uuid
 import random
 import yaml
 import os
+import tempfile
+from ledger import create_seeded_ledger
+from iban import InvalidIBANError, validate_iban
+from accounts import AccountIndex
+from autocomplete import PrefixIndex, search_query, word_keys
+from documents import DocumentCache, DocumentTemplate
+from pdf import PdfStore, pdf_digest
+from overviews import AnnualOverviewStore
+from credentials import CredentialStore, CredentialsBusyError
 
 app = Flask(__name__)
 CORS(app)
@@ -46,7 +56,7 @@ def get_customer_id():
 # Helper function to create mock account number (in real app, this would come from request)
 def get_account_number():
     """Get account number from request or use default for development"""
-    return request.args.get('accountNumber', 'NL24DHBN2018470578')
+    return request.args.get('accountNumber', 'NL44DHBN2018470578')
 
 # Global storage for messages (in a real app, this would be a database)
 messages_store = [
@@ -94,6 +104,52 @@ messages_store = [
     }
 ]
 
+# Transaction ledger backing statement totals
+account_ledger = create_seeded_ledger()
+
+# Account holder details by IBAN, built once; AAAAA is the settings page demo value
+iban_accounts = AccountIndex([
+    {
+        "IBAN": "AAAAA",
+        "accountNumber": "103098",
+        "detail": {
+            "holder_name": "John Smith",
+            "institution_name": "DHB BANK N.V.",
+            "bic": "DHBNNL2R",
+            "customer_number": "103098",
+            "support_reg_number": "301278947",
+            "support_packages": "Premium Support",
+            "email": "john.smith@example.com"
+        }
+    },
+    {
+        "IBAN": "NL44DHBN2018470578",
+        "accountNumber": "2018470578",
+        "detail": {
+            "holder_name": "Lucy Lavender",
+            "institution_name": "DHB BANK N.V.",
+            "bic": "DHBNNL2R",
+            "customer_number": "103099",
+            "support_reg_number": "301278948",
+            "support_packages": "Standard Support",
+            "email": "lucy.lavender@example.com"
+        }
+    },
+    {
+        "IBAN": "NL17DHBN2018470579",
+        "accountNumber": "2018470579",
+        "detail": {
+            "holder_name": "Lucy Lavender",
+            "institution_name": "DHB BANK N.V.",
+            "bic": "DHBNNL2R",
+            "customer_number": "103100",
+            "support_reg_number": "301278949",
+            "support_packages": "Premium Support",
+            "email": "lucy.lavender@example.com"
+        }
+    }
+])
+
 # Mock data for DHB banking accounts
 def generate_mock_data():
     return {
@@ -104,7 +160,7 @@ def generate_mock_data():
                 "type": "savings",
                 "balance": 10566.55,
                 "currency": "EUR",
-                "iban": "NL24DHBN2018470578",
+                "iban": "NL44DHBN2018470578",
                 "interest_rate": 1.1,
                 "holder_name": "Lucy Lavender"
             },
@@ -114,7 +170,7 @@ def generate_mock_data():
                 "type": "savings",
                 "balance": 31960.23,
                 "currency": "EUR",
-                "iban": "NL24DHBN2018470579",
+                "iban": "NL17DHBN2018470579",
                 "interest_rate": 1.1,
                 "holder_name": "Lucy Lavender"
             }
@@ -126,7 +182,7 @@ def generate_mock_data():
                 "type": "savings",
                 "balance": 12500.00,
                 "currency": "EUR",
-                "iban": "NL24DHBN2018470581",
+                "iban": "NL60DHBN2018470581",
                 "interest_rate": 1.1,
                 "holder_name": "Lucy Lavender"
             },
@@ -136,7 +192,7 @@ def generate_mock_data():
                 "type": "savings",
                 "balance": 18750.00,
                 "currency": "EUR",
-                "iban": "NL24DHBN2018470582",
+                "iban": "NL33DHBN2018470582",
                 "interest_rate": 1.1,
                 "holder_name": "Lucy Lavender"
             }
@@ -151,7 +207,7 @@ def generate_mock_data():
             "main_account": {
                 "name": "DHB Account",
                 "balance": "€ 15.750,00",
-                "iban": "NL24DHBN2018470578",
+                "iban": "NL44DHBN2018470578",
                 "interest_rate": "1.1%",
                 "holder_name": "A DERWISH"
             },
@@ -222,7 +278,7 @@ def generate_mock_data():
                 "type": "savings",
                 "balance": 22300.00,
                 "currency": "EUR",
-                "iban": "NL24DHBN2018470583",
+                "iban": "NL06DHBN2018470583",
                 "interest_rate": 1.1,
                 "holder_name": "Lucy Lavender"
             },
@@ -232,7 +288,7 @@ def generate_mock_data():
                 "type": "savings",
                 "balance": 15600.00,
                 "currency": "EUR",
-                "iban": "NL24DHBN2018470584",
+                "iban": "NL76DHBN2018470584",
                 "interest_rate": 1.1,
                 "holder_name": "Lucy Lavender"
             },
@@ -242,7 +298,7 @@ def generate_mock_data():
                 "type": "savings",
                 "balance": 19800.00,
                 "currency": "EUR",
-                "iban": "NL24DHBN2018470585",
+                "iban": "NL49DHBN2018470585",
                 "interest_rate": 1.1,
                 "holder_name": "Lucy Lavender"
             },
@@ -252,7 +308,7 @@ def generate_mock_data():
                 "type": "savings",
                 "balance": 14200.00,
                 "currency": "EUR",
-                "iban": "NL24DHBN2018470586",
+                "iban": "NL22DHBN2018470586",
                 "interest_rate": 1.1,
                 "holder_name": "Lucy Lavender"
             },
@@ -262,7 +318,7 @@ def generate_mock_data():
                 "type": "savings",
                 "balance": 16800.00,
                 "currency": "EUR",
-                "iban": "NL24DHBN2018470587",
+                "iban": "NL92DHBN2018470587",
                 "interest_rate": 1.1,
                 "holder_name": "Lucy Lavender"
             },
@@ -272,7 +328,7 @@ def generate_mock_data():
                 "type": "savings",
                 "balance": 13400.00,
                 "currency": "EUR",
-                "iban": "NL24DHBN2018470588",
+                "iban": "NL65DHBN2018470588",
                 "interest_rate": 1.1,
                 "holder_name": "Lucy Lavender"
             },
@@ -282,7 +338,7 @@ def generate_mock_data():
                 "type": "savings",
                 "balance": 19200.00,
                 "currency": "EUR",
-                "iban": "NL24DHBN2018470589",
+                "iban": "NL38DHBN2018470589",
                 "interest_rate": 1.1,
                 "holder_name": "Lucy Lavender"
             },
@@ -292,7 +348,7 @@ def generate_mock_data():
                 "type": "savings",
                 "balance": 17500.00,
                 "currency": "EUR",
-                "iban": "NL24DHBN2018470590",
+                "iban": "NL11DHBN2018470590",
                 "interest_rate": 1.1,
                 "holder_name": "Lucy Lavender"
             }
@@ -339,7 +395,7 @@ def generate_mock_data():
             "main_account": {
                 "name": "DHB SaveOnline",
                 "balance": "€ 12.012,00",
-                "iban": "NL24DHBN2018470578",
+                "iban": "NL44DHBN2018470578",
                 "interest_rate": "1.1%",
                 "holder_name": "Lucy Lavender"
             },
@@ -425,7 +481,7 @@ def get_accounts():
                 {
                     "customerName": "Lucy Lavender",
                     "accountName": "DHB SaveOnline",
-                    "IBAN": "NL24DHBN2018470578",
+                    "IBAN": "NL44DHBN2018470578",
                     "accountNumber": "2018470578",
                     "accountNumberLabel": "SaveOnline Account",
                     "BIC": "DHBNNL2R",
@@ -470,7 +526,7 @@ def get_accounts():
                 {
                     "customerName": "Lucy Lavender",
                     "accountName": "DHB MaxiSpaar",
-                    "IBAN": "NL24DHBN2018470579",
+                    "IBAN": "NL17DHBN2018470579",
                     "accountNumber": "2018470579",
                     "accountNumberLabel": "MaxiSpaar Account",
                     "BIC": "DHBNNL2R",
@@ -546,8 +602,23 @@ def get_combispaar_account_options():
         "timestamp": datetime.now().isoformat()
     })
 
+# Type-ahead over the combispaar IBAN options by IBAN, holder and account type
+iban_option_search = PrefixIndex()
+for option in generate_mock_data()["combispaar_page_data"]["iban_options"]:
+    iban_option_search.add(option["iban"], option, [
+        option["iban"], *word_keys(option["accountHolder"]), *word_keys(option["accountType"])
+    ])
+
 @app.route('/api/combispaar/iban-options', methods=['GET'])
 def get_combispaar_iban_options():
+    search = request.args.get('search')
+    if search:
+        limit = min(max(request.args.get('limit', 10, type=int), 1), 50)
+        return jsonify({
+            "success": True,
+            "data": iban_option_search.search(search_query(search), limit),
+            "timestamp": datetime.now().isoformat()
+        })
     data = generate_mock_data()
     return jsonify({
         "success": True,
@@ -790,43 +861,24 @@ def get_account_by_iban():
     """Get account by IBAN - maps to /accounts/utilities/customerMatchByAccount/{customerId}/{accountNumber}"""
     customer_id = get_customer_id()
     headers = get_required_headers()
-    iban = request.args.get('iban', '').upper()
+    iban = request.args.get('iban', '').replace(' ', '').upper()
     
-    # Mock account data for different IBANs
-    mock_accounts = {
-        "AAAAA": {
-            "holder_name": "John Smith",
-            "institution_name": "DHB BANK N.V.",
-            "bic": "DHBNNL2R",
-            "customer_number": "103098",
-            "support_reg_number": "301278947",
-            "support_packages": "Premium Support",
-            "email": "john.smith@example.com"
-        },
-        "NL24DHBN2018470578": {
-            "holder_name": "Lucy Lavender",
-            "institution_name": "DHB BANK N.V.",
-            "bic": "DHBNNL2R",
-            "customer_number": "103099",
-            "support_reg_number": "301278948",
-            "support_packages": "Standard Support",
-            "email": "lucy.lavender@example.com"
-        },
-        "NL24DHBN2018470579": {
-            "holder_name": "Lucy Lavender",
-            "institution_name": "DHB BANK N.V.",
-            "bic": "DHBNNL2R",
-            "customer_number": "103100",
-            "support_reg_number": "301278949",
-            "support_packages": "Premium Support",
-            "email": "lucy.lavender@example.com"
-        }
-    }
+    # Reject malformed IBANs before the lookup; AAAAA is the settings page demo value
+    if iban != "AAAAA":
+        try:
+            iban = validate_iban(iban)
+        except InvalidIBANError as e:
+            return jsonify({
+                "success": False,
+                "error": f"Invalid IBAN: {e}",
+                "timestamp": datetime.now().isoformat()
+            }), 400
     
-    if iban in mock_accounts:
+    account = iban_accounts.by_iban(iban)
+    if account is not None:
         return jsonify({
             "success": True,
-            "data": mock_accounts[iban],
+            "data": account["detail"],
             "timestamp": datetime.now().isoformat()
         })
     else:
@@ -836,18 +888,12 @@ def get_account_by_iban():
             "timestamp": datetime.now().isoformat()
         }), 404
 
-@app.route('/api/documents/download', methods=['GET'])
-def download_document():
-    document_type = request.args.get('type', '')
-    
-    # Document content templates
-    document_templates = {
-        'terms-conditions': {
-            'filename': 'Terms_and_Conditions.pdf',
-            'content': f"""DHB BANK N.V.
+# Download documents, compiled once; only the requested one is rendered
+DOWNLOAD_TEMPLATES = {
+    'terms-conditions': DocumentTemplate('Terms_and_Conditions.pdf', """DHB BANK N.V.
 Terms & Conditions
 
-Generated on: {datetime.now().strftime('%d %B %Y')}
+Generated on: {generated_on}
 
 1. GENERAL TERMS
 These terms and conditions govern the use of DHB BANK N.V. services.
@@ -873,14 +919,11 @@ These terms and conditions govern the use of DHB BANK N.V. services.
 - Dispute resolution procedures
 
 For questions, contact: support@dhbbank.com
-"""
-        },
-        'depositor-template': {
-            'filename': 'Depositor_Information_Template.pdf',
-            'content': f"""DHB BANK N.V.
+"""),
+    'depositor-template': DocumentTemplate('Depositor_Information_Template.pdf', """DHB BANK N.V.
 Depositor Information Template
 
-Generated on: {datetime.now().strftime('%d %B %Y')}
+Generated on: {generated_on}
 
 DEPOSITOR DETAILS
 Name: [Depositor Name]
@@ -910,75 +953,46 @@ COMPLIANCE NOTES
 - Reporting requirements apply
 
 Contact: compliance@dhbbank.com
-"""
-        },
-        'financial-overview': {
-            'filename': 'Financial_Annual_Overview.pdf',
-            'content': f"""DHB BANK N.V.
+"""),
+    'financial-overview': DocumentTemplate('Financial_Annual_Overview.pdf', """DHB BANK N.V.
 Financial Annual Overview
 
-Generated on: {datetime.now().strftime('%d %B %Y')}
+Generated on: {generated_on}
 
 ANNUAL SUMMARY
-Fiscal Year: 2024
-Report Period: January 1 - December 31, 2024
-
-FINANCIAL HIGHLIGHTS
-Total Assets: €2,450,000,000
-Total Liabilities: €2,180,000,000
-Net Income: €45,000,000
-Return on Assets: 1.84%
-Capital Adequacy Ratio: 15.2%
-
-DEPOSIT ANALYSIS
-Total Deposits: €1,850,000,000
-Savings Accounts: €1,200,000,000
-Current Accounts: €650,000,000
-Average Interest Rate: 1.1%
-
-LOAN PORTFOLIO
-Total Loans: €1,200,000,000
-Mortgage Loans: €800,000,000
-Business Loans: €400,000,000
-Loan Loss Provision: €12,000,000
-
-OPERATIONAL METRICS
-Number of Customers: 125,000
-Number of Branches: 45
-Digital Transactions: 85%
-Customer Satisfaction: 4.6/5.0
-
-REGULATORY COMPLIANCE
-- Basel III compliance maintained
-- ECB requirements met
-- Local regulatory standards exceeded
-
+Customer: {customer_id}
+Fiscal Year: {fiscal_year}
+Report Period: January 1 - December 31, {fiscal_year}
+
+ACCOUNTS
+{overview_accounts}
+TOTALS
+{overview_totals}
+TAX STATEMENT (BOX 3)
+{overview_tax}
 For detailed financial statements, visit: www.dhbbank.com/financials
-"""
-        },
-        'account-statements': {
-            'filename': 'Account_Statements.pdf',
-            'content': f"""DHB BANK N.V.
+"""),
+    'account-statements': DocumentTemplate('Account_Statements.pdf', """DHB BANK N.V.
 Account Statements
 
-Generated on: {datetime.now().strftime('%d %B %Y')}
+Generated on: {generated_on}
 
 ACCOUNT HOLDER: Lucy Lavender
-ACCOUNT NUMBER: NL24DHBN2018470578
-STATEMENT PERIOD: {datetime.now().strftime('%B %Y')}
+ACCOUNT NUMBER: NL44DHBN2018470578
+STATEMENT PERIOD: {statement_period}
 
-OPENING BALANCE: €10,566.55
-CLOSING BALANCE: €10,566.55
+OPENING BALANCE: €{openingBalance:,.2f}
+CLOSING BALANCE: €{closingBalance:,.2f}
 
 TRANSACTION SUMMARY
-Total Credits: €2,500.00
-Total Debits: €1,200.00
-Net Change: €1,300.00
+Total Credits: €{totalCredits:,.2f}
+Total Debits: €{totalDebits:,.2f}
+Net Change: €{netChange:,.2f}
 
 INTEREST EARNED
 Interest Rate: 1.1%
-Interest Earned: €116.23
-Interest Paid: €116.23
+Interest Earned: €{interestEarned:,.2f}
+Interest Paid: €{interestEarned:,.2f}
 
 ACCOUNT FEES
 Monthly Maintenance: €0.00
@@ -991,14 +1005,11 @@ IMPORTANT NOTICES
 - Contact us for any questions
 
 Contact: statements@dhbbank.com
-"""
-        },
-        'contracts': {
-            'filename': 'Your_Contracts.pdf',
-            'content': f"""DHB BANK N.V.
+"""),
+    'contracts': DocumentTemplate('Your_Contracts.pdf', """DHB BANK N.V.
 Your Contracts
 
-Generated on: {datetime.now().strftime('%d %B %Y')}
+Generated on: {generated_on}
 
 CONTRACT SUMMARY
 Customer: Lucy Lavender
@@ -1037,32 +1048,109 @@ CONTRACT TERMS
 CONTACT INFORMATION
 Legal Department: legal@dhbbank.com
 Customer Service: support@dhbbank.com
-"""
-        }
+""")
+}
+
+# Template fields filled from the ledger summary of the statement account
+STATEMENT_FIELDS = frozenset(('openingBalance', 'closingBalance', 'totalCredits', 'totalDebits',
+                              'netChange', 'interestEarned'))
+
+# Template fields filled from the customer's latest year-end overview
+OVERVIEW_FIELDS = frozenset(('fiscal_year', 'overview_accounts', 'overview_totals', 'overview_tax'))
+
+# Overviews stored by the year-end batch (overviews.py)
+annual_overviews = AnnualOverviewStore(ledger=account_ledger)
+
+# Helper function to lay out a year-end overview for the download template
+def annual_overview_context(overview):
+    """Template values for a stored annual overview"""
+    return {
+        "fiscal_year": overview["year"],
+        "overview_accounts": ''.join(
+            f"{account['accountNumber']} {account['accountName']}: 31 December {account['currencyCode']} "
+            f"{account['closingBalance']:,.2f}, interest {account['interestEarned']:,.2f}\n"
+            for account in overview["accounts"]),
+        "overview_totals": ''.join(
+            f"Balance 1 January: {totals['currencyCode']} {totals['openingBalance']:,.2f}\n"
+            f"Balance 31 December: {totals['currencyCode']} {totals['closingBalance']:,.2f}\n"
+            f"Interest Earned: {totals['currencyCode']} {totals['interestEarned']:,.2f}\n"
+            f"Transactions: {totals['transactionCount']}\n"
+            for totals in overview["totals"]),
+        "overview_tax": ''.join(
+            f"Balance on {totals['taxReferenceDate']}: {totals['currencyCode']} {totals['taxReferenceBalance']:,.2f}\n"
+            for totals in overview["totals"])
     }
-    
-    if document_type in document_templates:
-        template = document_templates[document_type]
-        
-        # Create a simple text-based PDF content (in real app, you'd use a PDF library)
-        # For now, we'll return the content as a downloadable text file
-        from flask import Response
-        
-        response = Response(
-            template['content'],
-            mimetype='text/plain',
-            headers={
-                'Content-Disposition': f'attachment; filename="{template["filename"]}"'
-            }
-        )
-        return response
-    else:
+
+# PDF files of the downloads, by content
+pdf_store = PdfStore(
+    os.environ.get('DHB_PDF_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'dhb-pdf-cache')),
+    max_workers=int(os.environ.get('DHB_PDF_WORKERS', '2')),
+    max_files=int(os.environ.get('DHB_PDF_CACHE_FILES', '512'))
+)
+
+# Rendered downloads per (document type, customer, day, statement or overview revision)
+document_cache = DocumentCache(max_entries=int(os.environ.get('DHB_DOCUMENT_CACHE_SIZE', '1024')))
+
+@app.route('/api/documents/download', methods=['GET'])
+def download_document():
+    document_type = request.args.get('type', '')
+    template = DOWNLOAD_TEMPLATES.get(document_type)
+    if template is None:
         return jsonify({
             "success": False,
             "error": "Document type not found: " + document_type,
             "timestamp": datetime.now().isoformat()
         }), 404
-
+    
+    # Statement documents change with every posting, overviews with every batch run, the others once a day
+    now = datetime.now()
+    customer_id = get_customer_id()
+    statement_account = account_ledger.get("2018470578") if template.fields & STATEMENT_FIELDS else None
+    revision = len(statement_account) if statement_account else None
+    overview = None
+    if template.fields & OVERVIEW_FIELDS:
+        # Every demo customer sees the demo accounts, as in the statement
+        account_numbers = [account["accountNumber"] for account in iban_accounts]
+        years = annual_overviews.years(customer_id, account_numbers)
+        if not years:
+            return jsonify({
+                "success": False,
+                "error": "No annual overview available yet for customer: " + customer_id,
+                "timestamp": datetime.now().isoformat()
+            }), 404
+        overview = annual_overviews.get(customer_id, years[0], account_numbers)
+        revision = annual_overviews.computed_at(years[0])
+    key = (document_type, customer_id, now.date(), revision)
+    entry = document_cache.get(key)
+    if entry is None:
+        context = {"generated_on": now.strftime('%d %B %Y'), "statement_period": now.strftime('%B %Y'),
+                   "customer_id": customer_id}
+        if statement_account is not None:
+            # Statement totals come from the ledger aggregates instead of a rescan
+            context.update(statement_account.summary())
+        if overview is not None:
+            # Figures were computed by the year-end batch; this is only a lookup
+            context.update(annual_overview_context(overview))
+        entry = document_cache.put(key, template.render(context))
+    content, _, rendered_at = entry
+    
+    headers = {
+        'Content-Disposition': f'attachment; filename="{template.filename}"',
+        'Cache-Control': 'private, no-cache'
+    }
+    # The ETag is the address of the PDF, which depends only on the rendered text
+    digest = pdf_digest(content.decode('utf-8'), template.title)
+    if not is_resource_modified(request.environ, etag=digest, last_modified=rendered_at):
+        response = Response(status=304, headers=headers)
+    else:
+        # Rendered by a worker process and streamed while it writes; repeats are file reads
+        digest, chunks, size = pdf_store.stream(content.decode('utf-8'), template.title)
+        response = Response(chunks, mimetype='application/pdf', headers=headers)
+        if size is not None:
+            response.content_length = size
+    response.set_etag(digest)
+    response.last_modified = rendered_at
+    return response
 
 # Global storage for personal details (in a real app, this would be a database)
 personal_details_store = {
@@ -1074,34 +1162,16 @@ personal_details_store = {
     "address": "Amsterdam, Netherlands"
 }
 
-# Separate storage for actual password value with file persistence
-PASSWORD_FILE = "current_password.txt"
-
-def load_current_password():
-    """Load current password from file, default to 'password123' if file doesn't exist"""
-    try:
-        if os.path.exists(PASSWORD_FILE):
-            with open(PASSWORD_FILE, 'r') as f:
-                return f.read().strip()
-        else:
-            # Create file with default password
-            with open(PASSWORD_FILE, 'w') as f:
-                f.write("password123")
-            return "password123"
-    except Exception as e:
-        print(f"Error loading password: {e}")
-        return "password123"
-
-def save_current_password(password):
-    """Save current password to file"""
-    try:
-        with open(PASSWORD_FILE, 'w') as f:
-            f.write(password)
-    except Exception as e:
-        print(f"Error saving password: {e}")
+# Customer passwords as scrypt hashes, checked on a bounded pool instead of the request threads
+credential_store = CredentialStore(
+    max_workers=int(os.environ.get('DHB_KDF_WORKERS', '2')),
+    max_pending=int(os.environ.get('DHB_KDF_QUEUE', '32')),
+    cache_ttl=int(os.environ.get('DHB_CREDENTIAL_CACHE_TTL', '60'))
+)
 
-# Initialize current password
-current_password = load_current_password()
+# The mock default becomes the demo customer's first hash; an old plaintext password file is
+# migrated instead with: python credentials.py import <customer id> [path]
+credential_store.setdefault("CUST001", "password123")
 
 @app.route('/api/personal-details', methods=['GET'])
 def get_personal_details():
@@ -1161,9 +1231,7 @@ def update_password():
         new_password = data.get('password')
         
         if new_password:
-            global current_password
-            current_password = new_password
-            save_current_password(new_password)
+            credential_store.set_password(get_customer_id(), new_password)
             personal_details_store["password"] = "••••••••••••••••"
             return jsonify({
                 "success": True,
@@ -1177,6 +1245,12 @@ def update_password():
                 "error": "Password is required",
                 "timestamp": datetime.now().isoformat()
             }), 400
+    except CredentialsBusyError:
+        return jsonify({
+            "success": False,
+            "error": "Too many password checks in progress, retry shortly",
+            "timestamp": datetime.now().isoformat()
+        }), 503
     except Exception as e:
         return jsonify({
             "success": False,
@@ -1190,7 +1264,8 @@ def validate_password():
         data = request.get_json()
         provided_password = data.get('password')
         
-        if provided_password == current_password:
+        # Repeated checks within a session are answered from the credential cache
+        if credential_store.verify(get_customer_id(), provided_password, request.headers.get('sessionId')):
             return jsonify({
                 "success": True,
                 "valid": True,
@@ -1204,6 +1279,12 @@ def validate_password():
                 "message": "Password is incorrect",
                 "timestamp": datetime.now().isoformat()
             })
+    except CredentialsBusyError:
+        return jsonify({
+            "success": False,
+            "error": "Too many password checks in progress, retry shortly",
+            "timestamp": datetime.now().isoformat()
+        }), 503
     except Exception as e:
         return jsonify({
             "success": False,
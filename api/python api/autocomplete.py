@@ -0,0 +1,126 @@
+"""Prefix search (type-ahead) over IBANs and names"""
+import heapq
+import re
+import threading
+import unicodedata
+from bisect import bisect_left, insort
+
+# Queries starting like an IBAN (typed in groups of four) are searched without spaces
+_IBAN_QUERY = re.compile(r'^[A-Za-z]{2}\d{2}[A-Za-z0-9 ]*$')
+
+_WORD_START = re.compile(r'\b\w')
+
+# Prefix slices at least this long have their ranked results memoized
+MEMO_THRESHOLD = 256
+
+
+def fold(text):
+    """Lower-case form of text without diacritics and with single spaces"""
+    text = unicodedata.normalize('NFKD', text or '')
+    return ' '.join(''.join(char for char in text if not unicodedata.combining(char)).casefold().split())
+
+
+def word_keys(text):
+    """Folded text and every suffix of it starting at a word, so "lav" finds "Lucy Lavender"
+    and "hertog" finds "'s-Hertogenbosch" """
+    text = fold(text)
+    return [text, *(text[found.start():] for found in _WORD_START.finditer(text))] if text else []
+
+
+def search_query(text):
+    """Type-ahead query text, with spaces removed when it is (the start of) an IBAN"""
+    text = (text or '').strip()
+    return text.replace(' ', '') if _IBAN_QUERY.match(text) else text
+
+
+class PrefixIndex:
+    """Items searchable by the prefixes of one or more keys each.
+
+    All (folded key, item id) pairs live in one sorted list, so the keys
+    starting with a prefix form a contiguous slice found with a bisect, and
+    adding or removing an item only touches its own keys. Results are the
+    top items of the slice by weight, ties in key order; ranking a long
+    slice (a one-letter prefix over many items) is memoized until the next
+    change. Item ids must be comparable with each other, e.g. all strings.
+    """
+
+    def __init__(self):
+        self._keys = []
+        self._items = {}
+        self._memo = {}
+        self._weighted = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, item_id):
+        return item_id in self._items
+
+    def get(self, item_id):
+        entry = self._items.get(item_id)
+        return entry[0] if entry else None
+
+    def add(self, item_id, value, keys, weight=0):
+        """Index value under keys, replacing an earlier entry for item_id"""
+        folded = tuple({key for key in map(fold, keys) if key})
+        with self._lock:
+            self._discard(item_id)
+            for key in folded:
+                insort(self._keys, (key, item_id))
+            self._items[item_id] = (value, weight, folded)
+            self._weighted += bool(weight)
+            self._memo.clear()
+
+    def add_many(self, entries):
+        """Index (item id, value, keys, weight) entries with one sort instead of an insert per key"""
+        with self._lock:
+            for item_id, value, keys, weight in entries:
+                self._discard(item_id)
+                folded = tuple({key for key in map(fold, keys) if key})
+                self._keys.extend((key, item_id) for key in folded)
+                self._items[item_id] = (value, weight, folded)
+                self._weighted += bool(weight)
+            self._keys.sort()
+            self._memo.clear()
+
+    def remove(self, item_id):
+        with self._lock:
+            if self._discard(item_id):
+                self._memo.clear()
+
+    def _discard(self, item_id):
+        entry = self._items.pop(item_id, None)
+        if entry is None:
+            return False
+        for key in entry[2]:
+            del self._keys[bisect_left(self._keys, (key, item_id))]
+        self._weighted -= bool(entry[1])
+        return True
+
+    def search(self, prefix, limit=10):
+        """Values of the best limit items with a key starting with prefix"""
+        prefix = fold(prefix)
+        if not prefix or limit <= 0:
+            return []
+        with self._lock:
+            memo_key = (prefix, limit)
+            if memo_key in self._memo:
+                return list(self._memo[memo_key])
+            keys = self._keys
+            start = bisect_left(keys, (prefix,))
+            end = bisect_left(keys, (prefix + '\uffff',), start)
+            # First position of each item in the slice breaks weight ties; without
+            # weights the first limit items in key order are already the answer
+            positions = {}
+            for position in range(start, end):
+                positions.setdefault(keys[position][1], position)
+                if not self._weighted and len(positions) == limit:
+                    break
+            items = self._items
+            best = heapq.nsmallest(limit, positions.items(),
+                                   key=lambda found: (-items[found[0]][1], found[1]))
+            results = [items[item_id][0] for item_id, _ in best]
+            if end - start >= MEMO_THRESHOLD:
+                self._memo[memo_key] = tuple(results)
+            return results
@@ -0,0 +1,144 @@
+"""Balance updates with per-account locks and versioned reads"""
+import threading
+import time
+from contextlib import contextmanager
+
+from ledger import from_cents, parse_day
+
+
+class BalanceError(Exception):
+    """A balance update was refused"""
+
+
+class InsufficientFundsError(BalanceError):
+    pass
+
+
+class ConcurrentUpdateError(BalanceError):
+    """The account changed since the version the caller read"""
+
+
+class PostingDateError(BalanceError, ValueError):
+    """The value date is before the latest posting of one of the accounts"""
+
+
+class BalanceBook:
+    """Serializes balance changes per account on top of the ledger.
+
+    Every account has its own lock rather than one lock for the whole book;
+    that keeps concurrent postings correct, not faster, since they still
+    share the interpreter and the ledger files. Two-account transfers take
+    both locks in account number order, which rules out deadlocks between
+    opposite transfers.
+
+    Each account also has a version counter used as a seqlock: writers make
+    it odd while they post and even again afterwards, so read() can return a
+    consistent (balance, version) without locking, and transfer() can
+    refuse to post when the caller's version is stale.
+    """
+
+    def __init__(self, ledger, account_lookup=None):
+        self.ledger = ledger
+        self.account_lookup = account_lookup
+        self._locks = {}
+        self._versions = {}
+        self._guard = threading.Lock()
+
+    def lock(self, account_number):
+        """The lock of one account (created on first use)"""
+        lock = self._locks.get(account_number)
+        if lock is None:
+            with self._guard:
+                lock = self._locks.setdefault(account_number, threading.Lock())
+        return lock
+
+    @contextmanager
+    def locked(self, *account_numbers):
+        """Hold the locks of several accounts, acquired in a global order"""
+        locks = [self.lock(account_number) for account_number in sorted(set(account_numbers))]
+        acquired = []
+        try:
+            for lock in locks:
+                lock.acquire()
+                acquired.append(lock)
+            yield
+        finally:
+            for lock in reversed(acquired):
+                lock.release()
+
+    def version(self, account_number):
+        """Current version of an account (number of completed updates in this process)"""
+        return self._versions.get(account_number, 0) // 2
+
+    def read(self, account_number):
+        """Consistent (balance in cents, version) of an account without taking its lock"""
+        account = self.ledger.get(account_number)
+        if account is None:
+            raise KeyError(account_number)
+        while True:
+            before = self._versions.get(account_number, 0)
+            if before % 2 == 0:
+                balance = account.balance
+                if self._versions.get(account_number, 0) == before:
+                    return balance, before // 2
+            # A writer is posting; yield to it and read again
+            time.sleep(0)
+
+    def _bump_version(self, account_number):
+        self._versions[account_number] = self._versions.get(account_number, 0) + 1
+
+    def _sync_account(self, account_number, balance):
+        """Mirror a new balance into the account record, if a lookup was given"""
+        if self.account_lookup is not None:
+            account = self.account_lookup(account_number)
+            if account is not None:
+                account.setdefault("detail", {})["balance"] = from_cents(balance)
+
+    def transfer(self, source_account, target_account, cents, description, reference, value_date,
+                 expected_version=None):
+        """Debit source and credit target (None for an external beneficiary) atomically.
+
+        Returns the source row. Raises KeyError for an unknown source account,
+        ConcurrentUpdateError when expected_version is stale,
+        InsufficientFundsError when the balance does not cover cents and
+        PostingDateError when value_date is before the latest posting of
+        either account. Nothing is posted when it raises.
+        """
+        if source_account == target_account:
+            raise ValueError("Source and target account are the same")
+        source = self.ledger.get(source_account)
+        if source is None:
+            raise KeyError(source_account)
+        target = self.ledger.get(target_account) if target_account else None
+        if target_account and target is None:
+            raise KeyError(target_account)
+
+        accounts = (source_account, target_account) if target is not None else (source_account,)
+        with self.locked(*accounts):
+            if expected_version is not None and self.version(source_account) != expected_version:
+                raise ConcurrentUpdateError(source_account)
+            if cents > source.balance:
+                raise InsufficientFundsError(source_account)
+            # Both ledgers are append-only in date order; check both before posting either
+            day = parse_day(value_date)
+            for account_number, account in zip(accounts, (source, target)):
+                last = account.last_value_date
+                if last is not None and day < last:
+                    raise PostingDateError(f"Value date {day} is before the last posting of {account_number} on {last}")
+            for account_number in accounts:
+                self._bump_version(account_number)
+            try:
+                row = source.append(day, -cents / 100, description, reference)
+                if target is not None:
+                    try:
+                        target.append(day, cents / 100, description, reference)
+                    except BaseException:
+                        # Another process posted to the target meanwhile; give the money back
+                        source.append(day, cents / 100, f"Reversal: {description}", reference)
+                        raise
+                    self._sync_account(target_account, target.balance)
+                self._sync_account(source_account, source.balance)
+            finally:
+                for account_number in accounts:
+                    self._bump_version(account_number)
+        return row
@@ -0,0 +1,209 @@
+"""Precomputed per-country business-day calendars (weekends and bank holidays)"""
+from array import array
+from datetime import date, timedelta
+from functools import lru_cache
+
+# Years covered by the precomputed tables; dates outside fall back to stepping day by day
+FIRST_YEAR = 2000
+LAST_YEAR = 2099
+
+DEFAULT_COUNTRY = 'NL'
+
+
+def easter_sunday(year):
+    """Gregorian Easter Sunday (anonymous Gregorian algorithm)"""
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+
+def _nl_holidays(year):
+    easter = easter_sunday(year)
+    if year >= 2014:
+        kings_day = date(year, 4, 27)
+        royal = (kings_day - timedelta(days=1) if kings_day.weekday() == 6 else kings_day, "King's Day")
+    else:
+        queens_day = date(year, 4, 30)
+        royal = (queens_day - timedelta(days=1) if queens_day.weekday() == 6 else queens_day, "Queen's Day")
+    holidays = [
+        (date(year, 1, 1), "New Year's Day"),
+        (easter - timedelta(days=2), "Good Friday"),
+        (easter + timedelta(days=1), "Easter Monday"),
+        royal,
+        (easter + timedelta(days=39), "Ascension Day"),
+        (easter + timedelta(days=50), "Whit Monday"),
+        (date(year, 12, 25), "Christmas Day"),
+        (date(year, 12, 26), "Boxing Day")
+    ]
+    # Banks close on Liberation Day in lustrum years only
+    if year % 5 == 0:
+        holidays.append((date(year, 5, 5), "Liberation Day"))
+    return holidays
+
+
+def _de_holidays(year):
+    easter = easter_sunday(year)
+    return [
+        (date(year, 1, 1), "Neujahr"),
+        (easter - timedelta(days=2), "Karfreitag"),
+        (easter + timedelta(days=1), "Ostermontag"),
+        (date(year, 5, 1), "Tag der Arbeit"),
+        (easter + timedelta(days=39), "Christi Himmelfahrt"),
+        (easter + timedelta(days=50), "Pfingstmontag"),
+        (date(year, 10, 3), "Tag der Deutschen Einheit"),
+        (date(year, 12, 24), "Heiligabend"),
+        (date(year, 12, 25), "Erster Weihnachtstag"),
+        (date(year, 12, 26), "Zweiter Weihnachtstag"),
+        (date(year, 12, 31), "Silvester")
+    ]
+
+
+HOLIDAY_RULES = {
+    'NL': _nl_holidays,
+    'DE': _de_holidays
+}
+
+
+@lru_cache(maxsize=256)
+def holidays_for_year(country_code, year):
+    """Sorted ((date, name), ...) of a country's bank holidays in a year"""
+    return tuple(sorted(HOLIDAY_RULES[country_code](year)))
+
+
+class CountryCalendar:
+    """Business days of one country as a bitmap with rank/select tables.
+
+    bits has one bit per day of the covered range (set on business days).
+    rank[i] counts business days before day i of the range and select[n] is
+    the ordinal of the n-th business day, so next-business-day, adding and
+    counting business days are a couple of array lookups.
+    """
+
+    def __init__(self, country_code, first_year=FIRST_YEAR, last_year=LAST_YEAR):
+        self.country_code = country_code
+        self.first = date(first_year, 1, 1).toordinal()
+        self.last = date(last_year, 12, 31).toordinal()
+        size = self.last - self.first + 1
+        closed = set()
+        for year in range(first_year, last_year + 1):
+            closed.update(day.toordinal() for day, _ in holidays_for_year(country_code, year))
+
+        self.bits = bytearray((size + 7) // 8)
+        self.rank = array('i', bytes(4 * (size + 1)))
+        self.select = array('i')
+        count = 0
+        # Ordinal 1 (0001-01-01) is a Monday, so (ordinal - 1) % 7 is the weekday
+        for index in range(size):
+            ordinal = self.first + index
+            self.rank[index] = count
+            if (ordinal - 1) % 7 < 5 and ordinal not in closed:
+                self.bits[index >> 3] |= 1 << (index & 7)
+                self.select.append(ordinal)
+                count += 1
+        self.rank[size] = count
+
+    def _covers(self, ordinal):
+        return self.first <= ordinal <= self.last
+
+    def is_business_day(self, day):
+        ordinal = day.toordinal()
+        if self._covers(ordinal):
+            index = ordinal - self.first
+            return bool(self.bits[index >> 3] & (1 << (index & 7)))
+        return day.weekday() < 5 and all(holiday != day for holiday, _ in
+                                         holidays_for_year(self.country_code, day.year))
+
+    def next_business_day(self, day):
+        """First business day on or after day"""
+        ordinal = day.toordinal()
+        if self._covers(ordinal):
+            position = self.rank[ordinal - self.first]
+            if position < len(self.select):
+                return date.fromordinal(self.select[position])
+        while not self.is_business_day(day):
+            day += timedelta(days=1)
+        return day
+
+    def previous_business_day(self, day):
+        """Last business day on or before day"""
+        ordinal = day.toordinal()
+        if self._covers(ordinal):
+            position = self.rank[ordinal - self.first + 1]
+            if position > 0:
+                return date.fromordinal(self.select[position - 1])
+        while not self.is_business_day(day):
+            day -= timedelta(days=1)
+        return day
+
+    def add_business_days(self, day, count):
+        """The business day count business days after day (day itself rolled forward first)"""
+        day = self.next_business_day(day)
+        ordinal = day.toordinal()
+        if self._covers(ordinal):
+            position = self.rank[ordinal - self.first] + count
+            if 0 <= position < len(self.select):
+                return date.fromordinal(self.select[position])
+        step = timedelta(days=1 if count >= 0 else -1)
+        for _ in range(abs(count)):
+            day += step
+            while not self.is_business_day(day):
+                day += step
+        return day
+
+    def business_days_between(self, start, end):
+        """Business days in [start, end); negative when end is before start"""
+        if end < start:
+            return -self.business_days_between(end, start)
+        low, high = start.toordinal(), end.toordinal()
+        if self._covers(low) and self._covers(high):
+            return self.rank[high - self.first] - self.rank[low - self.first]
+        return sum(1 for offset in range(high - low) if self.is_business_day(start + timedelta(days=offset)))
+
+    def holidays(self, year):
+        """[(date, name)] of bank holidays in a year"""
+        return list(holidays_for_year(self.country_code, year))
+
+
+class BusinessCalendar:
+    """Per-country calendars, built on first use; unknown countries use DEFAULT_COUNTRY"""
+
+    def __init__(self, first_year=FIRST_YEAR, last_year=LAST_YEAR):
+        self.first_year = first_year
+        self.last_year = last_year
+        self._countries = {}
+
+    def country(self, country_code=DEFAULT_COUNTRY):
+        code = (country_code or DEFAULT_COUNTRY).upper()
+        if code not in HOLIDAY_RULES:
+            code = DEFAULT_COUNTRY
+        calendar = self._countries.get(code)
+        if calendar is None:
+            # Building twice under a race is harmless; the tables are identical
+            calendar = self._countries[code] = CountryCalendar(code, self.first_year, self.last_year)
+        return calendar
+
+    def is_business_day(self, day, country_code=DEFAULT_COUNTRY):
+        return self.country(country_code).is_business_day(day)
+
+    def next_business_day(self, day, country_code=DEFAULT_COUNTRY):
+        return self.country(country_code).next_business_day(day)
+
+    def previous_business_day(self, day, country_code=DEFAULT_COUNTRY):
+        return self.country(country_code).previous_business_day(day)
+
+    def add_business_days(self, day, count, country_code=DEFAULT_COUNTRY):
+        return self.country(country_code).add_business_days(day, count)
+
+    def business_days_between(self, start, end, country_code=DEFAULT_COUNTRY):
+        return self.country(country_code).business_days_between(start, end)
+
+    def holidays(self, year, country_code=DEFAULT_COUNTRY):
+        return self.country(country_code).holidays(year)
@@ -0,0 +1,544 @@
+"""Micro-benchmarks for the mock API's hot paths.
+
+Run one with: python benchmarks.py <name> [options]
+"""
+import argparse
+import csv
+import importlib
+import os
+import random
+import tempfile
+import threading
+import time
+from datetime import date
+
+from autocomplete import PrefixIndex, word_keys
+from balances import BalanceBook
+from bundle import zip_chunks
+from credentials import CredentialStore, CredentialsBusyError
+from documents import render_account_statement
+from export import EXPORT_FORMATS, gzip_chunks
+from iban import build_iban
+from jobs import JobQueue
+from ledger import SEED_TRANSACTIONS, TYPE_INTEREST, Ledger
+from overviews import AnnualOverviewStore, compute_overviews, run_year_end
+from postcodes import PostcodeBook, address_indexes, build_postcode_file
+from transfers import SimulationError, TransferEngine
+from vop import PayeeIndex
+
+
+def _run_threads(threads, target):
+    """Run target(index) on threads threads; returns the elapsed seconds"""
+    workers = [threading.Thread(target=target, args=(index,)) for index in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return time.perf_counter() - start
+
+
+def bench_balances(args):
+    """Concurrent transfers on disjoint and on shared account pairs, checked for lost or duplicate postings"""
+    day = date(2025, 1, 1)
+    with tempfile.TemporaryDirectory() as directory:
+        ledger = Ledger(directory)
+        accounts = [f"BENCH{index:04d}" for index in range(2 * args.threads)]
+        for account_number in accounts:
+            ledger.open_account(account_number, opening_balance=1000000.00)
+        book = BalanceBook(ledger)
+
+        def disjoint(index):
+            source, target = accounts[2 * index], accounts[2 * index + 1]
+            for count in range(args.transfers):
+                if count % 2:
+                    source, target = target, source
+                book.transfer(source, target, 100, "bench", "BENCH", day)
+
+        def contended(index):
+            # Half the threads move money each way, which would deadlock without ordered locking
+            source, target = (accounts[0], accounts[1]) if index % 2 else (accounts[1], accounts[0])
+            for _ in range(args.transfers):
+                book.transfer(source, target, 100, "bench", "BENCH", day)
+
+        total = args.threads * args.transfers
+        postings = {account_number: len(ledger.get(account_number)) for account_number in accounts}
+        for name, target in (("disjoint", disjoint), ("contended", contended)):
+            elapsed = _run_threads(args.threads, target)
+            if name == "disjoint":
+                for account_number in accounts:
+                    postings[account_number] += args.transfers
+            else:
+                postings[accounts[0]] += total
+                postings[accounts[1]] += total
+            lost = [account_number for account_number in accounts
+                    if len(ledger.get(account_number)) != postings[account_number]]
+            balances = sum(book.read(account_number)[0] for account_number in accounts)
+            ok = not lost and balances == len(accounts) * 100000000
+            print(f"{name:10s} threads={args.threads:<3d} transfers={total:<8d} "
+                  f"{total / elapsed:10.0f} transfers/s  {'consistent' if ok else 'INCONSISTENT'}")
+            assert not lost, f"postings lost or duplicated on {', '.join(lost)}"
+            assert balances == len(accounts) * 100000000, "money was created or lost"
+
+
+def bench_batch(args):
+    """Payment simulations per second: one simulate() call per payment versus a simulate_batch() pass"""
+    rng = random.Random(31)
+    today = date.today()
+    with tempfile.TemporaryDirectory() as directory:
+        ledger = Ledger(directory)
+        accounts = {}
+        for index in range(args.accounts):
+            number = f"BATCH{index:05d}"
+            ledger.open_account(number, opening_balance=1000000.00)
+            accounts[number] = {"accountNumber": number, "status": "active", "currencyCode": "EUR",
+                                "operationProfile": {"allowPaymentOrderOut": True}}
+        targets = [build_iban('NL', f"ABNA{index:010d}") for index in range(1000)]
+        payments = []
+        for _ in range(args.payments):
+            payment = {"sourceAccount": rng.choice(list(accounts)), "targetIBAN": rng.choice(targets),
+                       "amount": rng.randrange(100, 10000) / 100}
+            if rng.random() < 0.3:
+                payment["paymentType"] = "future"
+                payment["paymentDate"] = date.fromordinal(today.toordinal() + rng.randrange(1, 60)).isoformat()
+            payments.append(payment)
+
+        def single(engine):
+            results = []
+            for payment in payments:
+                try:
+                    results.append(engine.simulate(
+                        payment["sourceAccount"], payment["targetIBAN"], payment["amount"],
+                        payment_type=payment.get("paymentType", "normal"), payment_date=payment.get("paymentDate")))
+                except SimulationError as e:
+                    results.append(e)
+            return results
+
+        scenarios = {
+            "single": single,
+            "batch": lambda engine: list(engine.simulate_batch(payments))
+        }
+        for label, run in scenarios.items():
+            engine = TransferEngine(accounts.get, ledger)
+            start = time.perf_counter()
+            results = run(engine)
+            elapsed = time.perf_counter() - start
+            print(f"{label:7s} {len(results) / elapsed:10.0f} payments/s")
+
+
+FIRST_NAMES = ("Lucy", "Jürgen", "Anouk", "Søren", "Émile", "Daan", "Fatima", "Mohammed", "Chloé", "Pieter",
+               "Zoë", "Luuk", "Saskia", "Björn", "Inès", "Thijs", "Yusuf", "Noor", "Maarten", "Eline")
+SURNAMES = ("Lavender", "Müller", "de Vries", "van den Berg", "Jansen", "Öztürk", "Bakker", "El Amrani",
+            "Schröder", "Visser", "Smit", "Meijer", "de Boer", "Mulder", "Dijkstra", "Brouwer", "Janssen")
+COMPANY_SUFFIXES = ("B.V.", "N.V.", "GmbH", "Holding B.V.", "V.O.F.")
+
+
+def _corpus(size, seed=7):
+    """(IBAN, holder name) pairs with a mix of people and companies"""
+    rng = random.Random(seed)
+    for index in range(size):
+        surname = rng.choice(SURNAMES)
+        if index % 5 == 0:
+            name = f"{surname} {rng.choice(('Bouw', 'Energie', 'Logistiek', 'Zorg'))} {rng.choice(COMPANY_SUFFIXES)}"
+        else:
+            name = f"{rng.choice(FIRST_NAMES)} {rng.choice(FIRST_NAMES) + ' ' if index % 3 == 0 else ''}{surname}"
+        yield f"NL{index % 97:02d}BENC{index:010d}", name
+
+
+def _typo(name, rng):
+    position = rng.randrange(1, len(name) - 1)
+    return name[:position] + name[position + 1] + name[position] + name[position + 2:]
+
+
+def bench_vop(args):
+    """Payee-name match latency over a synthetic holder-name corpus"""
+    rng = random.Random(11)
+    index = PayeeIndex()
+    start = time.perf_counter()
+    corpus = list(_corpus(args.names))
+    for iban, name in corpus:
+        index.add(iban, name)
+    print(f"indexed {len(corpus)} holder names in {time.perf_counter() - start:.2f}s")
+
+    sample = [rng.choice(corpus) for _ in range(args.queries)]
+    variants = {
+        "exact": lambda name: name.upper(),
+        "initials": lambda name: f"{name.split()[0][0]}. {name.split()[-1]}",
+        "typo": lambda name: _typo(name, rng),
+        "other": lambda name: rng.choice(corpus)[1]
+    }
+    for label, variant in variants.items():
+        queries = [(iban, variant(name)) for iban, name in sample]
+        codes = {}
+        start = time.perf_counter()
+        for iban, name in queries:
+            code = index.verify(iban, name)["partyNameMatch"]
+            codes[code] = codes.get(code, 0) + 1
+        elapsed = time.perf_counter() - start
+        print(f"{label:9s} {elapsed / len(queries) * 1e6:8.1f} us/match  {codes}")
+
+
+def bench_autocomplete(args):
+    """Type-ahead latency over one customer's accounts and payees, plus update cost"""
+    rng = random.Random(13)
+    index = PrefixIndex()
+    corpus = list(_corpus(args.entries))
+    start = time.perf_counter()
+    index.add_many((iban, {"iban": iban, "holderName": name}, [iban, *word_keys(name)], 0) for iban, name in corpus)
+    print(f"indexed {len(corpus)} entries in {time.perf_counter() - start:.2f}s")
+
+    queries = {
+        "iban": lambda iban, name: iban[:rng.randrange(4, 12)],
+        "name": lambda iban, name: name.split()[-1][:rng.randrange(1, 5)],
+        "one-letter": lambda iban, name: name[0]
+    }
+    for label, query in queries.items():
+        sample = [query(*rng.choice(corpus)) for _ in range(args.queries)]
+        start = time.perf_counter()
+        for text in sample:
+            index.search(text, args.limit)
+        elapsed = time.perf_counter() - start
+        print(f"{label:10s} {elapsed / len(sample) * 1e6:8.1f} us/search")
+
+    start = time.perf_counter()
+    for iban, name in corpus[:args.queries]:
+        index.remove(iban)
+        index.add(iban, {"iban": iban, "holderName": name}, [iban, *word_keys(name)])
+    elapsed = time.perf_counter() - start
+    print(f"{'update':10s} {elapsed / min(args.queries, len(corpus)) * 1e6:8.1f} us/remove+add")
+
+
+def bench_postcodes(args):
+    """Postcode file build, open and lookup times and street type-ahead for a synthetic national table"""
+    rng = random.Random(17)
+    letters = [chr(code) for code in range(ord('A'), ord('Z') + 1)]
+    with tempfile.TemporaryDirectory() as directory:
+        csv_path, bin_path = os.path.join(directory, 'postcodes.csv'), os.path.join(directory, 'postcodes.bin')
+        postcodes = set()
+        while len(postcodes) < args.postcodes:
+            postcodes.add(f"{rng.randrange(1000, 10000)}{rng.choice(letters)}{rng.choice(letters)}")
+        postcodes = sorted(postcodes)
+        with open(csv_path, 'w', newline='', encoding='utf-8') as target:
+            writer = csv.writer(target)
+            writer.writerow(('postcode', 'street', 'city', 'number_from', 'number_to', 'step'))
+            for postcode in postcodes:
+                low = rng.randrange(1, 200)
+                writer.writerow((postcode, f"{rng.choice(SURNAMES)}straat", f"Plaats {postcode[:2]}",
+                                 low, low + 2 * rng.randrange(0, 15), 2))
+
+        start = time.perf_counter()
+        count = build_postcode_file(csv_path, bin_path)
+        print(f"built {count} ranges in {time.perf_counter() - start:.2f}s "
+              f"({os.path.getsize(bin_path) / 1e6:.1f} MB)")
+        start = time.perf_counter()
+        book = PostcodeBook(bin_path)
+        print(f"opened in {(time.perf_counter() - start) * 1e3:.2f} ms")
+
+        sample = [rng.choice(postcodes) for _ in range(args.queries)]
+        for label, lookup in (("streets", lambda postcode: book.streets(postcode)),
+                              ("resolve", lambda postcode: book.resolve(postcode, rng.randrange(1, 230)))):
+            start = time.perf_counter()
+            for postcode in sample:
+                lookup(postcode)
+            elapsed = time.perf_counter() - start
+            print(f"{label:8s} {elapsed / len(sample) * 1e6:8.1f} us/lookup")
+
+        start = time.perf_counter()
+        streets, _ = address_indexes(book)
+        print(f"indexed {len(streets)} streets in {time.perf_counter() - start:.2f}s")
+        prefixes = [rng.choice(SURNAMES)[:rng.randrange(1, 5)] for _ in range(args.queries)]
+        start = time.perf_counter()
+        for prefix in prefixes:
+            streets.search(prefix, 10)
+        elapsed = time.perf_counter() - start
+        print(f"{'street':8s} {elapsed / len(prefixes) * 1e6:8.1f} us/search")
+        book.close()
+
+
+def bench_bundle(args):
+    """Document bundle ZIP streaming: time to the first byte and documents per second, rendered inline or on print workers"""
+    rng = random.Random(41)
+    with tempfile.TemporaryDirectory() as directory:
+        ledger = Ledger(directory)
+        numbers = [f"BUNDLE{index:04d}" for index in range(args.documents)]
+        first = date(2024, 1, 1).toordinal()
+        for number in numbers:
+            account = ledger.open_account(number, opening_balance=1000.00)
+            for index in range(args.rows):
+                account.append(date.fromordinal(first + index * 365 // args.rows),
+                               rng.randrange(-50000, 60000) / 100, f"{rng.choice(SURNAMES)} payment", f"BND{index:08d}")
+        calls = [(render_account_statement, (directory, number)) for number in numbers]
+        queue = JobQueue(max_workers=args.workers)
+        # The server's print workers are long-lived; start them before timing
+        list(queue.map(calls[:args.workers], args.workers))
+
+        scenarios = {
+            "inline": lambda: (renderer(*call_args) for renderer, call_args in calls),
+            f"workers={args.workers}": lambda: queue.map(iter(calls), args.window)
+        }
+        try:
+            for label, results in scenarios.items():
+                start = time.perf_counter()
+                members = ((f"statements/{filename}", content) for filename, _, content in results())
+                size = 0
+                first_byte = None
+                for chunk in zip_chunks(members):
+                    if first_byte is None:
+                        first_byte = time.perf_counter() - start
+                    size += len(chunk)
+                elapsed = time.perf_counter() - start
+                print(f"{label:10s} first byte {first_byte * 1e3:8.1f} ms  {len(calls) / elapsed:7.1f} documents/s  "
+                      f"{size / 1e6:6.1f} MB archive")
+        finally:
+            queue.shutdown(wait=True)
+
+
+def bench_credentials(args):
+    """Password checks per second under a login storm, cached session checks, and other work meanwhile"""
+    rng = random.Random(29)
+    with tempfile.TemporaryDirectory() as directory:
+        store = CredentialStore(os.path.join(directory, 'credentials.json'), max_workers=args.workers,
+                                max_pending=args.pending)
+        customers = [f"CUST{index:05d}" for index in range(args.customers)]
+        for customer_id in customers:
+            store.setdefault(customer_id, f"secret-{customer_id}")
+
+        def probe():
+            # Stand-in for a cheap route: the time a small piece of pure Python work takes
+            start = time.perf_counter()
+            sum(range(20000))
+            return time.perf_counter() - start
+
+        idle = min(probe() for _ in range(200))
+        # A storm of first logins (every check hashes) and repeated checks within sessions (cached)
+        scenarios = {
+            "storm": lambda index, count: (f"session-{index}-{count}", 0.9),
+            "sessions": lambda index, count: (f"session-{index}", 1.0)
+        }
+        for label, scenario in scenarios.items():
+            outcomes = {"ok": 0, "busy": 0}
+            running = threading.Event()
+            running.set()
+            probes = []
+
+            def login(index):
+                customer_id = customers[index % len(customers)]
+                for count in range(args.logins):
+                    session_id, correct = scenario(index, count)
+                    password = f"secret-{customer_id}" if rng.random() < correct else "wrong"
+                    try:
+                        store.verify(customer_id, password, session_id)
+                        outcomes["ok"] += 1
+                    except CredentialsBusyError:
+                        outcomes["busy"] += 1
+
+            def other():
+                while running.is_set():
+                    probes.append(probe())
+
+            prober = threading.Thread(target=other)
+            prober.start()
+            elapsed = _run_threads(args.threads, login)
+            running.clear()
+            prober.join()
+            probes.sort()
+            print(f"{label:9s} threads={args.threads:<4d} {outcomes['ok'] / elapsed:8.0f} checks/s  "
+                  f"rejected={outcomes['busy']:<6d} other work p50={probes[len(probes) // 2] / idle:4.1f}x "
+                  f"p99={probes[int(len(probes) * 0.99)] / idle:4.1f}x idle")
+        store.shutdown()
+
+
+def bench_documents(args):
+    """/api/documents/download throughput: rendering the PDF every request, cached, and 304 revalidation"""
+    with tempfile.TemporaryDirectory() as directory:
+        # app.py seeds a ledger and writes state files on import; keep them out of the tree
+        os.environ['DHB_LEDGER_DIR'] = directory
+        os.environ['DHB_PDF_CACHE_DIR'] = os.path.join(directory, 'pdf')
+        cwd = os.getcwd()
+        os.chdir(directory)
+        try:
+            app = importlib.import_module('app')
+        finally:
+            os.chdir(cwd)
+        # The financial overview needs the customer's figures from a year-end batch
+        year = date.today().year - 1
+        app.annual_overviews = AnnualOverviewStore(os.path.join(directory, 'overviews'))
+        app.annual_overviews.put_year(year, compute_overviews(
+            app.account_ledger.directory, [('CUST001', list(SEED_TRANSACTIONS))], year))
+        client = app.app.test_client()
+        types = list(app.DOWNLOAD_TEMPLATES)
+        etags = {kind: client.get(f'/api/documents/download?type={kind}').headers['ETag'].strip('"')
+                 for kind in types}
+
+        def uncached(kind):
+            # Drop the rendered text and the PDF file so both are produced again
+            app.document_cache = type(app.document_cache)(app.document_cache.max_entries)
+            os.remove(app.pdf_store.path(etags[kind]))
+            return {}
+
+        scenarios = {
+            "render": uncached,
+            "cached": lambda kind: {},
+            "304": lambda kind: {'If-None-Match': f'"{etags[kind]}"'}
+        }
+        for label, prepare in scenarios.items():
+            start = time.perf_counter()
+            for count in range(args.requests):
+                kind = types[count % len(types)]
+                response = client.get(f'/api/documents/download?type={kind}', headers=prepare(kind))
+                response.get_data()
+            elapsed = time.perf_counter() - start
+            print(f"{label:7s} {args.requests / elapsed:8.0f} downloads/s")
+
+
+def bench_exports(args):
+    """Statement export streaming: time to the first chunk, throughput and largest chunk per format, plain and gzip"""
+    rng = random.Random(37)
+    with tempfile.TemporaryDirectory() as directory:
+        account = Ledger(directory).open_account("EXPORT0001", opening_balance=1000.00)
+        first = date(2020, 1, 1).toordinal()
+        start = time.perf_counter()
+        for index in range(args.rows):
+            day = date.fromordinal(first + index * 2000 // args.rows)
+            # Some descriptions look like spreadsheet formulas, so the CSV escaping is exercised
+            description = f"{'=' if index % 50 == 0 else ''}{rng.choice(SURNAMES)} payment {index}"
+            account.append(day, rng.randrange(-50000, 60000) / 100, description, f"EXP{index:08d}")
+        print(f"wrote {args.rows} transactions in {time.perf_counter() - start:.2f}s")
+
+        for export_format, (generate, _, _) in EXPORT_FORMATS.items():
+            for encoding in ("plain", "gzip"):
+                start = time.perf_counter()
+                chunks = generate(account)
+                if encoding == "gzip":
+                    chunks = gzip_chunks(chunks)
+                size = largest = 0
+                first_chunk = None
+                for chunk in chunks:
+                    if first_chunk is None:
+                        first_chunk = time.perf_counter() - start
+                    size += len(chunk)
+                    largest = max(largest, len(chunk))
+                elapsed = time.perf_counter() - start
+                print(f"{export_format:8s} {encoding:5s} first chunk {first_chunk * 1e3:7.2f} ms  "
+                      f"{args.rows / elapsed:9.0f} rows/s  {size / 1e6:7.1f} MB  largest chunk {largest / 1024:5.0f} KiB")
+
+
+def bench_overviews(args):
+    """Year-end annual overview batch time per 100k accounts by number of workers, and stored lookups"""
+    rng = random.Random(23)
+    year = 2025
+    first, last = date(year - 1, 1, 1).toordinal(), date(year + 1, 12, 31).toordinal()
+    with tempfile.TemporaryDirectory() as directory:
+        ledger_dir = os.path.join(directory, 'ledger')
+        customers = {}
+        start = time.perf_counter()
+        for index in range(args.accounts):
+            # A fresh registry now and then, so the mapped segments of written accounts are released
+            if index % 1000 == 0:
+                ledger = Ledger(ledger_dir)
+            number = f"{index:010d}"
+            account = ledger.open_account(number, opening_balance=rng.randrange(0, 5000000) / 100)
+            for day in sorted(rng.randrange(first, last) for _ in range(args.transactions)):
+                if rng.random() < 0.2:
+                    account.append(date.fromordinal(day), rng.randrange(1, 50000) / 100, "Interest", "BENCH", TYPE_INTEREST)
+                else:
+                    account.append(date.fromordinal(day), rng.randrange(-100000, 200000) / 100, "Bench", "BENCH")
+            customers.setdefault(f"CUST{index // 3:07d}", []).append(number)
+        print(f"wrote {args.accounts} accounts with {args.transactions} transactions each "
+              f"in {time.perf_counter() - start:.1f}s")
+
+        for workers in sorted({1, args.workers}):
+            updates = []
+            start = time.perf_counter()
+            overviews = run_year_end(ledger_dir, customers, year, workers,
+                                     progress=lambda done, total: updates.append(done))
+            elapsed = time.perf_counter() - start
+            print(f"workers={workers:<3d} {elapsed:6.2f}s  {elapsed * 100000 / args.accounts:6.2f}s per 100k accounts  "
+                  f"{len(updates)} progress updates")
+
+        store_dir = os.path.join(directory, 'overviews')
+        start = time.perf_counter()
+        AnnualOverviewStore(store_dir).put_year(year, overviews)
+        print(f"stored {len(overviews)} overviews in {time.perf_counter() - start:.2f}s")
+        store = AnnualOverviewStore(store_dir)
+        start = time.perf_counter()
+        store.years(next(iter(customers)))
+        print(f"loaded in {time.perf_counter() - start:.2f}s")
+        sample = [rng.choice(list(customers)) for _ in range(args.queries)]
+        start = time.perf_counter()
+        for customer_id in sample:
+            store.get(customer_id, year)
+        elapsed = time.perf_counter() - start
+        print(f"lookup {elapsed / len(sample) * 1e6:8.1f} us/overview")
+
+
+BENCHMARKS = {
+    'autocomplete': bench_autocomplete,
+    'balances': bench_balances,
+    'batch': bench_batch,
+    'bundle': bench_bundle,
+    'credentials': bench_credentials,
+    'documents': bench_documents,
+    'exports': bench_exports,
+    'overviews': bench_overviews,
+    'postcodes': bench_postcodes,
+    'vop': bench_vop
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest='benchmark', required=True)
+
+    autocomplete = commands.add_parser('autocomplete', help=bench_autocomplete.__doc__)
+    autocomplete.add_argument('--entries', type=int, default=5000, help='accounts and payees of the customer')
+    autocomplete.add_argument('--queries', type=int, default=20000)
+    autocomplete.add_argument('--limit', type=int, default=10, help='results per search')
+
+    balances = commands.add_parser('balances', help=bench_balances.__doc__)
+    balances.add_argument('--threads', type=int, default=8)
+    balances.add_argument('--transfers', type=int, default=2000, help='transfers per thread')
+
+    batch = commands.add_parser('batch', help=bench_batch.__doc__)
+    batch.add_argument('--accounts', type=int, default=100, help='source accounts')
+    batch.add_argument('--payments', type=int, default=10000, help='payments in the batch')
+
+    bundle = commands.add_parser('bundle', help=bench_bundle.__doc__)
+    bundle.add_argument('--documents', type=int, default=50, help='statements in the bundle')
+    bundle.add_argument('--rows', type=int, default=2000, help='transactions per statement')
+    bundle.add_argument('--workers', type=int, default=2, help='print worker processes')
+    bundle.add_argument('--window', type=int, default=4, help='documents rendered ahead of the ZIP stream')
+
+    credentials = commands.add_parser('credentials', help=bench_credentials.__doc__)
+    credentials.add_argument('--customers', type=int, default=50)
+    credentials.add_argument('--threads', type=int, default=64, help='concurrent request threads logging in')
+    credentials.add_argument('--logins', type=int, default=10, help='password checks per thread')
+    credentials.add_argument('--workers', type=int, default=2, help='KDF worker threads')
+    credentials.add_argument('--pending', type=int, default=32, help='queued checks before rejecting')
+
+    documents = commands.add_parser('documents', help=bench_documents.__doc__)
+    documents.add_argument('--requests', type=int, default=5000)
+
+    exports = commands.add_parser('exports', help=bench_exports.__doc__)
+    exports.add_argument('--rows', type=int, default=200000, help='transactions on the exported account')
+
+    overviews = commands.add_parser('overviews', help=bench_overviews.__doc__)
+    overviews.add_argument('--accounts', type=int, default=100000)
+    overviews.add_argument('--transactions', type=int, default=4, help='transactions per account over three years')
+    overviews.add_argument('--workers', type=int, default=os.cpu_count())
+    overviews.add_argument('--queries', type=int, default=100000)
+
+    postcodes = commands.add_parser('postcodes', help=bench_postcodes.__doc__)
+    postcodes.add_argument('--postcodes', type=int, default=450000, help='distinct postcodes in the table')
+    postcodes.add_argument('--queries', type=int, default=100000)
+
+    vop = commands.add_parser('vop', help=bench_vop.__doc__)
+    vop.add_argument('--names', type=int, default=200000, help='holder names in the index')
+    vop.add_argument('--queries', type=int, default=20000, help='matches per variant')
+
+    args = parser.parse_args()
+    BENCHMARKS[args.benchmark](args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+"""Streaming ZIP archives of rendered documents"""
+import zipfile
+
+# Member content is compressed and emitted in slices of this many bytes
+CHUNK_SIZE = 64 * 1024
+
+
+class _Sink:
+    """Write-only, unseekable file collecting what ZipFile writes until it is drained"""
+
+    def __init__(self):
+        self._parts = []
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._parts)
+        self._parts.clear()
+        return data
+
+
+def zip_chunks(members, level=6, chunk_size=CHUNK_SIZE):
+    """Yield a ZIP archive of (name, content bytes) members while it is being compressed.
+
+    The output is unseekable, so ZipFile writes each member's sizes and CRC
+    in a data descriptor after its data. Only the member being compressed and
+    the compressor's buffers are held in memory.
+    """
+    sink = _Sink()
+    with zipfile.ZipFile(sink, 'w', zipfile.ZIP_DEFLATED, compresslevel=level) as archive:
+        for name, content in members:
+            with archive.open(name, 'w') as member:
+                for start in range(0, len(content), chunk_size):
+                    member.write(content[start:start + chunk_size])
+                    data = sink.drain()
+                    if data:
+                        yield data
+            data = sink.drain()
+            if data:
+                yield data
+    yield sink.drain()
@@ -0,0 +1,244 @@
+"""Customer passwords stored as scrypt hashes, checked on a bounded worker pool.
+
+The plaintext password file of the old mock servers is migrated once with:
+python credentials.py import <customer id> [path]
+"""
+import argparse
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+# Hashes live here unless DHB_CREDENTIALS_FILE points elsewhere
+CREDENTIALS_FILE = os.environ.get(
+    'DHB_CREDENTIALS_FILE',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'credentials.json')
+)
+
+# Plaintext password file of the old mock servers, in the api directory
+LEGACY_PASSWORD_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                    'current_password.txt')
+
+# scrypt cost: 128 * n * r bytes (16 MiB) and about 50 ms of one core per hash
+SCRYPT_N = 2 ** 14
+SCRYPT_R = 8
+SCRYPT_P = 1
+SALT_BYTES = 16
+KEY_BYTES = 32
+
+
+class CredentialsBusyError(Exception):
+    """Every worker is busy and the queue of password checks is full"""
+
+
+def hash_password(password, n=SCRYPT_N, r=SCRYPT_R, p=SCRYPT_P):
+    """Stored form of a password: salt, scrypt key and the cost it was made with"""
+    salt = secrets.token_bytes(SALT_BYTES)
+    key = hashlib.scrypt(password.encode('utf-8'), salt=salt, n=n, r=r, p=p, dklen=KEY_BYTES,
+                         maxmem=256 * n * r)
+    return {"salt": salt.hex(), "key": key.hex(), "n": n, "r": r, "p": p}
+
+
+def check_password(password, record):
+    """Whether password matches a stored record, compared in constant time"""
+    n, r = record["n"], record["r"]
+    key = hashlib.scrypt(password.encode('utf-8'), salt=bytes.fromhex(record["salt"]), n=n, r=r,
+                         p=record["p"], dklen=KEY_BYTES, maxmem=256 * n * r)
+    return hmac.compare_digest(key, bytes.fromhex(record["key"]))
+
+
+class CredentialStore:
+    """scrypt password hashes per customer in a JSON file.
+
+    hashlib.scrypt releases the GIL, so hashes run on a small thread pool
+    and take no request thread's CPU. At most max_workers + max_pending
+    hashes are queued or running; past that, calls raise
+    CredentialsBusyError at once rather than piling up request threads
+    behind a login storm. Results are cached per (customer, session) for
+    cache_ttl seconds under a keyed digest of the password, so repeated
+    checks in one session cost no hash; changing a password drops them.
+
+    Both servers share the file: its modification time is checked at most
+    once per refresh_interval seconds and the file re-read when it changed,
+    and a write takes a file lock and merges into what is on disk, so
+    neither overwrites the other's changes.
+    """
+
+    def __init__(self, path=CREDENTIALS_FILE, max_workers=2, max_pending=32, cache_ttl=60, max_cached=10000,
+                 cost=SCRYPT_N, refresh_interval=1.0):
+        self.path = path
+        self.cache_ttl = cache_ttl
+        self.refresh_interval = refresh_interval
+        self.max_cached = max_cached
+        self.cost = cost
+        self.hits = 0
+        self.misses = 0
+        self.rejected = 0
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='credentials')
+        self._slots = threading.BoundedSemaphore(max_workers + max_pending)
+        self._cache = OrderedDict()
+        self._cache_key = secrets.token_bytes(32)
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._records = {}
+        self._seen = None
+        self._checked = None
+        self._refresh()
+        # Unknown customers are checked against this, so they take as long as known ones
+        self._decoy = hash_password(secrets.token_hex(16), n=cost)
+
+    def __contains__(self, customer_id):
+        self._refresh()
+        return customer_id in self._records
+
+    def _read(self):
+        """Records on disk and the file's modification time"""
+        try:
+            with open(self.path, 'r') as f:
+                return json.load(f), os.fstat(f.fileno()).st_mtime_ns
+        except FileNotFoundError:
+            return {}, None
+
+    def _refresh(self):
+        """Pick up changes written by another process"""
+        now = time.monotonic()
+        if self._checked is not None and now - self._checked < self.refresh_interval:
+            return
+        self._checked = now
+        try:
+            seen = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return
+        if seen == self._seen:
+            return
+        records, seen = self._read()
+        with self._lock:
+            if self._seen is not None and (seen is None or seen < self._seen):
+                # A write of this process landed meanwhile
+                return
+            changed = {customer_id for customer_id in set(records) | set(self._records)
+                       if records.get(customer_id) != self._records.get(customer_id)}
+            self._records = records
+            self._seen = seen
+            for key in [key for key in self._cache if key[0] in changed]:
+                del self._cache[key]
+
+    def _run(self, function, *args):
+        """Run function on the pool and wait for it; raises CredentialsBusyError when full"""
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise CredentialsBusyError()
+        try:
+            future = self._executor.submit(function, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda done: self._slots.release())
+        return future.result()
+
+    def _fingerprint(self, customer_id, password):
+        return hmac.new(self._cache_key, f'{customer_id}\0{password}'.encode('utf-8'), hashlib.sha256).digest()
+
+    def verify(self, customer_id, password, session_id=None):
+        """Whether password is the customer's; answered from the session cache when possible"""
+        cache_key = (customer_id, session_id)
+        fingerprint = self._fingerprint(customer_id, password or '')
+        now = time.monotonic()
+        self._refresh()
+        if session_id is not None:
+            with self._lock:
+                cached = self._cache.get(cache_key)
+                if cached is not None and cached[0] == fingerprint and cached[2] > now:
+                    self.hits += 1
+                    return cached[1]
+                self.misses += 1
+        record = self._records.get(customer_id)
+        valid = self._run(check_password, password or '', record or self._decoy) and record is not None
+        if session_id is not None:
+            with self._lock:
+                # A password change while hashing makes this result stale
+                if self._records.get(customer_id) is record:
+                    self._cache[cache_key] = (fingerprint, valid, now + self.cache_ttl)
+                    self._cache.move_to_end(cache_key)
+                    while len(self._cache) > self.max_cached:
+                        self._cache.popitem(last=False)
+        return valid
+
+    def set_password(self, customer_id, password):
+        """Hash and store a new password for the customer; the file is written on the pool too"""
+        self._run(self._store, customer_id, password)
+
+    def _store(self, customer_id, password):
+        record = hash_password(password, self.cost)
+        partial = self.path + '.partial'
+        # Writers take turns, in this process and across processes, and each merges into the file
+        with self._save_lock, open(self.path + '.lock', 'a') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            records, _ = self._read()
+            records[customer_id] = record
+            with open(partial, 'w') as f:
+                json.dump(records, f)
+            os.replace(partial, self.path)
+            with self._lock:
+                self._records = records
+                self._seen = os.stat(self.path).st_mtime_ns
+                for key in [key for key in self._cache if key[0] == customer_id]:
+                    del self._cache[key]
+
+    def setdefault(self, customer_id, password):
+        """Store password for a customer without one"""
+        if customer_id not in self:
+            self.set_password(customer_id, password)
+
+    def import_plaintext(self, customer_id, path=LEGACY_PASSWORD_FILE):
+        """Hash the password of a plaintext file as the customer's password; the file is left alone"""
+        if not os.path.exists(path):
+            return False
+        with open(path, 'r') as f:
+            password = f.read().strip()
+        if not password:
+            return False
+        self.set_password(customer_id, password)
+        return True
+
+    def metrics(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "rejected": self.rejected,
+                    "cachedSessions": len(self._cache)}
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+    migrate = commands.add_parser('import', help=CredentialStore.import_plaintext.__doc__)
+    migrate.add_argument('customer_id')
+    migrate.add_argument('path', nargs='?', default=LEGACY_PASSWORD_FILE, help='plaintext password file')
+    args = parser.parse_args()
+
+    store = CredentialStore()
+    try:
+        if store.import_plaintext(args.customer_id, args.path):
+            print(f"Imported the password of {args.customer_id} from {args.path}; delete that file now")
+        else:
+            print(f"Nothing imported: {args.path} is missing or empty")
+    finally:
+        store.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,180 @@
+"""Document renderers for the print endpoints.
+
+Each renderer is a plain top-level function returning (filename, mimetype,
+content bytes) so it can run inside a worker process of the job queue. The
+content is a PDF laid out by pdf.stream_pdf.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from string import Formatter
+
+from ledger import Ledger
+from pdf import stream_pdf
+
+# Statement rows are read from the ledger this many at a time and laid out
+# page by page. The finished PDF is still held whole, since it is the job
+# result handed back to the request.
+STATEMENT_PAGE_SIZE = 500
+
+
+def _header(title):
+    return f"""DHB BANK N.V.
+{title}
+
+Generated on: {datetime.now().strftime('%d %B %Y')}
+
+"""
+
+
+def _pdf(filename, title, parts):
+    """(filename, mimetype, PDF bytes) for text parts, which may span several lines each"""
+    lines = (line for part in parts for line in part.splitlines())
+    return f"{filename}.pdf", 'application/pdf', b''.join(stream_pdf(lines, title))
+
+
+def _statement_parts(account, account_number):
+    summary = account.summary()
+    yield _header("Account Statement")
+    yield f"""ACCOUNT NUMBER: {account_number}
+ACCOUNT NAME: {account.account_name}
+CURRENCY: {account.currency_code}
+
+OPENING BALANCE: €{summary['openingBalance']:,.2f}
+CLOSING BALANCE: €{summary['closingBalance']:,.2f}
+Total Credits: €{summary['totalCredits']:,.2f}
+Total Debits: €{summary['totalDebits']:,.2f}
+Interest Earned: €{summary['interestEarned']:,.2f}
+
+TRANSACTIONS
+"""
+    page_index = 0
+    while True:
+        rows, total = account.page(page_index, STATEMENT_PAGE_SIZE)
+        for row in rows:
+            yield (f"{row['valueDate']}  {row['reference']:<16} {row['description']:<40} "
+                   f"{row['amount']:>12,.2f} {row['balance']:>14,.2f}")
+        page_index += 1
+        if page_index * STATEMENT_PAGE_SIZE >= total:
+            break
+    yield "\nContact: statements@dhbbank.com"
+
+
+def render_account_statement(ledger_dir, account_number):
+    """Full statement of an account, read from the shared ledger segments"""
+    account = Ledger(ledger_dir).get(account_number)
+    if account is None:
+        raise LookupError(f"No statement found for account {account_number}")
+
+    return _pdf(f"Statement_{account_number}", "Account Statement", _statement_parts(account, account_number))
+
+
+def render_saving_history(account_number, history):
+    """Saving history of an account from the given history rows"""
+    lines = [_header("Saving Account History"), f"ACCOUNT NUMBER: {account_number}\n\n"]
+    for entry in history:
+        amount = entry.get('amount')
+        amount_text = f"€{amount:,.2f}" if amount is not None else ""
+        lines.append(f"{entry['date']}  {entry['action']:<20} {entry['description']:<40} {amount_text}\n")
+    return _pdf(f"History_{account_number}", "Saving Account History", lines)
+
+
+def render_financial_annual_overview(customer_id, document_id, overview=None):
+    """Financial annual overview (or tax statement) of a customer from its stored year-end figures"""
+    lines = [_header("Financial Annual Overview"), f"CUSTOMER ID: {customer_id}\nDOCUMENT ID: {document_id}\n\n"]
+    if overview is None:
+        lines.append("This overview lists the balances and interest of all your accounts at year end.\n")
+    else:
+        year = overview["year"]
+        lines.append(f"YEAR: {year}\nREPORT PERIOD: 1 January - 31 December {year}\n\n")
+        if document_id.startswith("TAX_"):
+            lines.append("TAX STATEMENT (BOX 3)\n")
+            for totals in overview["totals"]:
+                lines.append(f"Balance on {totals['taxReferenceDate']} ({totals['currencyCode']}): "
+                             f"€{totals['taxReferenceBalance']:,.2f}\n"
+                             f"Interest received ({totals['currencyCode']}): €{totals['interestEarned']:,.2f}\n")
+        else:
+            lines.append("ACCOUNTS\n")
+            for account in overview["accounts"]:
+                lines.append(f"{account['accountNumber']}  {account['accountName']:<24} {account['currencyCode']}  "
+                             f"1 Jan {account['openingBalance']:>14,.2f}  31 Dec {account['closingBalance']:>14,.2f}  "
+                             f"Interest {account['interestEarned']:>10,.2f}\n")
+            lines.append("\nTOTALS\n")
+            for totals in overview["totals"]:
+                lines.append(f"{totals['currencyCode']}: Balance 1 January €{totals['openingBalance']:,.2f}, "
+                             f"31 December €{totals['closingBalance']:,.2f}, "
+                             f"Interest earned €{totals['interestEarned']:,.2f}, "
+                             f"Transactions {totals['transactionCount']}\n")
+    lines.append("\nFor questions, contact: support@dhbbank.com\n")
+    return _pdf(document_id, "Financial Annual Overview", lines)
+
+
+def render_customer_contract(customer_id, contract_id):
+    """Contract document of a customer"""
+    content = _header("Your Contract") + f"""CUSTOMER ID: {customer_id}
+CONTRACT ID: {contract_id}
+
+CONTRACT TERMS
+- All contracts subject to DHB BANK terms
+- Changes require 30-day notice
+- Termination requires written notice
+
+Legal Department: legal@dhbbank.com
+"""
+    return _pdf(contract_id, "Your Contract", [content])
+
+
+class DocumentTemplate:
+    """A downloadable document: its filename and a str.format template.
+
+    The template is parsed once for the names it uses, so callers only
+    compute the values a document actually needs.
+    """
+
+    __slots__ = ('filename', 'title', 'text', 'fields')
+
+    def __init__(self, filename, text):
+        self.filename = filename
+        self.title = filename.rsplit('.', 1)[0].replace('_', ' ')
+        self.text = text
+        self.fields = frozenset(name for _, name, _, _ in Formatter().parse(text) if name)
+
+    def render(self, context):
+        return self.text.format_map(context).encode('utf-8')
+
+
+class DocumentCache:
+    """LRU cache of rendered documents with their ETag and render time.
+
+    Keys are chosen by the caller, e.g. (document type, customer, day), so
+    entries of past days simply age out.
+    """
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """(content, etag, rendered at) for key, or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, content):
+        """Store rendered content; returns its (content, etag, rendered at) entry"""
+        entry = (content, hashlib.sha256(content).hexdigest()[:32], datetime.now(timezone.utc).replace(microsecond=0))
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
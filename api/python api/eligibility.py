@@ -0,0 +1,116 @@
+"""Precomputed account eligibility per customer and transaction type"""
+import threading
+
+# Transaction type (targetAccounts path parameter) -> operationProfile flag an account needs
+TRANSACTION_FLAGS = {
+    'payment': 'allowPaymentOrderOut',
+    'ownTransfer': 'allowOwnTransferOut',
+    'account': 'allowSourceForOpening'
+}
+
+
+def _profile(account):
+    """The parts of an account its eligibility depends on"""
+    profile = account.get("operationProfile") or {}
+    return (account.get("status") == "active", account.get("currencyCode"),
+            tuple(bool(profile.get(flag)) for flag in TRANSACTION_FLAGS.values()))
+
+
+class _CustomerAccounts:
+    """One customer's accounts in numbered slots, with a bitset of slots per type and currency"""
+
+    def __init__(self):
+        self.slots = []
+        self.slot_of = {}
+        self.free = []
+        self.profiles = {}
+        self.by_type = dict.fromkeys(TRANSACTION_FLAGS, 0)
+        self.by_currency = {}
+
+    def clear_bits(self, slot):
+        keep = ~(1 << slot)
+        for transaction_type in self.by_type:
+            self.by_type[transaction_type] &= keep
+        for currency in self.by_currency:
+            self.by_currency[currency] &= keep
+
+
+class EligibilityIndex:
+    """Which of a customer's accounts qualify for each transaction type.
+
+    Every account gets a slot (bit position) within its customer, and each
+    transaction type and currency has an int bitset of the slots that
+    qualify. The bits of an account are only recomputed when update() sees a
+    different status, currency or operationProfile than last time, so a
+    lookup is an AND of two bitsets and a walk over the set bits.
+    """
+
+    def __init__(self):
+        self._customers = {}
+        self._lock = threading.Lock()
+
+    def update(self, customer_id, account):
+        """Add an account or refresh its bits; returns False when its profile is unchanged"""
+        profile = _profile(account)
+        number = account["accountNumber"]
+        with self._lock:
+            customer = self._customers.setdefault(customer_id, _CustomerAccounts())
+            slot = customer.slot_of.get(number)
+            if slot is None:
+                slot = customer.free.pop() if customer.free else len(customer.slots)
+                if slot == len(customer.slots):
+                    customer.slots.append(account)
+                else:
+                    customer.slots[slot] = account
+                customer.slot_of[number] = slot
+            else:
+                customer.slots[slot] = account
+                if customer.profiles.get(number) == profile:
+                    return False
+                customer.clear_bits(slot)
+            customer.profiles[number] = profile
+            active, currency, flags = profile
+            if active:
+                bit = 1 << slot
+                for transaction_type, allowed in zip(TRANSACTION_FLAGS, flags):
+                    if allowed:
+                        customer.by_type[transaction_type] |= bit
+                customer.by_currency[currency] = customer.by_currency.get(currency, 0) | bit
+            return True
+
+    def remove(self, customer_id, account_number):
+        with self._lock:
+            customer = self._customers.get(customer_id)
+            slot = customer.slot_of.pop(account_number, None) if customer else None
+            if slot is None:
+                return
+            customer.clear_bits(slot)
+            customer.slots[slot] = None
+            customer.profiles.pop(account_number, None)
+            customer.free.append(slot)
+
+    def accounts(self, customer_id):
+        """All indexed accounts of a customer, in slot order"""
+        customer = self._customers.get(customer_id)
+        if customer is None:
+            return []
+        with self._lock:
+            return [account for account in customer.slots if account is not None]
+
+    def eligible(self, customer_id, transaction_type, currency_code=None, exclude=None):
+        """The customer's accounts eligible for transaction_type (and currency), in slot order"""
+        customer = self._customers.get(customer_id)
+        if customer is None or transaction_type not in TRANSACTION_FLAGS:
+            return []
+        with self._lock:
+            mask = customer.by_type[transaction_type]
+            if currency_code:
+                mask &= customer.by_currency.get(currency_code, 0)
+            if exclude in customer.slot_of:
+                mask &= ~(1 << customer.slot_of[exclude])
+            accounts = []
+            while mask:
+                lowest = mask & -mask
+                accounts.append(customer.slots[lowest.bit_length() - 1])
+                mask ^= lowest
+            return accounts
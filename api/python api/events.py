@@ -0,0 +1,263 @@
+"""Event-sourced saving account history with periodic state snapshots"""
+import heapq
+import json
+import logging
+import os
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import deque
+from datetime import date
+
+from ledger import TYPE_DEBIT, TYPE_INTEREST, from_cents, parse_day
+from segments import decode_record
+
+logger = logging.getLogger(__name__)
+
+ACCOUNT_OPENED = 'ACCOUNT_OPENED'
+ACCOUNT_MODIFIED = 'ACCOUNT_MODIFIED'
+INTEREST_PAID = 'INTEREST_PAID'
+MONEY_DEPOSITED = 'MONEY_DEPOSITED'
+MONEY_WITHDRAWN = 'MONEY_WITHDRAWN'
+NOTICE_GIVEN = 'NOTICE_GIVEN'
+ACCOUNT_CLOSED = 'ACCOUNT_CLOSED'
+
+EVENT_TYPES = (ACCOUNT_OPENED, ACCOUNT_MODIFIED, INTEREST_PAID, MONEY_DEPOSITED, MONEY_WITHDRAWN, NOTICE_GIVEN,
+               ACCOUNT_CLOSED)
+
+# A snapshot of the account state is taken every this many events
+SNAPSHOT_INTERVAL = 64
+
+
+def apply_event(state, event):
+    """Fold one event into the account state (in place)"""
+    event_type = event["action"]
+    amount = event.get("amount") or 0.0
+    data = event.get("data") or {}
+    if event_type == ACCOUNT_OPENED:
+        state.update(data)
+        state["status"] = "active"
+        state["openedOn"] = event["date"]
+        state["balance"] = round(amount, 2)
+    elif event_type == ACCOUNT_MODIFIED:
+        state.update(data)
+    elif event_type == INTEREST_PAID:
+        state["balance"] = round(state.get("balance", 0.0) + amount, 2)
+        state["interestPaid"] = round(state.get("interestPaid", 0.0) + amount, 2)
+        state["lastInterestDate"] = event["date"]
+    elif event_type in (MONEY_DEPOSITED, MONEY_WITHDRAWN):
+        state["balance"] = round(state.get("balance", 0.0) + amount, 2)
+    elif event_type == NOTICE_GIVEN:
+        state["noticeAmount"] = round(amount, 2)
+        state["noticeDate"] = event["date"]
+        state["withdrawalDate"] = data.get("withdrawalDate")
+    elif event_type == ACCOUNT_CLOSED:
+        state["status"] = "closed"
+        state["closedOn"] = event["date"]
+    state["version"] = event["sequence"]
+    return state
+
+
+class AccountEventStream:
+    """Append-only event list for one account.
+
+    Events are appended in date order and indexed by date and by type, so
+    history queries are bisects over the matching index. A copy of the folded
+    state is kept every SNAPSHOT_INTERVAL events; the current state is the
+    latest snapshot plus the events after it.
+    """
+
+    def __init__(self, account_number):
+        self.account_number = account_number
+        self.events = []
+        self.day_keys = array('l')
+        self.by_type = {}
+        self.snapshots = [(0, {})]
+
+    def __len__(self):
+        return len(self.events)
+
+    def prepare(self, event_type, event_date, description, amount=None, data=None):
+        """The next event, validated but not yet appended"""
+        if event_type not in EVENT_TYPES:
+            raise ValueError(f"Unknown event type: {event_type}")
+        day = parse_day(event_date)
+        if self.day_keys and day.toordinal() < self.day_keys[-1]:
+            raise ValueError(f"Event dated {day.isoformat()} is older than the last event")
+        return {
+            "sequence": len(self.events) + 1,
+            "date": day.isoformat(),
+            "action": event_type,
+            "description": description,
+            "amount": amount,
+            "data": dict(data) if data else None
+        }
+
+    def append(self, event_type, event_date, description, amount=None, data=None):
+        """Append an event; returns the stored event"""
+        return self.add(self.prepare(event_type, event_date, description, amount, data))
+
+    def add(self, event):
+        """Append an event made by prepare()"""
+        event_type = event["action"]
+        day_key = date.fromisoformat(event["date"]).toordinal()
+        index = len(self.events)
+        self.events.append(event)
+        self.day_keys.append(day_key)
+        type_days, type_indexes = self.by_type.setdefault(event_type, (array('l'), array('l')))
+        type_days.append(day_key)
+        type_indexes.append(index)
+
+        if event["sequence"] % SNAPSHOT_INTERVAL == 0:
+            self.snapshots.append((event["sequence"], self.state()))
+        return event
+
+    def state(self):
+        """Current account state from the latest snapshot plus newer events"""
+        sequence, snapshot = self.snapshots[-1]
+        state = dict(snapshot)
+        for event in self.events[sequence:]:
+            apply_event(state, event)
+        return state
+
+    def query(self, event_types=None, from_date=None, to_date=None):
+        """Events in the inclusive date window, optionally limited to some types"""
+        low = parse_day(from_date).toordinal() if from_date else None
+        high = parse_day(to_date).toordinal() if to_date else None
+
+        def window(days):
+            start = 0 if low is None else bisect_left(days, low)
+            end = len(days) if high is None else bisect_right(days, high)
+            return start, end
+
+        if not event_types:
+            start, end = window(self.day_keys)
+            return self.events[start:end]
+
+        ranges = []
+        for event_type in event_types:
+            if event_type in self.by_type:
+                type_days, type_indexes = self.by_type[event_type]
+                start, end = window(type_days)
+                ranges.append(type_indexes[start:end])
+        return [self.events[index] for index in heapq.merge(*ranges)]
+
+
+def posting_event(tx_type, amount):
+    """Event type of a ledger transaction"""
+    if tx_type == TYPE_INTEREST:
+        return INTEREST_PAID
+    return MONEY_WITHDRAWN if tx_type == TYPE_DEBIT or amount < 0 else MONEY_DEPOSITED
+
+
+class EventStore:
+    """Process-wide registry of account event streams.
+
+    With a path, every event is also appended to that JSON lines file and
+    the streams are replayed from it on start, so history survives a
+    restart like the ledger does. An event is only kept in memory once it
+    is written.
+
+    Ledger postings reach the store through record_posting after the
+    transaction is already booked, so recording them must not fail the
+    posting: an event that cannot be appended is logged and queued, and
+    the queue is retried, in order, on the next posting.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self._streams = {}
+        self._lock = threading.Lock()
+        self._pending = deque()
+        self._pending_lock = threading.Lock()
+        if path is not None and os.path.exists(path):
+            with open(path, 'r') as f:
+                for line in f:
+                    if line.strip():
+                        event = json.loads(line)
+                        self._append(event["accountNumber"], event["action"], event["date"],
+                                     event["description"], event["amount"], event["data"])
+
+    def __iter__(self):
+        return iter(list(self._streams.values()))
+
+    def get(self, account_number):
+        """Get the event stream of an account, or None"""
+        return self._streams.get(account_number)
+
+    def _append(self, account_number, event_type, event_date, description, amount=None, data=None):
+        """Append an event without writing it (caller holds the lock or is loading)"""
+        stream = self._streams.get(account_number)
+        if stream is None:
+            if event_type != ACCOUNT_OPENED:
+                raise KeyError(account_number)
+            stream = self._streams[account_number] = AccountEventStream(account_number)
+        return stream.append(event_type, event_date, description, amount, data)
+
+    def append(self, account_number, event_type, event_date, description, amount=None, data=None):
+        """Append an event, creating the stream when the account is opened"""
+        with self._lock:
+            stream = self._streams.get(account_number)
+            if stream is None:
+                if event_type != ACCOUNT_OPENED:
+                    raise KeyError(account_number)
+                stream = AccountEventStream(account_number)
+            event = stream.prepare(event_type, event_date, description, amount, data)
+            if self.path is not None:
+                with open(self.path, 'a') as f:
+                    f.write(json.dumps({"accountNumber": account_number, **event}) + '\n')
+            self._streams[account_number] = stream
+            return stream.add(event)
+
+    def record_posting(self, account, tx_type, row):
+        """Ledger listener: mirror a transaction of an account with a stream as an event; never raises"""
+        if self.get(account.account_number) is not None:
+            self._pending.append((account.account_number, posting_event(tx_type, row["amount"]), row["valueDate"],
+                                  row["description"], row["amount"]))
+        self.flush_pending()
+
+    def flush_pending(self):
+        """Append queued posting events in order; stops at the first that fails and keeps it queued"""
+        with self._pending_lock:
+            while self._pending:
+                try:
+                    self.append(*self._pending[0])
+                except Exception:
+                    logger.exception("Could not record %s for account %s; %d events queued",
+                                     self._pending[0][1], self._pending[0][0], len(self._pending))
+                    return
+                self._pending.popleft()
+
+    def import_ledger(self, account, data=None):
+        """Open a stream for an account from its ledger: the opening balance, then every transaction"""
+        total = len(account)
+        opened_on = date.fromordinal(account.store.day(0)) if total else date.today()
+        self.append(account.account_number, ACCOUNT_OPENED, opened_on, "Account opened",
+                    from_cents(account.opening_balance), {"accountName": account.account_name, **(data or {})})
+        for record in account.store.records(0, total):
+            fields = decode_record(record)
+            amount = from_cents(fields["amount"])
+            self.append(account.account_number, posting_event(fields["type"], amount),
+                        date.fromordinal(fields["day"]), fields["description"], amount)
+
+
+# Product data of the mock accounts; their events are derived from the seeded ledger
+SEED_ACCOUNT_DATA = {
+    "2018470578": {"productCode": "SAV_ONLINE", "interestRate": 1.1},
+    "2018470579": {"productCode": "SAV_MAXI", "interestRate": 1.1}
+}
+
+
+def create_seeded_event_store(ledger):
+    """Event store kept next to the ledger and fed by its postings.
+
+    On first run the mock account streams are derived from their ledger
+    history, so the folded balance always matches the statement.
+    """
+    store = EventStore(os.path.join(ledger.directory, 'events.jsonl'))
+    for account_number, data in SEED_ACCOUNT_DATA.items():
+        account = ledger.get(account_number)
+        if account is not None and store.get(account_number) is None:
+            store.import_ledger(account, data)
+    ledger.subscribe(store.record_posting)
+    return store
@@ -0,0 +1,130 @@
+"""Streaming statement exports (CSV and CAMT.053) over the ledger"""
+import csv
+import io
+import uuid
+import zlib
+from datetime import datetime
+from xml.sax.saxutils import escape
+
+# Rows are buffered up to roughly this many bytes before a chunk is emitted.
+# The header goes out at once and the first chunks are small, so a download
+# starts immediately; the limit then doubles up to CHUNK_SIZE.
+CHUNK_SIZE = 64 * 1024
+FIRST_CHUNK_SIZE = 1024
+
+# A spreadsheet reads a cell starting with one of these as a formula
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+CSV_COLUMNS = ["transactionDate", "valueDate", "reference", "description", "type", "amount", "balance"]
+
+CAMT053_NAMESPACE = "urn:iso:std:iso:20022:tech:xsd:camt.053.001.02"
+
+
+def _csv_cell(value):
+    """Text cells that a spreadsheet would run as a formula get a leading quote; numbers stay numbers"""
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def csv_chunks(account, from_date=None, to_date=None, chunk_size=CHUNK_SIZE):
+    """Yield the statement as CSV: the header at once, then chunks growing to about chunk_size bytes"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_COLUMNS)
+    yield buffer.getvalue().encode('utf-8')
+    buffer.seek(0)
+    buffer.truncate()
+    limit = min(FIRST_CHUNK_SIZE, chunk_size)
+    for row in account.iter_rows(from_date, to_date):
+        writer.writerow([_csv_cell(row[column]) for column in CSV_COLUMNS])
+        if buffer.tell() >= limit:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+            limit = min(limit * 2, chunk_size)
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+def _camt_amount(amount, currency_code):
+    indicator = 'CRDT' if amount >= 0 else 'DBIT'
+    return f'<Amt Ccy="{currency_code}">{abs(amount):.2f}</Amt><CdtDbtInd>{indicator}</CdtDbtInd>'
+
+
+def _camt_balance(code, amount, day, currency_code):
+    return (f'<Bal><Tp><CdOrPrtry><Cd>{code}</Cd></CdOrPrtry></Tp>'
+            f'{_camt_amount(amount, currency_code)}<Dt><Dt>{day}</Dt></Dt></Bal>\n')
+
+
+def camt053_chunks(account, from_date=None, to_date=None, chunk_size=CHUNK_SIZE):
+    """Yield the statement as a CAMT.053 document: the header at once, then chunks growing to about chunk_size bytes.
+
+    Opening/closing balances and totals come from the ledger's running totals,
+    so the header is written before the first entry is read.
+    """
+    summary = account.summary(from_date, to_date)
+    currency_code = account.currency_code
+    created = datetime.now().strftime("%Y-%m-%dT%H:%M:%S")
+    today = datetime.now().strftime("%Y-%m-%d")
+    message_id = uuid.uuid4().hex[:35]
+    account_id = escape(account.account_number)
+
+    head = [
+        '<?xml version="1.0" encoding="UTF-8"?>\n',
+        f'<Document xmlns="{CAMT053_NAMESPACE}"><BkToCstmrStmt>\n',
+        f'<GrpHdr><MsgId>{message_id}</MsgId><CreDtTm>{created}</CreDtTm></GrpHdr>\n',
+        f'<Stmt><Id>{account_id}-{summary["toDate"] or today}</Id><CreDtTm>{created}</CreDtTm>\n'
+    ]
+    if summary["fromDate"] or summary["toDate"]:
+        head.append(f'<FrToDt><FrDtTm>{summary["fromDate"] or "1900-01-01"}T00:00:00</FrDtTm>'
+                    f'<ToDtTm>{summary["toDate"] or today}T23:59:59</ToDtTm></FrToDt>\n')
+    head.extend([
+        f'<Acct><Id><Othr><Id>{account_id}</Id></Othr></Id><Ccy>{currency_code}</Ccy>'
+        f'<Nm>{escape(account.account_name)}</Nm></Acct>\n',
+        _camt_balance('OPBD', summary["openingBalance"], summary["fromDate"] or today, currency_code),
+        _camt_balance('CLBD', summary["closingBalance"], summary["toDate"] or today, currency_code),
+        f'<TxsSummry><TtlNtries><NbOfNtries>{summary["transactionCount"]}</NbOfNtries></TtlNtries>'
+        f'<TtlCdtNtries><Sum>{summary["totalCredits"]:.2f}</Sum></TtlCdtNtries>'
+        f'<TtlDbtNtries><Sum>{summary["totalDebits"]:.2f}</Sum></TtlDbtNtries></TxsSummry>\n'
+    ])
+
+    yield ''.join(head).encode('utf-8')
+    parts = []
+    size = 0
+    limit = min(FIRST_CHUNK_SIZE, chunk_size)
+    for row in account.iter_rows(from_date, to_date):
+        entry = (
+            f'<Ntry>{_camt_amount(row["amount"], currency_code)}<Sts>BOOK</Sts>'
+            f'<BookgDt><Dt>{row["transactionDate"][:10]}</Dt></BookgDt>'
+            f'<ValDt><Dt>{row["valueDate"]}</Dt></ValDt>'
+            f'<AcctSvcrRef>{escape(row["reference"])}</AcctSvcrRef>'
+            f'<BkTxCd><Prtry><Cd>{row["type"]}</Cd><Issr>DHB</Issr></Prtry></BkTxCd>'
+            f'<NtryDtls><TxDtls><RmtInf><Ustrd>{escape(row["description"])}</Ustrd></RmtInf></TxDtls></NtryDtls>'
+            f'</Ntry>\n'
+        )
+        parts.append(entry)
+        size += len(entry)
+        if size >= limit:
+            yield ''.join(parts).encode('utf-8')
+            parts = []
+            size = 0
+            limit = min(limit * 2, chunk_size)
+    parts.append('</Stmt></BkToCstmrStmt></Document>\n')
+    yield ''.join(parts).encode('utf-8')
+
+
+def gzip_chunks(chunks, level=6):
+    """Gzip-compress a chunk stream on the fly, flushing after every chunk"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+EXPORT_FORMATS = {
+    'csv': (csv_chunks, 'text/csv', 'csv'),
+    'camt053': (camt053_chunks, 'application/xml', 'xml')
+}
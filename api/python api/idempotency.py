@@ -0,0 +1,111 @@
+"""Idempotency-Key support for POST endpoints"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import Response, make_response, request
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+
+
+class IdempotencyCache:
+    """Bounded TTL cache of responses keyed by idempotency key.
+
+    The first request for a key executes; concurrent requests with the same
+    key wait for it and replay its response. Server errors are not stored,
+    so a retry after a 5xx runs again.
+    """
+
+    def __init__(self, max_entries=10000, ttl=3600, wait_timeout=30):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.wait_timeout = wait_timeout
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _expire(self, now):
+        """Drop expired entries and trim to max_entries, oldest first, skipping in-flight keys"""
+        skipped = 0
+        while len(self._entries) > skipped:
+            key, entry = next(iter(self._entries.items()))
+            if entry["expires"] > now and len(self._entries) < self.max_entries:
+                break
+            if entry["response"] is None:
+                self._entries.move_to_end(key)
+                skipped += 1
+                continue
+            del self._entries[key]
+
+    def begin(self, key, fingerprint):
+        """Claim a key. Returns (entry, owner); owner is True when the caller must execute"""
+        with self._lock:
+            now = time.monotonic()
+            self._expire(now)
+            entry = self._entries.get(key)
+            if entry is None or entry["expires"] <= now:
+                entry = self._entries[key] = {
+                    "fingerprint": fingerprint,
+                    "done": threading.Event(),
+                    "response": None,
+                    "expires": now + self.ttl
+                }
+                return entry, True
+            return entry, False
+
+    def complete(self, key, entry, response):
+        """Store the response of an owned key (or drop the key when response is None)"""
+        with self._lock:
+            if response is None:
+                if self._entries.get(key) is entry:
+                    del self._entries[key]
+            else:
+                entry["response"] = response
+                entry["expires"] = time.monotonic() + self.ttl
+                if self._entries.get(key) is entry:
+                    self._entries.move_to_end(key)
+        entry["done"].set()
+
+
+def idempotent(cache, conflict_response):
+    """Decorator replaying stored responses for requests with an Idempotency-Key header.
+
+    conflict_response(description) builds the error response for a key reused
+    with a different request body, or still in flight after wait_timeout.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            idempotency_key = request.headers.get(IDEMPOTENCY_HEADER)
+            if not idempotency_key:
+                return view(*args, **kwargs)
+
+            key = (request.method, request.path, request.headers.get('username', ''), idempotency_key)
+            fingerprint = hashlib.sha256(request.get_data()).hexdigest()
+
+            while True:
+                entry, owner = cache.begin(key, fingerprint)
+                if entry["fingerprint"] != fingerprint:
+                    return conflict_response('Idempotency-Key was reused with a different request')
+                if owner:
+                    break
+                if not entry["done"].wait(cache.wait_timeout):
+                    return conflict_response('A request with this Idempotency-Key is still in progress')
+                if entry["response"] is not None:
+                    body, status, headers = entry["response"]
+                    replay = Response(body, status=status, headers=headers)
+                    replay.headers['Idempotent-Replayed'] = 'true'
+                    return replay
+                # The first attempt failed; try to execute ourselves
+
+            stored = None
+            try:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code < 500 and not response.is_streamed:
+                    stored = (response.get_data(), response.status_code, list(response.headers.items()))
+                return response
+            finally:
+                cache.complete(key, entry, stored)
+        return wrapper
+    return decorator
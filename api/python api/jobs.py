@@ -0,0 +1,199 @@
+"""Background job queue for document generation"""
+import json
+import multiprocessing
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+
+STATUS_QUEUED = 'QUEUED'
+STATUS_RUNNING = 'RUNNING'
+STATUS_COMPLETED = 'COMPLETED'
+STATUS_FAILED = 'FAILED'
+
+# Workers are spawned, not forked: the servers are threaded, and a forked
+# child inherits every lock another thread happened to hold at that moment
+WORKER_CONTEXT = multiprocessing.get_context('spawn')
+
+
+class WorkerPool:
+    """A process pool started on first use and replaced when it breaks.
+
+    A worker that dies mid-task (killed, out of memory) breaks a
+    ProcessPoolExecutor for good; its pending futures fail with
+    BrokenProcessPool and so would every later submit. Here the next
+    submit shuts the broken pool down and starts a fresh one.
+    """
+
+    def __init__(self, max_workers):
+        self.max_workers = max_workers
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def submit(self, function, *args):
+        with self._lock:
+            for attempt in range(2):
+                if self._executor is None:
+                    # Created lazily so importing the app does not start workers
+                    self._executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=WORKER_CONTEXT)
+                try:
+                    return self._executor.submit(function, *args)
+                except BrokenProcessPool:
+                    self._executor.shutdown(wait=False, cancel_futures=True)
+                    self._executor = None
+                    if attempt:
+                        raise
+
+    def shutdown(self, wait=False):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait, cancel_futures=True)
+                self._executor = None
+
+
+class JobQueue:
+    """Runs document renderers in a process pool so request threads stay free.
+
+    Identical requests (same renderer and arguments) submitted while one is
+    still queued or running share the same job. Finished jobs keep their
+    result for result_ttl seconds, and at most max_results finished jobs are
+    retained; the oldest are evicted first.
+    """
+
+    def __init__(self, max_workers=2, max_results=256, result_ttl=600):
+        self.max_workers = max_workers
+        self.max_results = max_results
+        self.result_ttl = result_ttl
+        self._workers = WorkerPool(max_workers)
+        self._jobs = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def submit(self, kind, renderer, *args):
+        """Queue renderer(*args); returns the job status dict"""
+        key = (renderer.__module__, renderer.__name__, json.dumps(args, sort_keys=True, default=str))
+        with self._lock:
+            self._evict()
+            job_id = self._inflight.get(key)
+            if job_id is not None:
+                return self._status(self._jobs[job_id])
+
+            job = {
+                "jobId": uuid.uuid4().hex,
+                "kind": kind,
+                "status": STATUS_QUEUED,
+                "createdAt": datetime.now().isoformat(),
+                "finishedAt": None,
+                "error": None,
+                "result": None,
+                "key": key,
+                "future": None,
+                "expires": None
+            }
+            self._jobs[job["jobId"]] = job
+            self._inflight[key] = job["jobId"]
+            try:
+                future = job["future"] = self._workers.submit(renderer, *args)
+            except Exception as error:
+                # The pool could not take the job (e.g. workers fail to
+                # start); fail it now so later identical requests retry
+                self._inflight.pop(key, None)
+                job["status"] = STATUS_FAILED
+                job["error"] = str(error)
+                job["finishedAt"] = datetime.now().isoformat()
+                job["expires"] = time.monotonic() + self.result_ttl
+                return self._status(job)
+
+        future.add_done_callback(lambda done: self._finish(job["jobId"], done))
+        return self._status(job)
+
+    def _finish(self, job_id, future):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            self._inflight.pop(job["key"], None)
+            error = future.exception()
+            if error is None:
+                job["status"] = STATUS_COMPLETED
+                job["result"] = future.result()
+            else:
+                job["status"] = STATUS_FAILED
+                job["error"] = str(error)
+            job["future"] = None
+            job["finishedAt"] = datetime.now().isoformat()
+            job["expires"] = time.monotonic() + self.result_ttl
+            # Keep finished jobs ordered by completion for eviction
+            self._jobs.move_to_end(job_id)
+            self._evict()
+
+    def _evict(self):
+        """Drop expired results and trim to max_results finished jobs"""
+        now = time.monotonic()
+        finished = [job_id for job_id, job in self._jobs.items() if job["expires"] is not None]
+        excess = len(finished) - self.max_results
+        for job_id in finished:
+            if excess > 0 or self._jobs[job_id]["expires"] <= now:
+                del self._jobs[job_id]
+                excess -= 1
+
+    @staticmethod
+    def _status(job):
+        state = job["status"]
+        if state == STATUS_QUEUED and job["future"] is not None and job["future"].running():
+            state = STATUS_RUNNING
+        status = {
+            "jobId": job["jobId"],
+            "kind": job["kind"],
+            "status": state,
+            "createdAt": job["createdAt"],
+            "finishedAt": job["finishedAt"]
+        }
+        if job["error"]:
+            status["error"] = job["error"]
+        return status
+
+    def status(self, job_id):
+        """Status dict for a job, or None if unknown or evicted"""
+        with self._lock:
+            self._evict()
+            job = self._jobs.get(job_id)
+            return self._status(job) if job else None
+
+    def result(self, job_id):
+        """(filename, mimetype, content) of a completed job, or None"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job["status"] != STATUS_COMPLETED:
+                return None
+            return job["result"]
+
+    def map(self, calls, window):
+        """Yield renderer(*args) for each (renderer, args) in calls, in order.
+
+        At most window calls are queued or running at once; the next one is
+        only submitted after the caller has taken a result, so a slow
+        consumer holds back rendering instead of piling up results.
+        """
+        calls = iter(calls)
+        pending = deque()
+        try:
+            for renderer, args in calls:
+                pending.append(self._workers.submit(renderer, *args))
+                if len(pending) >= window:
+                    break
+            while pending:
+                result = pending.popleft().result()
+                for renderer, args in calls:
+                    pending.append(self._workers.submit(renderer, *args))
+                    break
+                yield result
+        finally:
+            for future in pending:
+                future.cancel()
+
+    def shutdown(self, wait=False):
+        self._workers.shutdown(wait)
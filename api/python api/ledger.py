@@ -0,0 +1,332 @@
+"""Per-account transaction ledger persisted as mmap-backed binary segments"""
+import json
+import math
+import os
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from contextlib import contextmanager
+from datetime import date, datetime, timezone
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to the in-process lock only
+    fcntl = None
+
+from segments import SegmentStore, TYPE_CODES, decode_record
+
+TYPE_CREDIT = 'CREDIT'
+TYPE_DEBIT = 'DEBIT'
+TYPE_INTEREST = 'INTEREST'
+
+# Segment files live here unless DHB_LEDGER_DIR points elsewhere
+LEDGER_DIR = os.environ.get(
+    'DHB_LEDGER_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ledger-data')
+)
+
+
+def to_cents(amount):
+    """Convert a decimal amount to integer cents; raises ValueError for NaN and infinite amounts"""
+    cents = float(amount) * 100
+    if not math.isfinite(cents):
+        raise ValueError(f"Amount is not a finite number: {amount}")
+    return int(round(cents))
+
+
+def from_cents(cents):
+    """Convert integer cents back to a decimal amount"""
+    return round(cents / 100.0, 2)
+
+
+def parse_day(value):
+    """Parse a YYYY-MM-DD (or ISO datetime) string into a date"""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(str(value)[:10], "%Y-%m-%d").date()
+
+
+def _month_key(day):
+    return day.year * 12 + day.month - 1
+
+
+class AccountLedger:
+    """Append-only transaction history for one account.
+
+    Transactions must be appended in value-date order. Each stored record
+    carries the running totals of credits, debits and interest (in cents),
+    so any date-range summary is two binary searches and a handful of
+    subtractions instead of a rescan. Records are read through mmap; the
+    heap only holds the segment maps, not the history.
+
+    Monthly rollups come from an index of where each month with activity
+    starts, extended over new records only, so they need no bisects.
+    """
+
+    def __init__(self, directory, account_number, opening_balance=0.0, account_name="", currency_code="EUR",
+                 notify=None):
+        self.directory = directory
+        self.account_number = account_number
+        self.notify = notify
+        meta_path = os.path.join(directory, 'account.json')
+        if os.path.exists(meta_path):
+            with open(meta_path, 'r') as f:
+                meta = json.load(f)
+        else:
+            os.makedirs(directory, exist_ok=True)
+            meta = {"accountName": account_name, "currencyCode": currency_code}
+            with open(meta_path, 'w') as f:
+                json.dump(meta, f)
+        self.account_name = meta["accountName"]
+        self.currency_code = meta["currencyCode"]
+        self.store = SegmentStore(directory, to_cents(opening_balance))
+        self._month_keys = array('l')
+        self._month_starts = array('l')
+        self._indexed = 0
+        self._month_lock = threading.Lock()
+        self._claim_lock = threading.Lock()
+
+    def __len__(self):
+        self.store.sync()
+        return len(self.store)
+
+    @property
+    def opening_balance(self):
+        """Balance before the first transaction, in cents"""
+        return self.store.opening_balance
+
+    @property
+    def last_value_date(self):
+        """Value date of the latest transaction, or None before the first"""
+        total = len(self)
+        return date.fromordinal(self.store.day(total - 1)) if total else None
+
+    @property
+    def balance(self):
+        """Current balance in cents"""
+        return self.store.cumulative(len(self))[0]
+
+    def append(self, value_date, amount, description, reference, tx_type=None, transaction_date=None):
+        """Append a transaction; returns the stored row"""
+        day = parse_day(value_date)
+        cents = to_cents(amount)
+        if tx_type is None:
+            tx_type = TYPE_CREDIT if cents >= 0 else TYPE_DEBIT
+        posted_at = 0
+        if transaction_date:
+            posted = transaction_date if isinstance(transaction_date, datetime) else datetime.fromisoformat(
+                str(transaction_date).replace('Z', '+00:00'))
+            if posted.tzinfo is None:
+                posted = posted.replace(tzinfo=timezone.utc)
+            posted_at = int(posted.timestamp())
+        record = self.store.append(day.toordinal(), cents, TYPE_CODES[tx_type], reference, description, posted_at)
+        row = self._row(record)
+        if self.notify is not None:
+            self.notify(self, tx_type, row)
+        return row
+
+    @staticmethod
+    def _row(record):
+        """Statement row for a raw segment record"""
+        fields = decode_record(record)
+        value_date = date.fromordinal(fields["day"]).isoformat()
+        posted_at = fields["postedAt"]
+        return {
+            "transactionDate": posted_at.strftime("%Y-%m-%dT%H:%M:%SZ") if posted_at else value_date,
+            "valueDate": value_date,
+            "description": fields["description"],
+            "amount": from_cents(fields["amount"]),
+            "balance": from_cents(fields["balance"]),
+            "type": TYPE_CREDIT if fields["type"] == TYPE_INTEREST else fields["type"],
+            "reference": fields["reference"]
+        }
+
+    def _range(self, from_date=None, to_date=None):
+        """Return the [start, end) transaction index range for a date window"""
+        total = len(self)
+        start = 0 if from_date is None else self.store.bisect_left(parse_day(from_date).toordinal(), total)
+        end = total if to_date is None else self.store.bisect_right(parse_day(to_date).toordinal(), total)
+        return start, max(start, end)
+
+    def summary(self, from_date=None, to_date=None):
+        """Totals for the inclusive date window, computed from the running totals"""
+        start, end = self._range(from_date, to_date)
+        opening, credits_before, debits_before, interest_before = self.store.cumulative(start)
+        closing, credits_after, debits_after, interest_after = self.store.cumulative(end)
+        credits = credits_after - credits_before
+        debits = debits_after - debits_before
+        return {
+            "accountNumber": self.account_number,
+            "currencyCode": self.currency_code,
+            "fromDate": parse_day(from_date).isoformat() if from_date else None,
+            "toDate": parse_day(to_date).isoformat() if to_date else None,
+            "openingBalance": from_cents(opening),
+            "closingBalance": from_cents(closing),
+            "totalCredits": from_cents(credits),
+            "totalDebits": from_cents(debits),
+            "netChange": from_cents(credits - debits),
+            "interestEarned": from_cents(interest_after - interest_before),
+            "transactionCount": end - start
+        }
+
+    def _index_months(self):
+        """Extend the month index over records appended since the last call; returns the record count"""
+        total = len(self)
+        with self._month_lock:
+            for i in range(self._indexed, total):
+                key = _month_key(date.fromordinal(self.store.day(i)))
+                if not self._month_keys or self._month_keys[-1] != key:
+                    self._month_keys.append(key)
+                    self._month_starts.append(i)
+            self._indexed = max(self._indexed, total)
+            return total
+
+    def monthly_rollups(self, from_date=None, to_date=None):
+        """Per-month summaries for every month in the window with activity"""
+        total = self._index_months()
+        keys, starts = self._month_keys, self._month_starts
+        low = bisect_left(keys, _month_key(parse_day(from_date))) if from_date else 0
+        high = bisect_right(keys, _month_key(parse_day(to_date))) if to_date else len(keys)
+        result = []
+        for k in range(low, high):
+            start = starts[k]
+            end = starts[k + 1] if k + 1 < len(starts) else total
+            opening, credits_before, debits_before, interest_before = self.store.cumulative(start)
+            closing, credits_after, debits_after, interest_after = self.store.cumulative(end)
+            credits = credits_after - credits_before
+            debits = debits_after - debits_before
+            result.append({
+                "month": f"{keys[k] // 12:04d}-{keys[k] % 12 + 1:02d}",
+                "openingBalance": from_cents(opening),
+                "closingBalance": from_cents(closing),
+                "totalCredits": from_cents(credits),
+                "totalDebits": from_cents(debits),
+                "netChange": from_cents(credits - debits),
+                "interestEarned": from_cents(interest_after - interest_before),
+                "transactionCount": end - start
+            })
+        return result
+
+    def iter_rows(self, from_date=None, to_date=None):
+        """Yield statement rows oldest first, one record at a time"""
+        start, end = self._range(from_date, to_date)
+        for record in self.store.records(start, end):
+            yield self._row(record)
+
+    @contextmanager
+    def claim(self):
+        """Hold the account exclusively, across threads and processes, for a check-then-append sequence.
+
+        Plain appends do not take this lock; it only orders callers that
+        first look at the history to decide whether to append.
+        """
+        with self._claim_lock, open(os.path.join(self.directory, 'claim.lock'), 'a') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            yield self
+
+    def last_posting(self, reference, since=None):
+        """Value date of the latest transaction with a reference, or None; scans newest first.
+
+        With since, only transactions on or after that date are scanned.
+        """
+        start, end = self._range(since)
+        for record in self.store.records(end - 1, start - 1, -1):
+            if decode_record(record)["reference"] == reference:
+                return date.fromordinal(record[0])
+        return None
+
+    def page(self, page_index, page_size):
+        """Return one page of transactions, newest first; only its records are read"""
+        total = len(self)
+        end = max(total - page_index * page_size, 0)
+        start = max(end - page_size, 0)
+        return [self._row(record) for record in self.store.records(end - 1, start - 1, -1)], total
+
+
+class Ledger:
+    """Process-wide registry of account ledgers, one directory per account.
+
+    Listeners registered with subscribe() are called as
+    listener(account, tx_type, row) after every transaction appended in
+    this process.
+    """
+
+    def __init__(self, directory=LEDGER_DIR):
+        self.directory = directory
+        self._accounts = {}
+        self._listeners = []
+        self._lock = threading.Lock()
+
+    def subscribe(self, listener):
+        self._listeners.append(listener)
+
+    def _notify(self, account, tx_type, row):
+        for listener in self._listeners:
+            listener(account, tx_type, row)
+
+    def _account_dir(self, account_number):
+        return os.path.join(self.directory, account_number)
+
+    def open_account(self, account_number, opening_balance=0.0, account_name="", currency_code="EUR"):
+        """Open the ledger for an account, creating it on disk if needed"""
+        if not account_number.isalnum():
+            raise ValueError(f"Invalid account number: {account_number}")
+        with self._lock:
+            account = self._accounts.get(account_number)
+            if account is None:
+                account = self._accounts[account_number] = AccountLedger(
+                    self._account_dir(account_number), account_number, opening_balance, account_name, currency_code,
+                    self._notify
+                )
+            return account
+
+    def get(self, account_number):
+        """Get the ledger for an account, or None; picks up accounts created by other processes"""
+        account = self._accounts.get(account_number)
+        if account is None and account_number and account_number.isalnum() and os.path.exists(
+                os.path.join(self._account_dir(account_number), 'account.json')):
+            account = self.open_account(account_number)
+        return account
+
+    def append(self, account_number, value_date, amount, description, reference, tx_type=None, transaction_date=None):
+        """Append a transaction to an existing account ledger"""
+        account = self.get(account_number)
+        if account is None:
+            raise KeyError(account_number)
+        return account.append(value_date, amount, description, reference, tx_type, transaction_date)
+
+
+# Seed transactions matching the mock account balances
+SEED_TRANSACTIONS = {
+    "2018470578": {
+        "accountName": "DHB SaveOnline",
+        "openingBalance": 8179.55,
+        "transactions": [
+            ("2025-01-13", 12.50, "Interest credit", "REF003", TYPE_INTEREST),
+            ("2025-01-14", -125.50, "Online purchase", "REF002", TYPE_DEBIT),
+            ("2025-01-15", 2500.00, "Salary payment", "REF001", TYPE_CREDIT)
+        ]
+    },
+    "2018470579": {
+        "accountName": "DHB MaxiSpaar",
+        "openingBalance": 31600.00,
+        "transactions": [
+            ("2025-01-01", 360.23, "Interest credit", "REF004", TYPE_INTEREST)
+        ]
+    }
+}
+
+
+def create_seeded_ledger(directory=LEDGER_DIR):
+    """Open the ledger, seeding the mock account history on first run"""
+    seeded = Ledger(directory)
+    for account_number, seed in SEED_TRANSACTIONS.items():
+        account = seeded.open_account(account_number, seed["openingBalance"], seed["accountName"])
+        if len(account):
+            continue
+        for value_date, amount, description, reference, tx_type in seed["transactions"]:
+            seeded.append(account_number, value_date, amount, description, reference, tx_type)
+    return seeded
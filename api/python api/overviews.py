@@ -0,0 +1,297 @@
+"""Per-customer financial annual overviews, computed from the ledger by a year-end batch.
+
+The batch runs once a year has ended:
+
+    python overviews.py run 2025 customers.csv
+
+(one customer_id,account_number row per account) and stores one JSON file
+per year, which AnnualOverviewStore serves as plain lookups.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import threading
+from array import array
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date, datetime
+
+from jobs import STATUS_COMPLETED, STATUS_FAILED, STATUS_RUNNING, WORKER_CONTEXT
+from ledger import LEDGER_DIR, Ledger, from_cents
+
+# Stored overviews live here unless DHB_OVERVIEW_DIR points elsewhere
+OVERVIEW_DIR = os.environ.get('DHB_OVERVIEW_DIR', os.path.join(LEDGER_DIR, 'annual-overviews'))
+
+# Accounts handed to a worker process per task
+CHUNK_ACCOUNTS = 2000
+
+# Per-account year figures in cents, one array column each
+FIGURES = ('openingBalance', 'closingBalance', 'totalCredits', 'totalDebits', 'interestEarned', 'transactionCount')
+
+
+def _account_figures(account, first_day, last_day):
+    """Year figures of one account from the running totals at both ends of the year"""
+    total = len(account)
+    store = account.store
+    start = store.bisect_left(first_day, total)
+    end = max(start, store.bisect_right(last_day, total))
+    opening, credits_before, debits_before, interest_before = store.cumulative(start)
+    closing, credits_after, debits_after, interest_after = store.cumulative(end)
+    return (opening, closing, credits_after - credits_before, debits_after - debits_before,
+            interest_after - interest_before, end - start)
+
+
+def _totals(columns, start, end):
+    return {name: sum(columns[name][start:end]) for name in FIGURES}
+
+
+def _money(figures):
+    """Cent figures as amounts, keeping the transaction count"""
+    return {name: value if name == 'transactionCount' else from_cents(value) for name, value in figures.items()}
+
+
+def compute_overviews(ledger_dir, customers, year):
+    """{customer id: overview} for [(customer id, account numbers)]; runs in a worker process.
+
+    ledger_dir may also be an open Ledger. Every account costs two bisects
+    and two record reads, however long its history. The figures go into one
+    array column each, ordered by customer and currency, so the totals of a
+    customer are slice sums.
+    """
+    ledger = ledger_dir if isinstance(ledger_dir, Ledger) else Ledger(ledger_dir)
+    first_day, last_day = date(year, 1, 1).toordinal(), date(year, 12, 31).toordinal()
+    columns = {name: array('q') for name in FIGURES}
+    groups = []
+    accounts = {}
+    for customer_id, account_numbers in customers:
+        found = []
+        for account_number in account_numbers:
+            account = ledger.get(account_number)
+            if account is not None:
+                found.append((account.currency_code, account_number, account))
+        found.sort(key=lambda entry: entry[:2])
+        accounts[customer_id] = []
+        for currency_code, account_number, account in found:
+            if not groups or groups[-1][:2] != (customer_id, currency_code):
+                groups.append((customer_id, currency_code, len(columns['openingBalance'])))
+            figures = _account_figures(account, first_day, last_day)
+            for name, value in zip(FIGURES, figures):
+                columns[name].append(value)
+            accounts[customer_id].append({
+                "accountNumber": account_number,
+                "accountName": account.account_name,
+                "currencyCode": currency_code,
+                **_money(dict(zip(FIGURES, figures)))
+            })
+
+    overviews = {customer_id: {
+        "customerId": customer_id,
+        "year": year,
+        "accounts": customer_accounts,
+        "totals": []
+    } for customer_id, customer_accounts in accounts.items()}
+    ends = [start for _, _, start in groups[1:]] + [len(columns['openingBalance'])]
+    for (customer_id, currency_code, start), end in zip(groups, ends):
+        totals = _totals(columns, start, end)
+        overviews[customer_id]["totals"].append({
+            "currencyCode": currency_code,
+            **_money(totals),
+            # Box 3 savings are valued on 1 January of the tax year
+            "taxReferenceDate": date(year, 1, 1).isoformat(),
+            "taxReferenceBalance": from_cents(totals['openingBalance'])
+        })
+    return overviews
+
+
+def _chunks(customer_accounts, size):
+    """Lists of whole customers with about size accounts each"""
+    chunk, count = [], 0
+    for customer_id, account_numbers in customer_accounts.items():
+        chunk.append((customer_id, list(account_numbers)))
+        count += len(account_numbers)
+        if count >= size:
+            yield chunk, count
+            chunk, count = [], 0
+    if chunk:
+        yield chunk, count
+
+
+def run_year_end(ledger_dir, customer_accounts, year, max_workers=2, chunk_accounts=CHUNK_ACCOUNTS, progress=None):
+    """Overviews of every customer for year, computed on a process pool.
+
+    customer_accounts maps customer ids to their account numbers. progress,
+    when given, is called as progress(accounts done, accounts total) after
+    every finished chunk.
+    """
+    total = sum(len(account_numbers) for account_numbers in customer_accounts.values())
+    overviews = {}
+    done = 0
+    if progress is not None:
+        progress(done, total)
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=WORKER_CONTEXT) as pool:
+        futures = {pool.submit(compute_overviews, ledger_dir, chunk, year): count
+                   for chunk, count in _chunks(customer_accounts, chunk_accounts)}
+        for future in as_completed(futures):
+            overviews.update(future.result())
+            done += futures[future]
+            if progress is not None:
+                progress(done, total)
+    return overviews
+
+
+class AnnualOverviewStore:
+    """Stored year-end overviews, one JSON file per year.
+
+    Files are replaced atomically by the batch, possibly from another
+    process; a lookup only re-reads the directory when its modification
+    time changed.
+
+    Given a ledger, last year counts as available before its batch has
+    run: callers passing the customer's account numbers get that overview
+    computed on the spot, for one customer, instead of nothing.
+    """
+
+    def __init__(self, directory=OVERVIEW_DIR, ledger=None):
+        self.directory = directory
+        self.ledger = ledger
+        self._years = {}
+        self._seen = None
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, year):
+        return os.path.join(self.directory, f"{year}.json")
+
+    def _refresh(self):
+        seen = os.stat(self.directory).st_mtime_ns
+        with self._lock:
+            if seen == self._seen:
+                return
+            years = {}
+            for name in os.listdir(self.directory):
+                stem, extension = os.path.splitext(name)
+                if extension == '.json' and stem.isdigit():
+                    with open(os.path.join(self.directory, name), 'r') as f:
+                        years[int(stem)] = json.load(f)
+            self._years = years
+            self._seen = seen
+
+    def put_year(self, year, overviews):
+        """Store the overviews of a year, replacing an earlier run"""
+        stored = {"year": year, "computedAt": datetime.now().isoformat(), "customers": overviews}
+        partial = self._path(year) + '.partial'
+        with open(partial, 'w') as f:
+            json.dump(stored, f)
+        os.replace(partial, self._path(year))
+        with self._lock:
+            self._years[year] = stored
+
+    def computed_at(self, year):
+        self._refresh()
+        stored = self._years.get(year)
+        return stored["computedAt"] if stored else None
+
+    def _pending(self, year, account_numbers):
+        """Whether year is last year, not stored yet and computable for these accounts"""
+        return (self.ledger is not None and bool(account_numbers) and year == date.today().year - 1
+                and year not in self._years)
+
+    def get(self, customer_id, year, account_numbers=None):
+        """Overview of a customer for a year, or None; last year is computed when not stored yet"""
+        self._refresh()
+        stored = self._years.get(year)
+        if stored is None and self._pending(year, account_numbers):
+            return compute_overviews(self.ledger, [(customer_id, account_numbers)], year)[customer_id]
+        return stored["customers"].get(customer_id) if stored else None
+
+    def years(self, customer_id, account_numbers=None):
+        """Years with an overview for the customer, latest first; last year counts when it can be computed"""
+        self._refresh()
+        years = [year for year, stored in self._years.items() if customer_id in stored["customers"]]
+        if self._pending(date.today().year - 1, account_numbers):
+            years.append(date.today().year - 1)
+        return sorted(years, reverse=True)
+
+
+class YearEndBatch:
+    """Runs run_year_end in a background thread and reports its progress per year"""
+
+    def __init__(self, store, ledger_dir, max_workers=2, chunk_accounts=CHUNK_ACCOUNTS):
+        self.store = store
+        self.ledger_dir = ledger_dir
+        self.max_workers = max_workers
+        self.chunk_accounts = chunk_accounts
+        self._runs = {}
+        self._lock = threading.Lock()
+
+    def start(self, year, customer_accounts):
+        """Start the batch for a year unless it is already running; returns its status"""
+        with self._lock:
+            run = self._runs.get(year)
+            if run is not None and run["status"] == STATUS_RUNNING:
+                return dict(run)
+            run = self._runs[year] = {
+                "year": year,
+                "status": STATUS_RUNNING,
+                "customers": len(customer_accounts),
+                "accountsProcessed": 0,
+                "accountsTotal": sum(len(numbers) for numbers in customer_accounts.values()),
+                "startedAt": datetime.now().isoformat(),
+                "finishedAt": None
+            }
+        threading.Thread(target=self._run, args=(run, dict(customer_accounts)), daemon=True).start()
+        return dict(run)
+
+    def _run(self, run, customer_accounts):
+        def progress(done, total):
+            run["accountsProcessed"] = done
+
+        try:
+            overviews = run_year_end(self.ledger_dir, customer_accounts, run["year"], self.max_workers,
+                                     self.chunk_accounts, progress)
+            self.store.put_year(run["year"], overviews)
+            run["status"] = STATUS_COMPLETED
+        except Exception as e:
+            run["status"] = STATUS_FAILED
+            run["error"] = str(e)
+        run["finishedAt"] = datetime.now().isoformat()
+
+    def status(self, year):
+        """Progress of the latest batch for a year, or None"""
+        with self._lock:
+            run = self._runs.get(year)
+            return dict(run) if run else None
+
+
+def _read_customers(csv_path):
+    customer_accounts = {}
+    with open(csv_path, newline='', encoding='utf-8') as source:
+        for row in csv.DictReader(source):
+            customer_accounts.setdefault(row['customer_id'].strip(), []).append(row['account_number'].strip())
+    return customer_accounts
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Year-end annual overview batch')
+    commands = parser.add_subparsers(dest='command', required=True)
+    run = commands.add_parser('run', help=run_year_end.__doc__.splitlines()[0])
+    run.add_argument('year', type=int)
+    run.add_argument('csv_path', help='customer_id,account_number rows')
+    run.add_argument('--ledger-dir', default=LEDGER_DIR)
+    run.add_argument('--overview-dir', default=OVERVIEW_DIR)
+    run.add_argument('--workers', type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    def progress(done, total):
+        print(f'\r{done}/{total} accounts', end='', file=sys.stderr, flush=True)
+
+    overviews = run_year_end(args.ledger_dir, _read_customers(args.csv_path), args.year, args.workers,
+                             progress=progress)
+    print(file=sys.stderr)
+    AnnualOverviewStore(args.overview_dir).put_year(args.year, overviews)
+    print(f'stored {len(overviews)} overviews for {args.year} in {args.overview_dir}')
+
+
+if __name__ == '__main__':
+    main()
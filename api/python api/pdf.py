@@ -0,0 +1,236 @@
+"""Pure-Python PDF writer for text documents, with a content-addressed file cache.
+
+stream_pdf() yields a document page by page, so no more than one page is
+held in memory. PdfStore renders documents to files on a process pool and
+streams each file to the client while the worker is still writing it.
+"""
+import hashlib
+import os
+import threading
+import time
+import zlib
+
+from jobs import WorkerPool
+
+# A4 portrait in points, Courier so statement columns stay aligned
+PAGE_WIDTH = 595
+PAGE_HEIGHT = 842
+MARGIN = 50
+FONT_SIZE = 9
+LEADING = 12
+LINE_CHARS = int((PAGE_WIDTH - 2 * MARGIN) // (0.6 * FONT_SIZE))
+PAGE_LINES = int((PAGE_HEIGHT - 2 * MARGIN) // LEADING) - 2
+
+# Part of every cache key; bump it when the layout above changes
+LAYOUT_VERSION = 1
+
+# Bytes read from a cached or growing file per response chunk
+CHUNK_SIZE = 65536
+
+
+def _escape(text):
+    """Text as a PDF string literal in WinAnsi encoding"""
+    data = text.encode('cp1252', 'replace')
+    return b'(' + data.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)') + b')'
+
+
+def _lines(text_lines):
+    """Lines without line breaks, tabs expanded and wrapped at LINE_CHARS"""
+    for line in text_lines:
+        line = line.rstrip('\r\n').expandtabs(4)
+        while len(line) > LINE_CHARS:
+            yield line[:LINE_CHARS]
+            line = line[LINE_CHARS:]
+        yield line
+
+
+def _pages(text_lines):
+    """Lists of at most PAGE_LINES lines; an empty document still has one page"""
+    page = []
+    empty = True
+    for line in _lines(text_lines):
+        page.append(line)
+        if len(page) == PAGE_LINES:
+            yield page
+            page = []
+            empty = False
+    if page or empty:
+        yield page
+
+
+def _page_content(lines, page_number):
+    top = PAGE_HEIGHT - MARGIN - FONT_SIZE
+    parts = [b'BT\n/F1 %d Tf\n%d TL\n%d %d Td\n' % (FONT_SIZE, LEADING, MARGIN, top)]
+    parts.extend(_escape(line) + b' Tj T*\n' for line in lines)
+    parts.append(b'ET\nBT\n/F1 %d Tf\n%d %d Td\n' % (FONT_SIZE - 1, PAGE_WIDTH - MARGIN - 40, MARGIN // 2))
+    parts.append(_escape(f'Page {page_number}') + b' Tj\nET\n')
+    return zlib.compress(b''.join(parts))
+
+
+def stream_pdf(text_lines, title=''):
+    """Yield the bytes of a PDF showing text_lines, one chunk per page plus trailer.
+
+    Objects 1-4 are the catalog, page tree, font and document info; each
+    page adds a page object and its content stream. The page tree is
+    written last, once the number of pages is known.
+    """
+    offsets = {}
+    position = 0
+
+    def obj(number, body):
+        nonlocal position
+        offsets[number] = position
+        data = b'%d 0 obj\n' % number + body + b'\nendobj\n'
+        position += len(data)
+        return data
+
+    head = b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n'
+    position = len(head)
+    yield head + obj(1, b'<< /Type /Catalog /Pages 2 0 R >>') + obj(
+        3, b'<< /Type /Font /Subtype /Type1 /BaseFont /Courier /Encoding /WinAnsiEncoding >>'
+    ) + obj(4, b'<< /Title ' + _escape(title) + b' /Producer (DHB BANK N.V.) >>')
+
+    kids = []
+    for index, lines in enumerate(_pages(text_lines)):
+        page, content = 5 + 2 * index, 6 + 2 * index
+        kids.append(page)
+        stream = _page_content(lines, index + 1)
+        yield obj(page, b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] /Resources << /Font << /F1 3 0 R >> >> '
+                        b'/Contents %d 0 R >>' % (PAGE_WIDTH, PAGE_HEIGHT, content)) + obj(
+            content, b'<< /Length %d /Filter /FlateDecode >>\nstream\n' % len(stream) + stream + b'\nendstream')
+
+    pages = obj(2, b'<< /Type /Pages /Kids [' + b' '.join(b'%d 0 R' % kid for kid in kids) +
+                b'] /Count %d >>' % len(kids))
+    xref_position = position
+    size = max(offsets) + 1
+    xref = [b'xref\n0 %d\n0000000000 65535 f \n' % size]
+    xref.extend(b'%010d 00000 n \n' % offsets[number] for number in range(1, size))
+    yield pages + b''.join(xref) + (b'trailer\n<< /Size %d /Root 1 0 R /Info 4 0 R >>\nstartxref\n%d\n%%%%EOF\n'
+                                    % (size, xref_position))
+
+
+def write_pdf(path, text, title=''):
+    """Render text to a PDF at path, page by page; readers can follow path + '.partial' meanwhile"""
+    partial = path + '.partial'
+    try:
+        with open(partial, 'wb') as target:
+            for chunk in stream_pdf(text.splitlines(), title):
+                target.write(chunk)
+                target.flush()
+        os.replace(partial, path)
+    except BaseException:
+        if os.path.exists(partial):
+            os.remove(partial)
+        raise
+    return path
+
+
+def pdf_digest(text, title=''):
+    """Content address of the PDF for a text and title"""
+    return hashlib.sha256(f'{LAYOUT_VERSION}\0{title}\0{text}'.encode('utf-8')).hexdigest()
+
+
+class PdfStore:
+    """Content-addressed PDF files in a directory, rendered on a process pool.
+
+    A document is stored under the hash of its text, title and layout
+    version, so repeated downloads are plain file reads. A missing document
+    is written by a worker process page by page; the requests waiting for it
+    stream the partially written file as it grows. At most max_files
+    documents are kept, the least recently written are removed first.
+    """
+
+    def __init__(self, directory, max_workers=2, max_files=512):
+        self.directory = directory
+        self.max_workers = max_workers
+        self.max_files = max_files
+        self._workers = WorkerPool(max_workers)
+        self._rendering = {}
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, digest):
+        return os.path.join(self.directory, f'{digest}.pdf')
+
+    def stream(self, text, title=''):
+        """(digest, iterator of PDF bytes, size or None while it is still being rendered)"""
+        digest = pdf_digest(text, title)
+        path = self.path(digest)
+        with self._lock:
+            future = self._rendering.get(digest)
+            if future is None:
+                try:
+                    source = open(path, 'rb')
+                except FileNotFoundError:
+                    pass
+                else:
+                    return digest, self._read_file(source), os.fstat(source.fileno()).st_size
+                future = self._rendering[digest] = self._workers.submit(write_pdf, path, text, title)
+                started = True
+            else:
+                started = False
+        if started:
+            # Outside the lock: the callback runs at once if the render already finished
+            future.add_done_callback(lambda done: self._finished(digest))
+        return digest, self._read(path, future), None
+
+    def _finished(self, digest):
+        with self._lock:
+            self._rendering.pop(digest, None)
+        self._prune()
+
+    def _prune(self):
+        try:
+            files = [entry for entry in os.scandir(self.directory) if entry.name.endswith('.pdf')]
+        except FileNotFoundError:
+            return
+        if len(files) <= self.max_files:
+            return
+        files.sort(key=lambda entry: entry.stat().st_mtime)
+        for entry in files[:len(files) - self.max_files]:
+            try:
+                os.remove(entry.path)
+            except FileNotFoundError:
+                pass
+
+    @staticmethod
+    def _read_file(source):
+        with source:
+            while True:
+                chunk = source.read(CHUNK_SIZE)
+                if not chunk:
+                    return
+                yield chunk
+
+    def _read(self, path, future):
+        """Yield the file future is writing to path, following its partial file as it grows"""
+        source = None
+        try:
+            while source is None:
+                for candidate in (path + '.partial', path):
+                    try:
+                        source = open(candidate, 'rb')
+                        break
+                    except FileNotFoundError:
+                        continue
+                if source is None:
+                    if future.done():
+                        future.result()
+                        raise FileNotFoundError(path)
+                    time.sleep(0.005)
+            while True:
+                chunk = source.read(CHUNK_SIZE)
+                if chunk:
+                    yield chunk
+                elif future.done():
+                    # Raises if the worker failed; otherwise drain what it wrote last
+                    future.result()
+                    rest = source.read()
+                    if rest:
+                        yield rest
+                    return
+                else:
+                    time.sleep(0.005)
+        finally:
+            if source is not None:
+                source.close()
@@ -0,0 +1,243 @@
+"""Dutch postcode and house-number resolution from a memory-mapped binary file.
+
+The file is generated from a CSV export with:
+
+    python postcodes.py build postcodes.csv postcodes.bin
+
+and opened with PostcodeBook, which maps it and bisects the arrays in place;
+nothing is parsed at startup.
+"""
+import argparse
+import csv
+import mmap
+import re
+import struct
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+
+from autocomplete import PrefixIndex, word_keys
+
+MAGIC = b'DHBPC01\x00'
+# magic, number of ranges, number of strings, size of the string blob in bytes
+HEADER = struct.Struct('<8sIII')
+# Columns of the range table, one uint32 per range each
+RANGE_COLUMNS = ('keys', 'lows', 'highs', 'steps', 'streets', 'cities')
+
+_POSTCODE = re.compile(r'^([1-9][0-9]{3})\s?([A-Za-z]{2})$')
+_HOUSE_NUMBER = re.compile(r'^\s*(\d+)')
+
+
+class InvalidPostcodeError(ValueError):
+    pass
+
+
+def normalize_postcode(value):
+    """Postcode as "1234AB"; raises InvalidPostcodeError"""
+    found = _POSTCODE.match((value or '').strip())
+    if not found:
+        raise InvalidPostcodeError(f'Invalid postcode: {value}')
+    return found.group(1) + found.group(2).upper()
+
+
+def postcode_key(postcode):
+    """Postcode "1234AB" as an int that sorts like the postcode"""
+    return int(postcode[:4]) * 676 + (ord(postcode[4]) - 65) * 26 + ord(postcode[5]) - 65
+
+
+def house_number(value):
+    """Numeric part of a house number such as "12", "12A" or "12-2"; None when there is none"""
+    found = _HOUSE_NUMBER.match(str(value))
+    return int(found.group(1)) if found else None
+
+
+def _runs(numbers):
+    """Sorted house numbers as (low, high, step) runs with step 1 or 2"""
+    runs = []
+    for number in numbers:
+        if runs:
+            low, high, step = runs[-1]
+            if step is None and number - high in (1, 2):
+                runs[-1] = (low, number, number - high)
+                continue
+            if step is not None and number - high == step:
+                runs[-1] = (low, number, step)
+                continue
+        runs.append((number, number, None))
+    return [(low, high, step or 1) for low, high, step in runs]
+
+
+def build_postcode_file(csv_path, out_path):
+    """Write the binary postcode file for a CSV; returns the number of ranges.
+
+    The CSV has a header with postcode, street and city columns plus either
+    house_number (one row per address) or number_from and number_to (one row
+    per range, with an optional step column, 2 for one side of the street).
+    """
+    numbers = {}
+    ranges = []
+    with open(csv_path, newline='', encoding='utf-8') as source:
+        for row in csv.DictReader(source):
+            key = postcode_key(normalize_postcode(row['postcode']))
+            street, city = row['street'].strip(), row['city'].strip()
+            if row.get('number_from'):
+                step = int(row.get('step') or 1)
+                ranges.append((key, street, city, house_number(row['number_from']),
+                               house_number(row.get('number_to') or row['number_from']), step))
+            else:
+                number = house_number(row['house_number'])
+                if number is not None:
+                    numbers.setdefault((key, street, city), set()).add(number)
+    for (key, street, city), found in numbers.items():
+        ranges.extend((key, street, city, low, high, step) for low, high, step in _runs(sorted(found)))
+    ranges.sort()
+
+    strings = {}
+    columns = {name: array('I') for name in RANGE_COLUMNS}
+    for key, street, city, low, high, step in ranges:
+        columns['keys'].append(key)
+        columns['lows'].append(low)
+        columns['highs'].append(high)
+        columns['steps'].append(step)
+        columns['streets'].append(strings.setdefault(street, len(strings)))
+        columns['cities'].append(strings.setdefault(city, len(strings)))
+
+    blob = bytearray()
+    offsets = array('I', [0])
+    for text in strings:
+        blob += text.encode('utf-8')
+        offsets.append(len(blob))
+
+    with open(out_path, 'wb') as target:
+        target.write(HEADER.pack(MAGIC, len(ranges), len(strings), len(blob)))
+        for table in (*(columns[name] for name in RANGE_COLUMNS), offsets):
+            if sys.byteorder != 'little':
+                table.byteswap()
+            target.write(table.tobytes())
+        target.write(blob)
+    return len(ranges)
+
+
+class PostcodeBook:
+    """Read-only postcode table over a memory-mapped file.
+
+    Ranges are sorted by postcode key, so the ranges of a postcode are the
+    slice between two bisects on the key column. Each column is a uint32
+    view straight into the mapping.
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as source:
+            self._map = mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ)
+        self._views = []
+        magic, count, string_count, blob_size = HEADER.unpack_from(self._map)
+        if magic != MAGIC:
+            raise ValueError(f'Not a postcode file: {path}')
+        self.count = count
+        position = HEADER.size
+        for name in RANGE_COLUMNS:
+            setattr(self, '_' + name, self._column(position, count))
+            position += 4 * count
+        self._offsets = self._column(position, string_count + 1)
+        position += 4 * (string_count + 1)
+        self._blob = self._view(position, blob_size)
+
+    def _view(self, position, size):
+        view = memoryview(self._map)[position:position + size]
+        self._views.append(view)
+        return view
+
+    def _column(self, position, count):
+        view = self._view(position, 4 * count)
+        if sys.byteorder == 'little':
+            column = view.cast('I')
+            self._views.append(column)
+            return column
+        table = array('I', view)
+        table.byteswap()
+        return table
+
+    def __len__(self):
+        return self.count
+
+    def close(self):
+        # The mapping can only be closed once no view into it is left
+        for view in reversed(self._views):
+            view.release()
+        self._map.close()
+
+    def string(self, index):
+        return str(self._blob[self._offsets[index]:self._offsets[index + 1]], 'utf-8')
+
+    def _slice(self, postcode):
+        key = postcode_key(normalize_postcode(postcode))
+        return range(bisect_left(self._keys, key), bisect_right(self._keys, key))
+
+    def streets(self, postcode):
+        """[{street, city, postCode, houseNumbers}] for a postcode, one entry per street"""
+        found = {}
+        for position in self._slice(postcode):
+            entry = found.setdefault((self._streets[position], self._cities[position]), [])
+            entry.extend(range(self._lows[position], self._highs[position] + 1, self._steps[position]))
+        postcode = normalize_postcode(postcode)
+        return [{
+            "street": self.string(street),
+            "city": self.string(city),
+            "postCode": postcode,
+            "houseNumbers": [str(number) for number in sorted(numbers)]
+        } for (street, city), numbers in found.items()]
+
+    def places(self):
+        """{(street, city): number of addresses} over the whole table"""
+        counts = {}
+        for position in range(self.count):
+            key = (self._streets[position], self._cities[position])
+            addresses = (self._highs[position] - self._lows[position]) // self._steps[position] + 1
+            counts[key] = counts.get(key, 0) + addresses
+        return {(self.string(street), self.string(city)): addresses
+                for (street, city), addresses in counts.items()}
+
+    def resolve(self, postcode, house_no):
+        """(street, city) of an address, or None when it does not exist"""
+        number = house_number(house_no)
+        if number is None:
+            return None
+        for position in self._slice(postcode):
+            low, step = self._lows[position], self._steps[position]
+            if low <= number <= self._highs[position] and (number - low) % step == 0:
+                return self.string(self._streets[position]), self.string(self._cities[position])
+        return None
+
+
+def address_indexes(book):
+    """(street index, city index) for type-ahead, ranked by number of addresses.
+
+    Streets are one item per street and city, found by any word of the
+    street name; cities by any word of the city name.
+    """
+    places = book.places()
+    cities = {}
+    for (street, city), addresses in places.items():
+        cities[city] = cities.get(city, 0) + addresses
+    streets = PrefixIndex()
+    streets.add_many(((f"{street}|{city}", {"street": street, "city": city, "addresses": addresses},
+                       word_keys(street), addresses) for (street, city), addresses in places.items()))
+    city_index = PrefixIndex()
+    city_index.add_many(((city, {"city": city, "addresses": addresses}, word_keys(city), addresses)
+                         for city, addresses in cities.items()))
+    return streets, city_index
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Postcode file tools')
+    commands = parser.add_subparsers(dest='command', required=True)
+    build = commands.add_parser('build', help=build_postcode_file.__doc__.splitlines()[0])
+    build.add_argument('csv_path')
+    build.add_argument('out_path')
+    args = parser.parse_args()
+    count = build_postcode_file(args.csv_path, args.out_path)
+    print(f'wrote {count} ranges to {args.out_path}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,269 @@
+"""Scheduler executing future payments and standing orders at their due date"""
+import calendar as month_calendar
+import heapq
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+
+STATUS_SCHEDULED = 'SCHEDULED'
+STATUS_EXECUTED = 'EXECUTED'
+STATUS_FAILED = 'FAILED'
+STATUS_CANCELLED = 'CANCELLED'
+
+# Fields of a payment returned to clients (FuturePaymentResDto)
+PUBLIC_FIELDS = (
+    "reference", "transactionType", "sourceIBAN", "sourceAccountNumber", "targetIBAN",
+    "targetAccountNumber", "targetName", "paymentType", "period", "entryDate",
+    "nextPaymentDate", "endDate", "currencyCode", "amount", "description", "status"
+)
+
+# The heap is rebuilt once more than this share of its entries are cancelled
+COMPACT_RATIO = 0.5
+
+# Outcomes kept per payment; a long-running standing order keeps only its latest
+MAX_EXECUTIONS = 24
+
+
+def occurrence_date(start, period, index):
+    """Nominal date of the index-th occurrence (0-based) of a payment starting on start.
+
+    Monthly orders keep the start day of month, clamped to the month end, so a
+    payment starting on the 31st runs on the last day of shorter months.
+    """
+    if period == 'everyWeek':
+        return start + timedelta(weeks=index)
+    if period == 'everyMonth':
+        months = start.month - 1 + index
+        year, month = start.year + months // 12, months % 12 + 1
+        return date(year, month, min(start.day, month_calendar.monthrange(year, month)[1]))
+    return start
+
+
+class PaymentScheduler:
+    """Min-heap of pending payment occurrences keyed by execution date.
+
+    Only the next occurrence of a standing order is on the heap; executing it
+    pushes the one after, so a recurring payment costs one heap entry no
+    matter how long it runs. Cancelled payments are skipped when popped
+    instead of being searched for, and the heap is compacted once they make
+    up more than COMPACT_RATIO of it.
+
+    Executed, failed and cancelled payments stay listed for finished_ttl
+    seconds, and at most max_finished of them are kept; the oldest are
+    dropped first.
+
+    execute(payment, execution_date) books one occurrence and raises to mark
+    it failed. calendar rolls nominal dates to business days.
+
+    The schedule lives in this process only. When several server processes
+    schedule the same payment, each runs it, so execute must skip an
+    occurrence another process already booked (the servers check the
+    ledger under AccountLedger.claim()).
+    """
+
+    def __init__(self, execute, calendar=None, max_finished=10000, finished_ttl=7 * 24 * 3600):
+        self.execute = execute
+        self.calendar = calendar
+        self.max_finished = max_finished
+        self.finished_ttl = finished_ttl
+        self._heap = []
+        self._payments = {}
+        self._by_customer = {}
+        self._finished = OrderedDict()
+        self._sequence = 0
+        self._stale = 0
+        self._lock = threading.Lock()
+        self._run_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def __len__(self):
+        return len(self._payments)
+
+    def _execution_day(self, payment, nominal):
+        if self.calendar is None:
+            return nominal
+        return self.calendar.next_business_day(nominal, payment["countryCode"])
+
+    def _push(self, payment):
+        """Queue the current occurrence of a payment (caller holds the lock)"""
+        nominal = occurrence_date(payment["_start"], payment["period"], payment["_occurrence"])
+        if payment["_end"] is not None and nominal > payment["_end"]:
+            return False
+        payment["nextPaymentDate"] = nominal.isoformat()
+        execution = self._execution_day(payment, nominal)
+        self._sequence += 1
+        heapq.heappush(self._heap, (execution.toordinal(), self._sequence,
+                                    payment["reference"], payment["_occurrence"]))
+        return True
+
+    def schedule(self, customer_id, source_account_number, target_iban, amount, start_date,
+                 period='oneOff', end_date=None, payment_type='future', currency_code='EUR',
+                 description='', source_iban=None, target_account_number=None, target_name=None,
+                 transaction_type='payment', country_code='NL', reference=None):
+        """Add a payment; returns its public dict. amount is in cents."""
+        start = start_date if isinstance(start_date, date) else date.fromisoformat(start_date)
+        end = end_date if end_date is None or isinstance(end_date, date) else date.fromisoformat(end_date)
+        payment = {
+            "reference": reference or f"FP{uuid.uuid4().hex[:12].upper()}",
+            "customerId": customer_id,
+            "transactionType": transaction_type,
+            "sourceIBAN": source_iban,
+            "sourceAccountNumber": source_account_number,
+            "targetIBAN": target_iban,
+            "targetAccountNumber": target_account_number,
+            "targetName": target_name,
+            "paymentType": payment_type,
+            "period": period,
+            "entryDate": datetime.now().isoformat(),
+            "nextPaymentDate": None,
+            "endDate": end.isoformat() if end else None,
+            "currencyCode": currency_code,
+            "amount": amount / 100,
+            "description": description,
+            "status": STATUS_SCHEDULED,
+            "countryCode": country_code,
+            "executions": [],
+            "_cents": amount,
+            "_start": start,
+            "_end": end,
+            "_occurrence": 0
+        }
+        with self._lock:
+            if payment["reference"] in self._payments:
+                raise ValueError(f"Duplicate payment reference: {payment['reference']}")
+            if not self._push(payment):
+                raise ValueError("Payment has no occurrence before its end date")
+            self._payments[payment["reference"]] = payment
+            self._by_customer.setdefault(customer_id, {})[payment["reference"]] = None
+            earliest = self._heap[0][2] == payment["reference"]
+        if earliest:
+            # Due sooner than whatever the runner is sleeping towards
+            self._wake.set()
+        return self.public(payment)
+
+    def cancel(self, customer_id, reference):
+        """Cancel a scheduled payment of a customer; returns its public dict, or None"""
+        with self._lock:
+            payment = self._payments.get(reference)
+            if payment is None or payment["customerId"] != customer_id or payment["status"] != STATUS_SCHEDULED:
+                return None
+            payment["status"] = STATUS_CANCELLED
+            payment["nextPaymentDate"] = None
+            self._stale += 1
+            if self._stale > len(self._heap) * COMPACT_RATIO:
+                self._compact()
+            self._retire(payment)
+            return self.public(payment)
+
+    def _retire(self, payment):
+        """Keep a finished payment for finished_ttl seconds (caller holds the lock)"""
+        self._finished[payment["reference"]] = time.monotonic() + self.finished_ttl
+        self._evict()
+
+    def _evict(self):
+        """Forget expired finished payments and trim to max_finished (caller holds the lock)"""
+        now = time.monotonic()
+        while self._finished:
+            reference, expires = next(iter(self._finished.items()))
+            if expires > now and len(self._finished) <= self.max_finished:
+                break
+            del self._finished[reference]
+            payment = self._payments.pop(reference)
+            customer = self._by_customer.get(payment["customerId"])
+            if customer is not None:
+                customer.pop(reference, None)
+                if not customer:
+                    del self._by_customer[payment["customerId"]]
+
+    def _compact(self):
+        """Drop heap entries of cancelled payments (caller holds the lock)"""
+        self._heap = [entry for entry in self._heap if entry[2] in self._payments
+                      and self._payments[entry[2]]["status"] == STATUS_SCHEDULED]
+        heapq.heapify(self._heap)
+        self._stale = 0
+
+    def get(self, reference):
+        payment = self._payments.get(reference)
+        return self.public(payment) if payment else None
+
+    def list(self, customer_id, status=STATUS_SCHEDULED):
+        """Payments of a customer ordered by next payment date"""
+        with self._lock:
+            self._evict()
+            payments = [self._payments[reference] for reference in self._by_customer.get(customer_id, ())]
+            selected = [self.public(payment) for payment in payments
+                        if status is None or payment["status"] == status]
+        selected.sort(key=lambda payment: (payment["nextPaymentDate"] or "", payment["entryDate"]))
+        return selected
+
+    @staticmethod
+    def public(payment):
+        return {field: payment[field] for field in PUBLIC_FIELDS}
+
+    def next_due(self):
+        """Execution date of the earliest pending occurrence, or None"""
+        with self._lock:
+            return date.fromordinal(self._heap[0][0]) if self._heap else None
+
+    def _pop_due(self, today):
+        """Next live occurrence due on or before today, or None"""
+        with self._lock:
+            while self._heap and self._heap[0][0] <= today:
+                day, _, reference, occurrence = heapq.heappop(self._heap)
+                payment = self._payments.get(reference)
+                if payment is None or payment["status"] != STATUS_SCHEDULED or payment["_occurrence"] != occurrence:
+                    self._stale = max(self._stale - 1, 0)
+                    continue
+                return payment, date.fromordinal(day)
+            return None
+
+    def run_due(self, today=None):
+        """Execute every occurrence due on or before today; returns how many ran"""
+        today = (today or date.today()).toordinal()
+        count = 0
+        with self._run_lock:
+            while True:
+                due = self._pop_due(today)
+                if due is None:
+                    return count
+                payment, execution = due
+                try:
+                    self.execute(payment, execution)
+                    outcome = {"date": execution.isoformat(), "status": STATUS_EXECUTED}
+                except Exception as e:
+                    outcome = {"date": execution.isoformat(), "status": STATUS_FAILED, "error": str(e)}
+                count += 1
+                with self._lock:
+                    payment["executions"].append(outcome)
+                    del payment["executions"][:-MAX_EXECUTIONS]
+                    if payment["status"] != STATUS_SCHEDULED:
+                        continue
+                    payment["_occurrence"] += 1
+                    if payment["period"] == 'oneOff' or not self._push(payment):
+                        payment["status"] = outcome["status"] if payment["period"] == 'oneOff' else STATUS_EXECUTED
+                        payment["nextPaymentDate"] = None
+                        self._retire(payment)
+
+    def start(self):
+        """Start the background runner thread (once)"""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run_forever, name='payment-scheduler', daemon=True)
+        self._thread.start()
+
+    def _run_forever(self):
+        while True:
+            self._wake.clear()
+            self.run_due()
+            next_due = self.next_due()
+            if next_due is None:
+                timeout = 3600
+            else:
+                wake_at = datetime.combine(next_due, datetime.min.time())
+                # Re-check at least hourly so clock changes are picked up
+                timeout = min(max((wake_at - datetime.now()).total_seconds(), 0), 3600)
+            self._wake.wait(timeout)
@@ -0,0 +1,249 @@
+"""Fixed-width binary transaction segments read through mmap"""
+import mmap
+import os
+import struct
+import threading
+from datetime import datetime, timezone
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to the in-process lock only
+    fcntl = None
+
+# One record per transaction. The running credit/debit/interest totals are
+# stored in the record itself, so range sums only ever read two records.
+#   day ordinal, amount, balance, cum credits, cum debits, cum interest,
+#   posted-at epoch seconds, type code, reference, description
+RECORD = struct.Struct('<iqqqqqqB16s59s')
+RECORD_SIZE = RECORD.size
+DAY = struct.Struct('<i')
+
+HEADER = struct.Struct('<8sIIq')
+HEADER_SIZE = 64
+MAGIC = b'DHBSEG01'
+VERSION = 1
+
+# 8192 records of 128 bytes = 1 MiB per segment file
+SEGMENT_RECORDS = 8192
+
+# Segment files grow by this many zeroed records at a time; readers only remap when a file grows
+GROW_RECORDS = 512
+
+TYPE_CODES = {'CREDIT': 0, 'DEBIT': 1, 'INTEREST': 2}
+TYPE_NAMES = {code: name for name, code in TYPE_CODES.items()}
+
+
+def _fixed(text, size):
+    """Encode text as UTF-8, truncated to size bytes on a character boundary"""
+    raw = (text or '').encode('utf-8')
+    if len(raw) <= size:
+        return raw
+    return raw[:size].decode('utf-8', 'ignore').encode('utf-8')
+
+
+def _text(raw):
+    """Decode a NUL padded fixed-width field"""
+    return raw.rstrip(b'\0').decode('utf-8', 'ignore')
+
+
+class Segment:
+    """One segment file, mapped read-only.
+
+    The file is extended GROW_RECORDS zeroed records at a time, so its size
+    is its capacity. A record's day ordinal is never 0 and is written last,
+    so the record count is the first slot whose day is still 0. Appends
+    show up through the shared page cache; the file is only remapped when
+    it grew.
+    """
+
+    def __init__(self, path, index):
+        self.path = path
+        self.index = index
+        self.map = None
+        self.capacity = 0
+        self.count = 0
+        self.opening_balance = 0
+        self.refresh()
+
+    def refresh(self):
+        """Pick up records appended since the last look, remapping only if the file grew"""
+        size = os.path.getsize(self.path)
+        capacity = min(max((size - HEADER_SIZE) // RECORD_SIZE, 0), SEGMENT_RECORDS)
+        if capacity != self.capacity or self.map is None:
+            with open(self.path, 'rb') as f:
+                new_map = mmap.mmap(f.fileno(), HEADER_SIZE + capacity * RECORD_SIZE, access=mmap.ACCESS_READ)
+            magic, version, _, opening_balance = HEADER.unpack_from(new_map, 0)
+            if magic != MAGIC or version != VERSION:
+                new_map.close()
+                raise ValueError(f"{self.path} is not a ledger segment")
+            # Readers may still hold the previous map; it is released when they drop it
+            self.map = new_map
+            self.capacity = capacity
+            self.opening_balance = opening_balance
+        # Filled slots come first; bisect for the first empty one
+        lo, hi = self.count, self.capacity
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.day(mid):
+                lo = mid + 1
+            else:
+                hi = mid
+        self.count = lo
+
+    def day(self, i):
+        return DAY.unpack_from(self.map, HEADER_SIZE + i * RECORD_SIZE)[0]
+
+    def record(self, i):
+        return RECORD.unpack_from(self.map, HEADER_SIZE + i * RECORD_SIZE)
+
+
+class SegmentStore:
+    """All segments of one account, in append order.
+
+    Every segment but the last is full and immutable. The mapped pages live
+    in the OS page cache, so worker processes opening the same directory
+    share them without copying, and paging only faults in the pages read.
+    """
+
+    def __init__(self, directory, opening_balance=0):
+        self.directory = directory
+        self.segments = []
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        if not os.path.exists(self._path(0)):
+            self._create_segment(0, opening_balance)
+        self.sync()
+
+    def _path(self, index):
+        return os.path.join(self.directory, f"{index:06d}.seg")
+
+    def _create_segment(self, index, opening_balance):
+        """Write the header to a private file, then link it into place so no reader sees it half written"""
+        header = HEADER.pack(MAGIC, VERSION, index, opening_balance).ljust(HEADER_SIZE, b'\0')
+        partial = f"{self._path(index)}.{os.getpid()}.{threading.get_ident()}.partial"
+        with open(partial, 'wb') as f:
+            f.write(header)
+            f.truncate(HEADER_SIZE + GROW_RECORDS * RECORD_SIZE)
+        try:
+            os.link(partial, self._path(index))
+        except FileExistsError:
+            pass  # another process created it first
+        finally:
+            os.remove(partial)
+
+    def sync(self):
+        """Pick up records and segments appended by this or another process"""
+        with self._lock:
+            self._sync()
+
+    def _sync(self):
+        # Callers hold _lock, so two threads never append the same Segment
+        if self.segments:
+            self.segments[-1].refresh()
+        while os.path.exists(self._path(len(self.segments))):
+            if self.segments:
+                self.segments[-1].refresh()
+            self.segments.append(Segment(self._path(len(self.segments)), len(self.segments)))
+
+    @property
+    def opening_balance(self):
+        return self.segments[0].opening_balance
+
+    def __len__(self):
+        return (len(self.segments) - 1) * SEGMENT_RECORDS + self.segments[-1].count
+
+    def day(self, i):
+        return self.segments[i // SEGMENT_RECORDS].day(i % SEGMENT_RECORDS)
+
+    def record(self, i):
+        return self.segments[i // SEGMENT_RECORDS].record(i % SEGMENT_RECORDS)
+
+    def records(self, start, end, step=1):
+        """Yield raw records for the index range"""
+        for i in range(start, end, step):
+            yield self.record(i)
+
+    def bisect_left(self, day, hi=None):
+        lo, hi = 0, len(self) if hi is None else hi
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.day(mid) < day:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def bisect_right(self, day, hi=None):
+        lo, hi = 0, len(self) if hi is None else hi
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if day < self.day(mid):
+                hi = mid
+            else:
+                lo = mid + 1
+        return lo
+
+    def cumulative(self, i):
+        """(balance, credits, debits, interest) in cents before record i"""
+        if i <= 0:
+            return self.opening_balance, 0, 0, 0
+        record = self.record(i - 1)
+        return record[2], record[3], record[4], record[5]
+
+    def append(self, day, amount, tx_type, reference, description, posted_at=0):
+        """Append one record; returns it as stored"""
+        with self._lock:
+            while True:
+                self._sync()
+                tail = self.segments[-1]
+                if tail.count >= SEGMENT_RECORDS:
+                    self._create_segment(len(self.segments), self.opening_balance)
+                    continue
+                with open(tail.path, 'r+b', buffering=0) as f:
+                    if fcntl is not None:
+                        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+                    try:
+                        # Another process may have appended since we synced
+                        tail.refresh()
+                        if tail.count >= SEGMENT_RECORDS:
+                            continue
+                        if tail.count >= tail.capacity:
+                            f.truncate(HEADER_SIZE + min(tail.capacity + GROW_RECORDS, SEGMENT_RECORDS) * RECORD_SIZE)
+                        count = len(self)
+                        if count and day < self.day(count - 1):
+                            raise ValueError("Ledger records must be appended in date order")
+                        balance, credits, debits, interest = self.cumulative(count)
+                        if amount > 0:
+                            credits += amount
+                        else:
+                            debits -= amount
+                        if tx_type == TYPE_CODES['INTEREST'] and amount > 0:
+                            interest += amount
+                        record = (day, amount, balance + amount, credits, debits, interest, posted_at,
+                                  tx_type, _fixed(reference, 16), _fixed(description, 59))
+                        # The day goes in last: until then the slot still reads as empty
+                        packed = RECORD.pack(*record)
+                        offset = HEADER_SIZE + tail.count * RECORD_SIZE
+                        f.seek(offset + DAY.size)
+                        f.write(packed[DAY.size:])
+                        f.seek(offset)
+                        f.write(packed[:DAY.size])
+                    finally:
+                        if fcntl is not None:
+                            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+                tail.refresh()
+                return record
+
+
+def decode_record(record):
+    """Unpack a raw record into its fields with text decoded"""
+    day, amount, balance, credits, debits, interest, posted_at, tx_type, reference, description = record
+    return {
+        "day": day,
+        "amount": amount,
+        "balance": balance,
+        "type": TYPE_NAMES.get(tx_type, 'CREDIT'),
+        "reference": _text(reference),
+        "description": _text(description),
+        "postedAt": datetime.fromtimestamp(posted_at, timezone.utc) if posted_at else None
+    }
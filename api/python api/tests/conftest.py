@@ -0,0 +1,5 @@
+"""The server modules live in the parent directory and import each other by name"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,44 @@
+import pytest
+
+from accounts import INDEX_CLOSED, INDEX_OPENED, AccountIndex
+
+
+def _account(number, iban):
+    return {"accountNumber": number, "IBAN": iban}
+
+
+def test_lookups_by_number_and_normalized_iban():
+    index = AccountIndex([_account("2018470578", "NL44DHBN2018470578")])
+    account = index.get("2018470578")
+    assert index.get("nl44 dhbn 2018 4705 78") is account
+    assert index.by_iban("NL44DHBN2018470578") is index.by_number("2018470578") is account
+    assert index.get("") is None and index.get("2018470579") is None
+    assert len(index) == 1
+
+
+def test_duplicates_are_rejected():
+    index = AccountIndex([_account("2018470578", "NL44DHBN2018470578")])
+    with pytest.raises(ValueError):
+        index.add(_account("2018470599", "NL44 DHBN 2018 4705 78"))
+    with pytest.raises(ValueError):
+        index.add(_account("2018470578", "NL17DHBN2018470579"))
+    assert len(index) == 1
+
+
+def test_close_notifies_listeners_and_frees_the_keys():
+    index = AccountIndex()
+    events = []
+    index.subscribe(lambda event, account: events.append((event, account["accountNumber"])))
+    index.add(_account("2018470578", "NL44DHBN2018470578"))
+    assert index.close("NL44DHBN2018470578")["accountNumber"] == "2018470578"
+    assert index.close("2018470578") is None
+    assert index.get("2018470578") is None
+    assert events == [(INDEX_OPENED, "2018470578"), (INDEX_CLOSED, "2018470578")]
+    index.add(_account("2018470578", "NL44DHBN2018470578"))
+
+
+def test_allocated_numbers_are_never_reused():
+    index = AccountIndex([_account("2018470578", "NL44DHBN2018470578"), _account(None, "NL91ABNA0417164300")])
+    assert index.allocate_account_number() == "2018470579"
+    index.close("2018470578")
+    assert index.allocate_account_number() == "2018470580"
@@ -0,0 +1,60 @@
+import random
+
+import pytest
+
+import autocomplete
+from autocomplete import PrefixIndex, fold, search_query, word_keys
+
+WORDS = ("lucy", "lavender", "lars", "müller", "mulder", "muñoz", "de vries", "dijkstra", "nl44", "nl91", "nl17")
+
+
+def _naive(entries, prefix, limit):
+    """Rank by weight, then by the smallest (key, item id) matching the prefix"""
+    prefix = fold(prefix)
+    ranked = []
+    for item_id, (value, keys, weight) in entries.items():
+        matching = [(key, item_id) for key in map(fold, keys) if key and key.startswith(prefix)]
+        if matching:
+            ranked.append(((-weight, min(matching)), value))
+    return [value for _, value in sorted(ranked)[:limit]]
+
+
+@pytest.mark.parametrize("weighted", [False, True])
+def test_search_matches_scanning_every_item(weighted, monkeypatch):
+    monkeypatch.setattr(autocomplete, 'MEMO_THRESHOLD', 8)
+    rng = random.Random(weighted)
+    index = PrefixIndex()
+    entries = {}
+    for step in range(1500):
+        item_id = f"item{rng.randrange(300):03d}"
+        if rng.random() < 0.2:
+            index.remove(item_id)
+            entries.pop(item_id, None)
+            continue
+        keys = [f"{rng.choice(WORDS)} {rng.choice(WORDS)}" for _ in range(rng.randint(1, 3))]
+        weight = rng.randrange(4) if weighted else 0
+        index.add(item_id, {"id": item_id, "step": step}, keys, weight)
+        entries[item_id] = ({"id": item_id, "step": step}, keys, weight)
+        if step % 25 == 0:
+            for prefix in ("l", "la", "mu", "MÜ", "de v", "nl4", "z", ""):
+                for limit in (1, 5, 50):
+                    assert index.search(prefix, limit) == (_naive(entries, prefix, limit) if prefix else [])
+    assert len(index) == len(entries)
+
+
+def test_add_many_matches_adding_one_by_one():
+    entries = [(f"id{number}", number, [f"name {number}", f"nl{number:02d}"], number % 3) for number in range(100)]
+    single, bulk = PrefixIndex(), PrefixIndex()
+    for entry in entries:
+        single.add(*entry)
+    bulk.add_many(entries)
+    for prefix in ("n", "name 1", "nl0", "nl9"):
+        assert bulk.search(prefix, 20) == single.search(prefix, 20)
+
+
+def test_keys_and_queries():
+    assert fold("  Jürgen   MÜLLER ") == "jurgen muller"
+    assert word_keys("'s-Hertogenbosch") == ["'s-hertogenbosch", "s-hertogenbosch", "hertogenbosch"]
+    assert word_keys("") == []
+    assert search_query(" NL44 DHBN 20") == "NL44DHBN20"
+    assert search_query("de Vries") == "de Vries"
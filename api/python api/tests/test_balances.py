@@ -0,0 +1,80 @@
+import threading
+from datetime import date
+
+import pytest
+
+from balances import BalanceBook, ConcurrentUpdateError, InsufficientFundsError, PostingDateError
+from ledger import Ledger
+
+DAY = date(2025, 3, 4)
+
+
+@pytest.fixture
+def book(tmp_path):
+    ledger = Ledger(str(tmp_path))
+    records = {}
+    for account_number in ("6000000001", "6000000002", "6000000003"):
+        ledger.open_account(account_number, opening_balance=100.00)
+        records[account_number] = {"accountNumber": account_number}
+    return BalanceBook(ledger, records.get), records
+
+
+def test_transfer_moves_money_and_mirrors_balances(book):
+    book, records = book
+    row = book.transfer("6000000001", "6000000002", 2550, "Savings", "REF1", DAY)
+    assert (row["amount"], row["reference"]) == (-25.5, "REF1")
+    assert book.read("6000000001") == (7450, 1)
+    assert book.read("6000000002") == (12550, 1)
+    assert records["6000000002"]["detail"]["balance"] == 125.5
+    # An external beneficiary only debits the source
+    book.transfer("6000000001", None, 450, "Rent", "REF2", DAY)
+    assert book.read("6000000001") == (7000, 2)
+
+
+def test_refused_transfers_post_nothing(book):
+    book, _ = book
+    book.transfer("6000000001", "6000000002", 100, "First", "REF1", DAY)
+    with pytest.raises(InsufficientFundsError):
+        book.transfer("6000000001", "6000000002", 9901, "Too much", "REF2", DAY)
+    with pytest.raises(ConcurrentUpdateError):
+        book.transfer("6000000001", "6000000002", 100, "Stale", "REF3", DAY, expected_version=0)
+    with pytest.raises(PostingDateError):
+        book.transfer("6000000003", "6000000002", 100, "Backdated", "REF4", date(2025, 3, 3))
+    with pytest.raises(ValueError):
+        book.transfer("6000000001", "6000000001", 100, "Self", "REF5", DAY)
+    with pytest.raises(KeyError):
+        book.transfer("6999999999", "6000000001", 100, "Unknown", "REF6", DAY)
+    assert [len(book.ledger.get(number)) for number in ("6000000001", "6000000002", "6000000003")] == [1, 1, 0]
+    assert book.read("6000000003") == (10000, 0)
+
+
+def test_concurrent_transfers_stay_consistent(book):
+    """Threads move money around a triangle in both directions; no deadlock, no overdraft, nothing lost"""
+    book, _ = book
+    accounts = ("6000000001", "6000000002", "6000000003")
+    refused = []
+
+    def worker(offset):
+        for index in range(200):
+            source = accounts[(index + offset) % 3]
+            target = accounts[(index + offset + (1 if offset % 2 else 2)) % 3]
+            try:
+                book.transfer(source, target, 700, "Move", f"T{offset}-{index}", DAY)
+            except InsufficientFundsError:
+                refused.append(source)
+
+    threads = [threading.Thread(target=worker, args=(offset,)) for offset in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(30)
+    assert not any(thread.is_alive() for thread in threads)
+
+    balances = [book.read(number)[0] for number in accounts]
+    assert sum(balances) == 30000
+    assert min(balances) >= 0
+    for number, balance in zip(accounts, balances):
+        account = book.ledger.get(number)
+        assert account.balance == balance
+        assert account.opening_balance + sum(round(row["amount"] * 100) for row in account.iter_rows()) == balance
+    assert sum(len(book.ledger.get(number)) for number in accounts) == 2 * (6 * 200 - len(refused))
@@ -0,0 +1,84 @@
+import random
+from datetime import date, timedelta
+
+import pytest
+
+from bankdays import BusinessCalendar, CountryCalendar, easter_sunday, holidays_for_year
+
+
+def _naive_is_business_day(day, country_code):
+    return day.weekday() < 5 and day not in {holiday for holiday, _ in holidays_for_year(country_code, day.year)}
+
+
+def _naive_next(day, country_code):
+    while not _naive_is_business_day(day, country_code):
+        day += timedelta(days=1)
+    return day
+
+
+def _naive_previous(day, country_code):
+    while not _naive_is_business_day(day, country_code):
+        day -= timedelta(days=1)
+    return day
+
+
+def _naive_add(day, count, country_code):
+    day = _naive_next(day, country_code)
+    step = timedelta(days=1 if count >= 0 else -1)
+    for _ in range(abs(count)):
+        day += step
+        while not _naive_is_business_day(day, country_code):
+            day += step
+    return day
+
+
+def _naive_between(start, end, country_code):
+    if end < start:
+        return -_naive_between(end, start, country_code)
+    return sum(_naive_is_business_day(start + timedelta(days=offset), country_code)
+               for offset in range((end - start).days))
+
+
+@pytest.mark.parametrize("country_code", ['NL', 'DE'])
+def test_calendar_matches_stepping_day_by_day(country_code):
+    """Random days inside, around and outside the precomputed range agree with a naive walk"""
+    calendar = CountryCalendar(country_code, 2020, 2030)
+    rng = random.Random(country_code)
+    low, high = date(2018, 1, 1).toordinal(), date(2033, 12, 31).toordinal()
+    edges = [date(2020, 1, 1), date(2019, 12, 31), date(2030, 12, 31), date(2031, 1, 1)]
+    days = edges + [date.fromordinal(rng.randint(low, high)) for _ in range(3000)]
+    for day in days:
+        assert calendar.is_business_day(day) == _naive_is_business_day(day, country_code), day
+        assert calendar.next_business_day(day) == _naive_next(day, country_code), day
+        assert calendar.previous_business_day(day) == _naive_previous(day, country_code), day
+        count = rng.randint(-40, 40)
+        assert calendar.add_business_days(day, count) == _naive_add(day, count, country_code), (day, count)
+        other = day + timedelta(days=rng.randint(-400, 400))
+        assert calendar.business_days_between(day, other) == _naive_between(day, other, country_code), (day, other)
+
+
+def test_easter_sunday():
+    assert [easter_sunday(year) for year in (2000, 2019, 2024, 2025, 2038)] == [
+        date(2000, 4, 23), date(2019, 4, 21), date(2024, 3, 31), date(2025, 4, 20), date(2038, 4, 25)]
+
+
+def test_dutch_holidays():
+    holidays = dict(holidays_for_year('NL', 2025))
+    # King's Day falls on a Sunday in 2025 and moves to the Saturday
+    assert holidays[date(2025, 4, 26)] == "King's Day"
+    assert holidays[date(2025, 5, 5)] == "Liberation Day"
+    assert date(2026, 5, 5) not in dict(holidays_for_year('NL', 2026))
+    assert dict(holidays_for_year('NL', 2013))[date(2013, 4, 30)] == "Queen's Day"
+
+
+def test_business_calendar_falls_back_to_the_default_country():
+    calendar = BusinessCalendar(2024, 2026)
+    assert calendar.country('xx') is calendar.country('NL') is calendar.country(None)
+    assert calendar.country('de') is not calendar.country('NL')
+    # German Unity Day is a business day in the Netherlands
+    assert calendar.is_business_day(date(2025, 10, 3), 'NL')
+    assert not calendar.is_business_day(date(2025, 10, 3), 'DE')
+    assert calendar.add_business_days(date(2025, 12, 24), 1) == date(2025, 12, 29)
+    # Christmas Eve is closed in Germany, so it rolls forward before counting
+    assert calendar.add_business_days(date(2025, 12, 24), 1, 'DE') == date(2025, 12, 30)
+    assert calendar.add_business_days(date(2025, 12, 23), 1, 'DE') == date(2025, 12, 29)
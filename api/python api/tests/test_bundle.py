@@ -0,0 +1,66 @@
+import io
+import os
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+from bundle import zip_chunks
+from jobs import JobQueue
+
+
+def test_archive_round_trips():
+    members = [("a.pdf", os.urandom(300000)), ("empty.txt", b""), ("Überblick.pdf", b"x" * 500000)]
+    archive = zipfile.ZipFile(io.BytesIO(b''.join(zip_chunks(iter(members), chunk_size=4096))))
+    assert archive.testzip() is None
+    assert [(info.filename, archive.read(info)) for info in archive.infolist()] == members
+    assert zipfile.ZipFile(io.BytesIO(b''.join(zip_chunks([])))).infolist() == []
+
+
+def test_members_are_pulled_as_the_archive_is_read():
+    pulled = []
+
+    def members():
+        for number in range(5):
+            pulled.append(number)
+            yield f"doc{number}.pdf", os.urandom(100000)
+
+    chunks = zip_chunks(members(), chunk_size=8192)
+    next(chunks)
+    assert pulled == [0]
+    archive = b''.join(chunks)
+    assert pulled == [0, 1, 2, 3, 4]
+    assert len(zipfile.ZipFile(io.BytesIO(archive)).infolist()) == 5
+
+
+class ThreadWorkers:
+    """Stands in for the process pool, counting calls submitted but not yet taken"""
+
+    def __init__(self):
+        self.executor = ThreadPoolExecutor(max_workers=2)
+        self.submitted = 0
+
+    def submit(self, function, *args):
+        self.submitted += 1
+        return self.executor.submit(function, *args)
+
+
+def test_map_keeps_order_and_at_most_window_calls_ahead():
+    queue = JobQueue()
+    workers = queue._workers = ThreadWorkers()
+    taken = 0
+    results = []
+    for result in queue.map(((pow, (number, 2)) for number in range(20)), window=3):
+        taken += 1
+        assert workers.submitted - taken <= 3
+        results.append(result)
+    assert results == [number ** 2 for number in range(20)]
+    workers.executor.shutdown()
+
+
+def test_map_cancels_pending_calls_when_the_reader_stops():
+    queue = JobQueue()
+    workers = queue._workers = ThreadWorkers()
+    results = queue.map(((pow, (number, 2)) for number in range(100)), window=4)
+    assert next(results) == 0
+    results.close()
+    assert workers.submitted == 5
+    workers.executor.shutdown()
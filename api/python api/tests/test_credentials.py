@@ -0,0 +1,90 @@
+import threading
+
+import pytest
+
+from credentials import CredentialsBusyError, CredentialStore, check_password, hash_password
+
+# Far below the production cost, so the tests hash quickly
+COST = 2 ** 4
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / 'credentials.json')
+
+
+@pytest.fixture
+def store(path):
+    store = CredentialStore(path, cost=COST, refresh_interval=0)
+    yield store
+    store.shutdown()
+
+
+def test_hashes_are_salted_and_checked():
+    first, second = hash_password("s3cret", n=COST), hash_password("s3cret", n=COST)
+    assert first["salt"] != second["salt"] and first["key"] != second["key"]
+    assert check_password("s3cret", first) and check_password("s3cret", second)
+    assert not check_password("S3cret", first)
+
+
+def test_verify_and_session_cache(store):
+    store.set_password("CUST001", "s3cret")
+    assert "CUST001" in store and "CUST999" not in store
+    assert store.verify("CUST001", "s3cret", "session-1")
+    assert store.verify("CUST001", "s3cret", "session-1")
+    assert not store.verify("CUST001", "wrong", "session-1")
+    assert not store.verify("CUST999", "s3cret")
+    assert not store.verify("CUST001", None)
+    assert store.metrics()["hits"] == 1
+    # A new password drops the cached answers of the customer
+    store.set_password("CUST001", "n3w")
+    assert not store.verify("CUST001", "s3cret", "session-1")
+    assert store.verify("CUST001", "n3w", "session-1")
+
+
+def test_stores_sharing_a_file_see_and_keep_each_others_writes(store, path):
+    other = CredentialStore(path, cost=COST, refresh_interval=0)
+    try:
+        store.set_password("CUST001", "first")
+        other.set_password("CUST002", "second")
+        assert store.verify("CUST002", "second", "session") and other.verify("CUST001", "first")
+        other.set_password("CUST002", "changed")
+        assert not store.verify("CUST002", "second", "session")
+        assert sorted(CredentialStore(path, cost=COST)._records) == ["CUST001", "CUST002"]
+    finally:
+        other.shutdown()
+
+
+def test_full_queue_is_rejected_at_once(path):
+    store = CredentialStore(path, max_workers=1, max_pending=0, cost=COST)
+    release = threading.Event()
+    started = threading.Event()
+
+    def block():
+        started.set()
+        release.wait(5)
+
+    worker = threading.Thread(target=store._run, args=(block,))
+    worker.start()
+    try:
+        started.wait(5)
+        with pytest.raises(CredentialsBusyError):
+            store.verify("CUST001", "s3cret")
+        assert store.metrics()["rejected"] == 1
+    finally:
+        release.set()
+        worker.join(5)
+        store.shutdown()
+
+
+def test_import_plaintext_replaces_the_stored_password(store, tmp_path):
+    legacy = tmp_path / 'current_password.txt'
+    assert not store.import_plaintext("CUST001", str(legacy))
+    store.setdefault("CUST001", "default")
+    legacy.write_text("from-file\n")
+    assert store.import_plaintext("CUST001", str(legacy))
+    assert store.verify("CUST001", "from-file") and not store.verify("CUST001", "default")
+    # setdefault leaves an existing password alone
+    store.setdefault("CUST001", "default")
+    assert store.verify("CUST001", "from-file")
+    assert legacy.exists()
@@ -0,0 +1,22 @@
+from documents import DocumentCache, DocumentTemplate
+
+
+def test_template_knows_its_fields():
+    template = DocumentTemplate("Financial_Overview.txt", "Customer {customerId}\nBalance {balance:,.2f}\n{{literal}}")
+    assert template.fields == {"customerId", "balance"}
+    assert template.title == "Financial Overview"
+    assert template.render({"customerId": "CUST001", "balance": 1234.5}) == b"Customer CUST001\nBalance 1,234.50\n{literal}"
+
+
+def test_cache_is_an_lru_with_content_etags():
+    cache = DocumentCache(max_entries=2)
+    first = cache.put("a", b"one")
+    cache.put("b", b"two")
+    assert cache.get("a") is first
+    cache.put("c", b"three")
+    # "b" was the least recently used
+    assert cache.get("b") is None
+    assert cache.get("c")[0] == b"three"
+    assert (cache.hits, cache.misses) == (2, 1)
+    assert cache.put("d", b"one")[1] == first[1]
+    assert cache.put("e", b"one!")[1] != first[1]
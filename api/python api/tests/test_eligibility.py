@@ -0,0 +1,52 @@
+import random
+
+from eligibility import TRANSACTION_FLAGS, EligibilityIndex
+
+
+def _naive(accounts, transaction_type, currency_code, exclude):
+    flag = TRANSACTION_FLAGS.get(transaction_type)
+    return sorted(number for number, account in accounts.items()
+                  if flag and account["status"] == "active" and account["operationProfile"].get(flag)
+                  and (not currency_code or account["currencyCode"] == currency_code) and number != exclude)
+
+
+def test_eligible_matches_filtering_every_account():
+    rng = random.Random(43)
+    index = EligibilityIndex()
+    customers = {"CUST001": {}, "CUST002": {}}
+    for _ in range(3000):
+        customer_id = rng.choice(list(customers))
+        accounts = customers[customer_id]
+        number = f"{customer_id[-1]}{rng.randrange(40):03d}"
+        if rng.random() < 0.15:
+            index.remove(customer_id, number)
+            accounts.pop(number, None)
+        else:
+            account = accounts.get(number) or {"accountNumber": number}
+            # Accounts are modified in place, as the API does
+            account["status"] = rng.choice(("active", "active", "closed"))
+            account["currencyCode"] = rng.choice(("EUR", "EUR", "USD"))
+            account["operationProfile"] = {flag: rng.random() < 0.6 for flag in TRANSACTION_FLAGS.values()}
+            index.update(customer_id, account)
+            accounts[number] = account
+        transaction_type = rng.choice((*TRANSACTION_FLAGS, 'unknown'))
+        currency_code = rng.choice((None, "EUR", "USD", "GBP"))
+        exclude = rng.choice((None, number))
+        found = index.eligible(customer_id, transaction_type, currency_code, exclude)
+        assert sorted(account["accountNumber"] for account in found) == _naive(
+            accounts, transaction_type, currency_code, exclude)
+        assert sorted(account["accountNumber"] for account in index.accounts(customer_id)) == sorted(accounts)
+
+
+def test_update_reports_whether_the_profile_changed():
+    index = EligibilityIndex()
+    account = {"accountNumber": "1", "status": "active", "currencyCode": "EUR",
+               "operationProfile": {"allowPaymentOrderOut": True}}
+    assert index.update("CUST001", account)
+    assert not index.update("CUST001", dict(account, description="Renamed"))
+    assert index.eligible("CUST001", 'payment')[0]["description"] == "Renamed"
+    account["operationProfile"] = {"allowOwnTransferOut": True}
+    assert index.update("CUST001", account)
+    assert index.eligible("CUST001", 'payment') == []
+    assert index.eligible("CUST001", 'ownTransfer') == [account]
+    assert index.eligible("CUST999", 'payment') == []
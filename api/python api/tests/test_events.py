@@ -0,0 +1,114 @@
+import random
+from datetime import date, timedelta
+
+import pytest
+
+import events
+from events import (ACCOUNT_OPENED, INTEREST_PAID, MONEY_DEPOSITED, MONEY_WITHDRAWN, NOTICE_GIVEN, AccountEventStream,
+                    EventStore, apply_event)
+from ledger import TYPE_INTEREST, Ledger
+
+
+@pytest.fixture
+def stream():
+    """A stream with a few hundred random events, so several snapshots are taken"""
+    rng = random.Random(7)
+    stream = AccountEventStream("3000000001")
+    day = date(2024, 1, 1)
+    stream.append(ACCOUNT_OPENED, day, "Account opened", 100.0, {"productCode": "SAV_ONLINE"})
+    for index in range(300):
+        day += timedelta(days=rng.choice((0, 1, 2)))
+        event_type = rng.choice((INTEREST_PAID, MONEY_DEPOSITED, MONEY_WITHDRAWN, NOTICE_GIVEN))
+        amount = rng.randrange(1, 10000) / 100
+        stream.append(event_type, day, f"Event {index}", -amount if event_type == MONEY_WITHDRAWN else amount,
+                      {"withdrawalDate": day.isoformat()} if event_type == NOTICE_GIVEN else None)
+    return stream
+
+
+def test_state_matches_folding_every_event(stream):
+    assert len(stream.snapshots) > 1
+    expected = {}
+    for event in stream.events:
+        apply_event(expected, event)
+    assert stream.state() == expected
+    assert stream.state()["version"] == len(stream) == 301
+
+
+def test_snapshots_are_not_changed_by_reading_state(stream):
+    stream.state()["balance"] = -1
+    sequence, snapshot = stream.snapshots[-1]
+    assert snapshot["version"] == sequence
+    assert stream.state()["balance"] != -1
+
+
+def test_query_matches_filtering_every_event(stream):
+    rng = random.Random(3)
+    days = [event["date"] for event in stream.events]
+    for _ in range(50):
+        low, high = sorted(rng.sample(days, 2))
+        types = rng.choice((None, [INTEREST_PAID], [MONEY_WITHDRAWN, NOTICE_GIVEN]))
+        expected = [event for event in stream.events
+                    if low <= event["date"] <= high and (types is None or event["action"] in types)]
+        assert stream.query(types, low, high) == expected
+    assert stream.query() == stream.events
+
+
+def test_rejects_unknown_types_and_older_dates(stream):
+    with pytest.raises(ValueError):
+        stream.append('MONEY_PRINTED', stream.events[-1]["date"], "Nope")
+    with pytest.raises(ValueError):
+        stream.append(MONEY_DEPOSITED, "2023-12-31", "Too old", 1.0)
+    assert len(stream) == 301
+
+
+def test_store_replays_its_file(tmp_path):
+    path = str(tmp_path / 'events.jsonl')
+    store = EventStore(path)
+    store.append("3000000002", ACCOUNT_OPENED, "2025-01-01", "Account opened", 10.0)
+    store.append("3000000002", MONEY_DEPOSITED, "2025-01-02", "Deposit", 5.5)
+    with pytest.raises(KeyError):
+        store.append("3000000003", MONEY_DEPOSITED, "2025-01-02", "No stream", 1.0)
+
+    replayed = EventStore(path)
+    assert replayed.get("3000000002").events == store.get("3000000002").events
+    assert replayed.get("3000000002").state()["balance"] == 15.5
+    assert replayed.get("3000000003") is None
+
+
+def test_import_ledger_and_follow_postings(tmp_path):
+    ledger = Ledger(str(tmp_path))
+    account = ledger.open_account("3000000004", opening_balance=50.00)
+    account.append("2025-01-02", 20.00, "Deposit", "R1")
+    account.append("2025-01-03", 1.25, "Interest", "R2", TYPE_INTEREST)
+    store = EventStore(str(tmp_path / 'events.jsonl'))
+    store.import_ledger(account, {"productCode": "SAV_ONLINE"})
+    ledger.subscribe(store.record_posting)
+    account.append("2025-01-04", -30.00, "Withdrawal", "R3")
+
+    state = store.get("3000000004").state()
+    assert state["balance"] == account.balance / 100 == 41.25
+    assert state["interestPaid"] == 1.25
+    assert [event["action"] for event in store.get("3000000004").events] == [
+        ACCOUNT_OPENED, MONEY_DEPOSITED, INTEREST_PAID, MONEY_WITHDRAWN]
+
+
+def test_posting_events_are_queued_when_the_store_cannot_write(tmp_path, monkeypatch):
+    ledger = Ledger(str(tmp_path))
+    account = ledger.open_account("3000000005")
+    store = EventStore(str(tmp_path / 'events.jsonl'))
+    store.import_ledger(account)
+    ledger.subscribe(store.record_posting)
+    monkeypatch.setattr(events.logger, 'disabled', True)
+
+    # A directory cannot be opened for appending
+    path, store.path = store.path, str(tmp_path)
+    today = date.today()
+    account.append(today, 10.00, "First", "R1")
+    account.append(today, 5.00, "Second", "R2")
+    assert len(account) == 2
+    assert len(store.get("3000000005")) == 1
+
+    store.path = path
+    account.append(today + timedelta(days=1), -1.00, "Third", "R3")
+    assert [event["description"] for event in store.get("3000000005").events[1:]] == ["First", "Second", "Third"]
+    assert store.get("3000000005").state()["balance"] == 14.0
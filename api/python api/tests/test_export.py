@@ -0,0 +1,70 @@
+import csv
+import io
+import zlib
+import xml.etree.ElementTree as ElementTree
+from datetime import date, timedelta
+
+import pytest
+
+from export import CAMT053_NAMESPACE, CSV_COLUMNS, FIRST_CHUNK_SIZE, camt053_chunks, csv_chunks, gzip_chunks
+from ledger import Ledger
+
+NS = {'camt': CAMT053_NAMESPACE}
+
+
+@pytest.fixture
+def account(tmp_path):
+    account = Ledger(str(tmp_path)).open_account("2000000001", opening_balance=100.00, account_name="Savings & Co")
+    for index in range(2000):
+        account.append(date(2025, 1, 1) + timedelta(days=index // 10), 1.25 if index % 3 else -0.50,
+                       f"Payment <{index}>", f"REF{index}")
+    return account
+
+
+def test_csv_streams_every_row_in_growing_chunks(account):
+    chunks = list(csv_chunks(account, chunk_size=16 * 1024))
+    assert chunks[0] == (','.join(CSV_COLUMNS) + '\r\n').encode('utf-8')
+    sizes = [len(chunk) for chunk in chunks[1:-1]]
+    assert sizes[0] < 2 * FIRST_CHUNK_SIZE
+    assert max(sizes) < 2 * 16 * 1024
+    rows = list(csv.DictReader(io.StringIO(b''.join(chunks).decode('utf-8'))))
+    assert len(rows) == 2000
+    assert rows[-1]["reference"] == "REF1999"
+    assert float(rows[-1]["balance"]) == pytest.approx(account.balance / 100)
+
+
+def test_csv_date_window(account):
+    rows = list(csv.DictReader(io.StringIO(b''.join(csv_chunks(account, '2025-01-03', '2025-01-04')).decode('utf-8'))))
+    assert [row["valueDate"] for row in rows] == ['2025-01-03'] * 10 + ['2025-01-04'] * 10
+
+
+def test_csv_neutralises_spreadsheet_formulas(tmp_path):
+    account = Ledger(str(tmp_path)).open_account("2000000002")
+    for text in ('=HYPERLINK("x")', '+1', '-2', '@SUM(A1)', 'plain'):
+        account.append(date(2025, 1, 1), -1.00, text, "R")
+    rows = list(csv.DictReader(io.StringIO(b''.join(csv_chunks(account)).decode('utf-8'))))
+    assert [row["description"] for row in rows] == ["'=HYPERLINK(\"x\")", "'+1", "'-2", "'@SUM(A1)", 'plain']
+    # Numbers are not text cells and keep their sign
+    assert rows[0]["amount"] == '-1.0'
+
+
+def test_camt053_is_well_formed_and_balances_add_up(account):
+    document = ElementTree.fromstring(b''.join(camt053_chunks(account, '2025-01-01', '2025-02-15')))
+    statement = document.find('camt:BkToCstmrStmt/camt:Stmt', NS)
+    entries = statement.findall('camt:Ntry', NS)
+    assert int(statement.find('camt:TxsSummry/camt:TtlNtries/camt:NbOfNtries', NS).text) == len(entries) == 460
+    balances = {balance.find('camt:Tp/camt:CdOrPrtry/camt:Cd', NS).text: float(balance.find('camt:Amt', NS).text)
+                for balance in statement.findall('camt:Bal', NS)}
+    signed = sum(float(entry.find('camt:Amt', NS).text) * (1 if entry.find('camt:CdtDbtInd', NS).text == 'CRDT' else -1)
+                 for entry in entries)
+    assert balances['CLBD'] == pytest.approx(balances['OPBD'] + signed)
+    assert statement.find('camt:Acct/camt:Nm', NS).text == "Savings & Co"
+    assert entries[0].find('camt:NtryDtls/camt:TxDtls/camt:RmtInf/camt:Ustrd', NS).text == "Payment <0>"
+
+
+def test_gzip_chunks_round_trip_and_flush_each_chunk(account):
+    plain = list(csv_chunks(account))
+    compressed = list(gzip_chunks(iter(plain)))
+    assert zlib.decompress(b''.join(compressed), 31) == b''.join(plain)
+    # The header is flushed on its own, so a client can start decoding at once
+    assert zlib.decompressobj(31).decompress(compressed[0]) == plain[0]
@@ -0,0 +1,85 @@
+import random
+import string
+
+import pytest
+
+from iban import (IBAN_FORMATS, InvalidIBANError, build_iban, derive_bic, is_valid_iban, mod97, validate_iban,
+                  validate_ibans)
+
+# Published examples from the national IBAN registries
+VALID_IBANS = [
+    'GB82WEST12345698765432', 'DE89370400440532013000', 'NL91ABNA0417164300', 'BE68539007547034',
+    'FR1420041010050500013M02606', 'IT60X0542811101000000123456', 'CH9300762011623852957', 'NO9386011117947',
+    'ES9121000418450200051332', 'AT611904300234573201', 'PL61109010140000071219812874', 'MT84MALT011000012345MTLCAST001S'
+]
+
+# The mock accounts of the API
+MOCK_IBANS = ['NL44DHBN2018470578', 'NL17DHBN2018470579', 'NL87DHBN2018470580']
+
+
+def _reference_mod97(iban):
+    """Remainder on the full rearranged number, as the standard defines it"""
+    rearranged = iban[4:] + iban[:4]
+    return int(''.join(str(int(char, 36)) for char in rearranged)) % 97
+
+
+@pytest.mark.parametrize("iban", VALID_IBANS + MOCK_IBANS)
+def test_valid_ibans(iban):
+    assert mod97(iban) == 1
+    assert validate_iban(iban) == iban
+    spaced = ' '.join(iban[start:start + 4] for start in range(0, len(iban), 4)).lower()
+    assert validate_iban(spaced) == iban
+
+
+def test_chunked_remainder_matches_big_integer_arithmetic():
+    rng = random.Random(97)
+    for _ in range(2000):
+        country = rng.choice(sorted(IBAN_FORMATS))
+        body = ''.join(rng.choice(string.ascii_uppercase + string.digits) for _ in range(rng.randint(8, 30)))
+        value = f'{country}{rng.randint(0, 99):02d}{body}'
+        assert mod97(value) == _reference_mod97(value)
+
+
+def test_every_single_digit_error_and_adjacent_swap_is_caught():
+    for iban in VALID_IBANS + MOCK_IBANS:
+        for position in range(2, len(iban)):
+            if iban[position].isdigit():
+                for digit in string.digits.replace(iban[position], ''):
+                    assert mod97(iban[:position] + digit + iban[position + 1:]) != 1
+            if position + 1 < len(iban) and iban[position] != iban[position + 1] and \
+                    iban[position].isdigit() and iban[position + 1].isdigit():
+                swapped = iban[:position] + iban[position + 1] + iban[position] + iban[position + 2:]
+                assert mod97(swapped) != 1
+
+
+@pytest.mark.parametrize("value, reason", [
+    # Own bank codes get no exemption from the checksum
+    ('NL99DHBN2018470578', 'checksum'),
+    ('NL44DHBN201847057', 'characters long'),
+    ('NL44DHB12018470578', 'account format'),
+    ('XX44DHBN2018470578', 'Unsupported'),
+    ('NL44DHBN20184705€8', 'letters and digits'),
+    ('NL4', 'too short'),
+    ('', 'empty'),
+    (None, 'empty'),
+])
+def test_invalid_ibans(value, reason):
+    with pytest.raises(InvalidIBANError, match=reason):
+        validate_iban(value)
+    assert not is_valid_iban(value)
+
+
+def test_bulk_validation_keeps_order():
+    assert validate_ibans(['nl91 abna 0417 1643 00', 'NL00ABNA0417164300', None]) == [
+        ('NL91ABNA0417164300', None), (None, 'IBAN checksum is invalid'), (None, 'IBAN is empty')]
+
+
+def test_build_iban_and_bic():
+    assert build_iban('NL', 'DHBN2018470578') == 'NL44DHBN2018470578'
+    assert build_iban('DE', '370400440532013000') == 'DE89370400440532013000'
+    assert build_iban('NL', 'ABNA0000000001')[4:] == 'ABNA0000000001'
+    with pytest.raises(InvalidIBANError):
+        build_iban('NL', 'DHBN201847057')
+    assert derive_bic('NL44DHBN2018470578') == 'DHBNNL2R'
+    assert derive_bic('DE89370400440532013000') == 'COBADEFFXXX'
+    assert derive_bic('NO9386011117947') is None
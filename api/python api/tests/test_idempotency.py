@@ -0,0 +1,118 @@
+import threading
+
+import pytest
+from flask import Flask, jsonify, request
+
+from idempotency import IDEMPOTENCY_HEADER, IdempotencyCache, idempotent
+
+
+@pytest.fixture
+def server():
+    """A small app with one idempotent endpoint; calls counts its executions"""
+    app = Flask(__name__)
+    cache = IdempotencyCache(max_entries=8, wait_timeout=5)
+    state = {"calls": 0, "release": threading.Event(), "started": threading.Event()}
+    state["release"].set()
+
+    def conflict(description):
+        return jsonify({"code": "470", "description": description}), 409
+
+    @app.route('/payments', methods=['POST'])
+    @idempotent(cache, conflict)
+    def payments():
+        state["calls"] += 1
+        state["started"].set()
+        state["release"].wait()
+        data = request.get_json()
+        if data.get("fail"):
+            return jsonify({"code": "500"}), 500
+        return jsonify({"paymentId": state["calls"], "amount": data["amount"]}), 201
+
+    state["client"] = app.test_client()
+    state["cache"] = cache
+    return state
+
+
+def _post(server, body, key="key-1", username="alice"):
+    headers = {"username": username}
+    if key:
+        headers[IDEMPOTENCY_HEADER] = key
+    return server["client"].post('/payments', json=body, headers=headers)
+
+
+def test_retry_replays_the_stored_response(server):
+    first = _post(server, {"amount": 10})
+    retry = _post(server, {"amount": 10})
+    assert (first.status_code, retry.status_code) == (201, 201)
+    assert retry.json == first.json
+    assert retry.headers['Idempotent-Replayed'] == 'true'
+    assert 'Idempotent-Replayed' not in first.headers
+    assert server["calls"] == 1
+
+
+def test_reused_key_with_a_different_body_conflicts(server):
+    _post(server, {"amount": 10})
+    conflict = _post(server, {"amount": 11})
+    assert conflict.status_code == 409
+    assert server["calls"] == 1
+
+
+def test_keys_are_scoped_per_user_and_optional(server):
+    _post(server, {"amount": 10})
+    _post(server, {"amount": 10}, username="bob")
+    _post(server, {"amount": 10}, key=None)
+    _post(server, {"amount": 10}, key=None)
+    assert server["calls"] == 4
+
+
+def test_server_errors_are_not_replayed(server):
+    assert _post(server, {"amount": 10, "fail": True}).status_code == 500
+    assert _post(server, {"amount": 10, "fail": True}).status_code == 500
+    assert server["calls"] == 2
+
+
+def test_concurrent_duplicate_waits_for_the_first_request(server):
+    server["release"].clear()
+    responses = []
+    first = threading.Thread(target=lambda: responses.append(_post(server, {"amount": 10})))
+    first.start()
+    server["started"].wait(5)
+    second = threading.Thread(target=lambda: responses.append(_post(server, {"amount": 10})))
+    second.start()
+    second.join(0.2)
+    # The duplicate is blocked on the first request, not executing
+    assert second.is_alive() and server["calls"] == 1
+    server["release"].set()
+    first.join(5)
+    second.join(5)
+    assert [response.status_code for response in responses] == [201, 201]
+    assert responses[0].json == responses[1].json
+    assert server["calls"] == 1
+
+
+def test_duplicate_still_in_flight_after_the_timeout_conflicts(server):
+    server["cache"].wait_timeout = 0.05
+    server["release"].clear()
+    first = threading.Thread(target=_post, args=(server, {"amount": 10}))
+    first.start()
+    server["started"].wait(5)
+    try:
+        assert _post(server, {"amount": 10}).status_code == 409
+    finally:
+        server["release"].set()
+        first.join(5)
+
+
+def test_cache_is_bounded_but_keeps_in_flight_keys():
+    cache = IdempotencyCache(max_entries=4)
+    in_flight, _ = cache.begin("pending", "f")
+    for index in range(20):
+        entry, owner = cache.begin(f"key-{index}", "f")
+        assert owner
+        cache.complete(f"key-{index}", entry, (b'', 200, []))
+    assert len(cache._entries) <= 4
+    entry, owner = cache.begin("pending", "f")
+    assert entry is in_flight and not owner
+    # A key whose request failed can be claimed again
+    cache.complete("pending", in_flight, None)
+    assert cache.begin("pending", "f")[1]
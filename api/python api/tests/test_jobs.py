@@ -0,0 +1,88 @@
+import os
+import time
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+import documents
+from jobs import STATUS_COMPLETED, STATUS_FAILED, JobQueue, WorkerPool
+
+
+@pytest.fixture
+def queue():
+    queue = JobQueue(max_workers=1, result_ttl=60)
+    yield queue
+    queue.shutdown(wait=True)
+
+
+def _wait(queue, job_id, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        status = queue.status(job_id)
+        if status["status"] in (STATUS_COMPLETED, STATUS_FAILED):
+            return status
+        time.sleep(0.02)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+def test_completed_job_returns_the_rendered_pdf(queue):
+    job = queue.submit('contract', documents.render_customer_contract, 'CUST001', 'CON_SAV_001')
+    assert _wait(queue, job["jobId"])["status"] == STATUS_COMPLETED
+    filename, mimetype, content = queue.result(job["jobId"])
+    assert (filename, mimetype) == ('CON_SAV_001.pdf', 'application/pdf')
+    assert content.startswith(b'%PDF-')
+
+
+def test_identical_requests_share_a_job_while_it_runs(queue):
+    first = queue.submit('contract', documents.render_customer_contract, 'CUST001', 'CON_SAV_001')
+    second = queue.submit('contract', documents.render_customer_contract, 'CUST001', 'CON_SAV_001')
+    other = queue.submit('contract', documents.render_customer_contract, 'CUST001', 'CON_MAX_001')
+    assert first["jobId"] == second["jobId"] != other["jobId"]
+
+
+def test_renderer_errors_fail_the_job(queue, tmp_path):
+    job = queue.submit('statement', documents.render_account_statement, str(tmp_path), '404')
+    status = _wait(queue, job["jobId"])
+    assert status["status"] == STATUS_FAILED
+    assert '404' in status["error"]
+    assert queue.result(job["jobId"]) is None
+
+
+def test_a_rejected_submit_fails_the_job_and_frees_its_key(queue, monkeypatch):
+    def refuse(*args):
+        raise RuntimeError('cannot start workers')
+
+    monkeypatch.setattr(queue._workers, 'submit', refuse)
+    job = queue.submit('contract', documents.render_customer_contract, 'CUST001', 'CON_SAV_001')
+    assert job["status"] == STATUS_FAILED and job["finishedAt"] is not None
+    assert queue.status(job["jobId"])["error"] == 'cannot start workers'
+    monkeypatch.undo()
+    retry = queue.submit('contract', documents.render_customer_contract, 'CUST001', 'CON_SAV_001')
+    assert retry["jobId"] != job["jobId"]
+    assert _wait(queue, retry["jobId"])["status"] == STATUS_COMPLETED
+
+
+def test_finished_jobs_are_evicted_beyond_max_results():
+    queue = JobQueue(max_workers=1, max_results=2)
+    try:
+        jobs = [queue.submit('contract', documents.render_customer_contract, 'CUST001', f'CON_{i}') for i in range(4)]
+        # One worker finishes them in order
+        _wait(queue, jobs[-1]["jobId"])
+        assert [queue.status(job["jobId"]) is not None for job in jobs] == [False, False, True, True]
+    finally:
+        queue.shutdown(wait=True)
+
+
+def test_map_yields_results_in_order(queue):
+    calls = [(documents.render_customer_contract, ('CUST001', f'CON_{i}')) for i in range(5)]
+    assert [filename for filename, _, _ in queue.map(iter(calls), 2)] == [f'CON_{i}.pdf' for i in range(5)]
+
+
+def test_worker_pool_replaces_a_broken_pool():
+    pool = WorkerPool(1)
+    try:
+        with pytest.raises(BrokenProcessPool):
+            pool.submit(os._exit, 1).result(timeout=60)
+        assert pool.submit(documents.render_customer_contract, 'CUST001', 'CON_SAV_001').result(timeout=60)[0] == 'CON_SAV_001.pdf'
+    finally:
+        pool.shutdown(wait=True)
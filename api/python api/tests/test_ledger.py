@@ -0,0 +1,101 @@
+import os
+import random
+from datetime import date, timedelta
+
+import pytest
+
+from ledger import TYPE_INTEREST, Ledger
+
+
+@pytest.fixture
+def history(tmp_path):
+    """An account with a few hundred random transactions over two years, and the same rows as tuples"""
+    rng = random.Random(5)
+    account = Ledger(str(tmp_path)).open_account("1000000001", opening_balance=250.00)
+    day = date(2024, 1, 3)
+    rows = []
+    for index in range(300):
+        day += timedelta(days=rng.choice((0, 0, 1, 3, 7)))
+        if index % 10 == 0:
+            amount, tx_type = rng.randrange(1, 500) / 100, TYPE_INTEREST
+        else:
+            amount, tx_type = rng.randrange(-20000, 30000) / 100, None
+        account.append(day, amount, f"Transaction {index}", f"REF{index}", tx_type)
+        rows.append((day, round(amount * 100), tx_type == TYPE_INTEREST))
+    return account, rows
+
+
+def _expected(rows, opening, first, last):
+    before = [cents for day, cents, _ in rows if day < first]
+    inside = [(cents, interest) for day, cents, interest in rows if first <= day <= last]
+    credits = sum(cents for cents, _ in inside if cents > 0)
+    debits = -sum(cents for cents, _ in inside if cents < 0)
+    return {
+        "openingBalance": (opening + sum(before)) / 100,
+        "closingBalance": (opening + sum(before) + credits - debits) / 100,
+        "totalCredits": credits / 100,
+        "totalDebits": debits / 100,
+        "interestEarned": sum(cents for cents, interest in inside if interest and cents > 0) / 100,
+        "transactionCount": len(inside)
+    }
+
+
+def test_summary_matches_a_rescan(history):
+    account, rows = history
+    rng = random.Random(9)
+    for _ in range(200):
+        first = date(2023, 12, 1) + timedelta(days=rng.randrange(0, 900))
+        last = first + timedelta(days=rng.randrange(0, 400))
+        summary = account.summary(first.isoformat(), last.isoformat())
+        for field, value in _expected(rows, 25000, first, last).items():
+            assert summary[field] == pytest.approx(value), (first, last, field)
+
+
+def test_monthly_rollups_match_the_summary_of_each_month(history):
+    account, rows = history
+    months = sorted({(day.year, day.month) for day, _, _ in rows})
+    rollups = account.monthly_rollups()
+    assert [rollup["month"] for rollup in rollups] == [f"{year:04d}-{month:02d}" for year, month in months]
+    for rollup, (year, month) in zip(rollups, months):
+        first = date(year, month, 1)
+        last = (first + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+        summary = account.summary(first, last)
+        for field in ("openingBalance", "closingBalance", "totalCredits", "totalDebits", "transactionCount"):
+            assert rollup[field] == pytest.approx(summary[field])
+
+
+def test_monthly_rollups_pick_up_later_appends(history):
+    account, rows = history
+    account.monthly_rollups()
+    last_day = rows[-1][0]
+    next_month = (last_day.replace(day=1) + timedelta(days=32)).replace(day=1)
+    account.append(next_month, 10.00, "Late", "LATE")
+    assert account.monthly_rollups(next_month)[-1]["transactionCount"] == 1
+
+
+def test_appends_must_be_in_date_order(history):
+    account, rows = history
+    with pytest.raises(ValueError):
+        account.append(rows[-1][0] - timedelta(days=1), 1.00, "Backdated", "BACK")
+
+
+def test_page_is_newest_first(history):
+    account, rows = history
+    page, total = account.page(0, 10)
+    assert total == len(rows)
+    assert [row["reference"] for row in page] == [f"REF{index}" for index in range(299, 289, -1)]
+
+
+def test_last_posting_since(history):
+    account, rows = history
+    assert account.last_posting("REF10") == rows[10][0]
+    assert account.last_posting("REF10", since=rows[10][0] + timedelta(days=1)) is None
+    assert account.last_posting("MISSING") is None
+
+
+def test_other_registries_see_appends(history):
+    account, rows = history
+    other = Ledger(os.path.dirname(account.directory)).get(account.account_number)
+    account.append(rows[-1][0], 1.23, "Shared", "SHARED")
+    assert other.balance == account.balance
+    assert len(other) == len(rows) + 1
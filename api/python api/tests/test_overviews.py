@@ -0,0 +1,71 @@
+import random
+from datetime import date, timedelta
+
+import pytest
+
+from ledger import TYPE_INTEREST, Ledger
+from overviews import FIGURES, AnnualOverviewStore, compute_overviews, run_year_end
+
+CUSTOMERS = {"CUST001": ["7000000001", "7000000002", "7000000003"], "CUST002": ["7000000004"],
+             "CUST003": ["7000000005", "7999999999"]}
+
+
+@pytest.fixture
+def ledger(tmp_path):
+    rng = random.Random(49)
+    ledger = Ledger(str(tmp_path / 'ledger'))
+    for number in range(1, 6):
+        currency = "USD" if number == 3 else "EUR"
+        account = ledger.open_account(f"700000000{number}", opening_balance=rng.randrange(0, 5000),
+                                      account_name=f"Account {number}", currency_code=currency)
+        day = date(2024, 6, 1)
+        for index in range(rng.randint(0, 150)):
+            day += timedelta(days=rng.choice((0, 2, 5)))
+            interest = index % 12 == 0
+            account.append(day, rng.randrange(1, 2000) / 100 if interest else rng.randrange(-5000, 8000) / 100,
+                           "Row", f"R{index}", TYPE_INTEREST if interest else None)
+    return ledger
+
+
+def test_overviews_match_the_ledger_summary(ledger):
+    overviews = compute_overviews(ledger, list(CUSTOMERS.items()), 2025)
+    for customer_id, account_numbers in CUSTOMERS.items():
+        overview = overviews[customer_id]
+        assert overview["year"] == 2025
+        for entry in overview["accounts"]:
+            summary = ledger.get(entry["accountNumber"]).summary('2025-01-01', '2025-12-31')
+            for field in FIGURES:
+                assert entry[field] == pytest.approx(summary[field]), (entry["accountNumber"], field)
+        for totals in overview["totals"]:
+            accounts = [entry for entry in overview["accounts"] if entry["currencyCode"] == totals["currencyCode"]]
+            assert totals["closingBalance"] == pytest.approx(sum(entry["closingBalance"] for entry in accounts))
+            assert totals["transactionCount"] == sum(entry["transactionCount"] for entry in accounts)
+            assert totals["taxReferenceBalance"] == totals["openingBalance"]
+    assert [totals["currencyCode"] for totals in overviews["CUST001"]["totals"]] == ["EUR", "USD"]
+    # Unknown accounts are left out
+    assert [entry["accountNumber"] for entry in overviews["CUST003"]["accounts"]] == ["7000000005"]
+
+
+def test_year_end_batch_on_workers_matches_computing_inline(ledger):
+    progress = []
+    overviews = run_year_end(ledger.directory, CUSTOMERS, 2025, max_workers=2, chunk_accounts=2,
+                             progress=lambda done, total: progress.append((done, total)))
+    assert overviews == compute_overviews(ledger, list(CUSTOMERS.items()), 2025)
+    assert progress[0] == (0, 6) and progress[-1] == (6, 6)
+
+
+def test_store_serves_stored_years_and_computes_last_year(ledger, tmp_path):
+    directory = str(tmp_path / 'overviews')
+    store = AnnualOverviewStore(directory, ledger)
+    last_year = date.today().year - 1
+    assert store.get("CUST002", last_year) is None
+    computed = store.get("CUST002", last_year, CUSTOMERS["CUST002"])
+    assert computed["accounts"][0]["accountNumber"] == "7000000004"
+    assert store.years("CUST002", CUSTOMERS["CUST002"]) == [last_year]
+
+    # A batch in another process stores a year; the store picks up the new file
+    AnnualOverviewStore(directory).put_year(2023, {"CUST002": {"customerId": "CUST002", "year": 2023}})
+    assert store.get("CUST002", 2023) == {"customerId": "CUST002", "year": 2023}
+    assert store.computed_at(2023) is not None
+    assert store.years("CUST002") == [2023]
+    assert store.get("CUST001", 2023) is None
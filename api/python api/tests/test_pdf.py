@@ -0,0 +1,100 @@
+import os
+import re
+import time
+import zlib
+
+import pytest
+
+from pdf import LINE_CHARS, PAGE_LINES, PdfStore, pdf_digest, stream_pdf, write_pdf
+
+
+def _parse(data):
+    """{object number: body} after checking every xref offset points at its object"""
+    assert data.startswith(b'%PDF-1.4\n') and data.endswith(b'%%EOF\n')
+    xref_position = int(re.search(rb'startxref\n(\d+)\n', data).group(1))
+    assert data[xref_position:].startswith(b'xref\n')
+    size = int(re.search(rb'/Size (\d+)', data).group(1))
+    entries = data[xref_position:].split(b'\n')[3:2 + size]
+    objects = {}
+    for number, entry in enumerate(entries, 1):
+        offset = int(entry[:10])
+        assert data[offset:].startswith(b'%d 0 obj\n' % number)
+        objects[number] = data[offset:data.index(b'\nendobj\n', offset)]
+    return objects
+
+
+def _page_texts(objects):
+    """Shown strings of each page, in page order"""
+    pages = []
+    kids = [int(kid) for kid in re.findall(rb'(\d+) 0 R', objects[2])]
+    for kid in kids:
+        content = int(re.search(rb'/Contents (\d+) 0 R', objects[kid]).group(1))
+        body = objects[content]
+        stream = zlib.decompress(body[body.index(b'stream\n') + 7:body.rindex(b'\nendstream')])
+        pages.append([re.sub(rb'\\(.)', rb'\1', text).decode('cp1252')
+                      for text in re.findall(rb'\(((?:\\.|[^\\)])*)\) Tj', stream)])
+    return pages
+
+
+def test_lines_are_laid_out_over_pages():
+    lines = [f"Line {number} (with parentheses) \\ and € sign" for number in range(PAGE_LINES * 2 + 5)]
+    objects = _parse(b''.join(stream_pdf(lines, "Statement (2025)")))
+    assert b'/Count 3' in objects[2]
+    assert b'/Title (Statement \\(2025\\))' in objects[4]
+    pages = _page_texts(objects)
+    assert [page[:-1] for page in pages] == [lines[:PAGE_LINES], lines[PAGE_LINES:2 * PAGE_LINES],
+                                             lines[2 * PAGE_LINES:]]
+    assert [page[-1] for page in pages] == ["Page 1", "Page 2", "Page 3"]
+
+
+def test_long_lines_wrap_and_empty_documents_have_a_page():
+    pages = _page_texts(_parse(b''.join(stream_pdf(["x" * (LINE_CHARS * 2 + 3)]))))
+    assert pages == [["x" * LINE_CHARS, "x" * LINE_CHARS, "xxx", "Page 1"]]
+    assert _page_texts(_parse(b''.join(stream_pdf([])))) == [["Page 1"]]
+
+
+def test_pdf_is_streamed_a_page_at_a_time():
+    chunks = list(stream_pdf(iter(["line"] * (PAGE_LINES * 4))))
+    # Head, one chunk per page, then the page tree and trailer
+    assert len(chunks) == 6
+
+
+def test_write_pdf_replaces_the_file_whole(tmp_path):
+    path = str(tmp_path / 'out.pdf')
+    write_pdf(path, "first\nsecond", "Title")
+    assert _page_texts(_parse(open(path, 'rb').read())) == [["first", "second", "Page 1"]]
+    assert not os.path.exists(path + '.partial')
+    assert pdf_digest("a", "T") != pdf_digest("a", "U") != pdf_digest("b", "U")
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = PdfStore(str(tmp_path / 'pdf'), max_workers=1, max_files=2)
+    yield store
+    store._workers.shutdown(wait=True)
+
+
+def test_store_renders_once_and_then_serves_the_file(store):
+    text = "\n".join(f"Row {number}" for number in range(PAGE_LINES * 3))
+    digest, chunks, size = store.stream(text, "Doc")
+    assert size is None
+    rendered = b''.join(chunks)
+    again_digest, again, again_size = store.stream(text, "Doc")
+    assert again_digest == digest
+    assert b''.join(again) == rendered
+    assert again_size == len(rendered)
+    assert len(_page_texts(_parse(rendered))) == 3
+
+
+def test_store_keeps_at_most_max_files(store):
+    for number in range(4):
+        b''.join(store.stream(f"Document {number}")[1])
+    # Pruning runs in the render callback, which may finish after the stream
+    deadline = time.monotonic() + 10
+    while True:
+        files = sorted(name for name in os.listdir(store.directory) if name.endswith('.pdf'))
+        if len(files) <= 2 or time.monotonic() > deadline:
+            break
+        time.sleep(0.01)
+    assert len(files) == 2
+    assert f"{pdf_digest('Document 3')}.pdf" in files
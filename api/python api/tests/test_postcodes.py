@@ -0,0 +1,102 @@
+import csv
+import random
+
+import pytest
+
+from postcodes import (InvalidPostcodeError, PostcodeBook, _runs, address_indexes, build_postcode_file,
+                       normalize_postcode)
+
+STREETS = ("Kerkstraat", "Dorpsstraat", "Molenweg", "Stationsplein", "Hoofdstraat")
+CITIES = ("Amsterdam", "Utrecht", "'s-Hertogenbosch", "Zoetermeer")
+
+
+@pytest.fixture
+def addresses(tmp_path):
+    """A postcode file built from random addresses, and every address it should contain"""
+    rng = random.Random(44)
+    expected = {}
+    rows = []
+    for _ in range(400):
+        postcode = f"{rng.randint(1000, 9999)}{rng.choice('ABCZ')}{rng.choice('ABXZ')}"
+        street, city = rng.choice(STREETS), rng.choice(CITIES)
+        if rng.random() < 0.3:
+            low, step = rng.randint(1, 50), rng.choice((1, 2))
+            high = low + step * rng.randint(0, 20)
+            rows.append({"postcode": postcode, "street": street, "city": city, "number_from": str(low),
+                         "number_to": str(high), "step": str(step)})
+            numbers = range(low, high + 1, step)
+        else:
+            numbers = rng.sample(range(1, 120), rng.randint(1, 15))
+            rows.extend({"postcode": postcode, "street": street, "city": city, "house_number": f"{number}A"}
+                        for number in numbers)
+        for number in numbers:
+            expected.setdefault((postcode, number), set()).add((street, city))
+    path = tmp_path / 'postcodes.csv'
+    with open(path, 'w', newline='', encoding='utf-8') as target:
+        writer = csv.DictWriter(target, ["postcode", "street", "city", "house_number", "number_from", "number_to",
+                                         "step"])
+        writer.writeheader()
+        writer.writerows(rows)
+    build_postcode_file(str(path), str(tmp_path / 'postcodes.bin'))
+    book = PostcodeBook(str(tmp_path / 'postcodes.bin'))
+    yield book, expected
+    book.close()
+
+
+def test_every_address_resolves(addresses):
+    book, expected = addresses
+    postcodes = {postcode for postcode, _ in expected}
+    for postcode in postcodes:
+        spaced = f"{postcode[:4]} {postcode[4:].lower()}"
+        for number in range(0, 125):
+            found = book.resolve(spaced, str(number))
+            # Two streets may share a postcode and number; either is a valid answer
+            assert found in expected.get((postcode, number), {None}), (postcode, number)
+    assert book.resolve("1000AA", "") is None
+
+
+def test_streets_list_every_house_number(addresses):
+    book, expected = addresses
+    postcode = sorted({postcode for postcode, _ in expected})[0]
+    listed = {int(number) for entry in book.streets(postcode) for number in entry["houseNumbers"]}
+    assert listed == {number for code, number in expected if code == postcode}
+    # No generated postcode ends in QQ
+    assert book.streets("5000QQ") == []
+
+
+def test_runs_compress_consecutive_and_one_sided_numbers():
+    assert _runs([1, 2, 3, 5, 7, 9, 20]) == [(1, 3, 1), (5, 9, 2), (20, 20, 1)]
+    assert _runs([]) == []
+
+
+@pytest.mark.parametrize("value", ["0123AB", "1234 A", "12345AB", "", None, "1234 ab cd"])
+def test_invalid_postcodes(value):
+    with pytest.raises(InvalidPostcodeError):
+        normalize_postcode(value)
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / 'other.bin'
+    path.write_bytes(b'\x00' * 64)
+    with pytest.raises(ValueError):
+        PostcodeBook(str(path))
+
+
+
+def test_address_type_ahead_ranks_by_number_of_addresses(addresses):
+    book, expected = addresses
+    counts = {}
+    for places in expected.values():
+        for place in places:
+            counts[place] = counts.get(place, 0) + 1
+    streets, cities = address_indexes(book)
+    for street in STREETS:
+        found = streets.search(street[:4], 100)
+        assert {(entry["street"], entry["city"]): entry["addresses"] for entry in found} == {
+            place: count for place, count in counts.items() if place[0] == street}
+        assert [entry["addresses"] for entry in found] == sorted((entry["addresses"] for entry in found),
+                                                                 reverse=True)
+    # Any word of a city name finds it
+    assert [entry["city"] for entry in cities.search("hertog", 5)] == ["'s-Hertogenbosch"]
+    assert cities.search("utr", 5) == [{"city": "Utrecht", "addresses": sum(
+        count for (_, city), count in counts.items() if city == "Utrecht")}]
@@ -0,0 +1,137 @@
+import random
+from datetime import date, timedelta
+
+import pytest
+
+from bankdays import BusinessCalendar
+from ledger import Ledger
+from scheduler import (MAX_EXECUTIONS, STATUS_CANCELLED, STATUS_EXECUTED, STATUS_FAILED, STATUS_SCHEDULED,
+                       PaymentScheduler, occurrence_date)
+
+
+def _recorder():
+    executed = []
+    return executed, lambda payment, execution_date: executed.append((execution_date, payment["reference"]))
+
+
+def test_monthly_occurrences_clamp_to_the_month_end():
+    start = date(2024, 1, 31)
+    assert [occurrence_date(start, 'everyMonth', index) for index in range(4)] == [
+        date(2024, 1, 31), date(2024, 2, 29), date(2024, 3, 31), date(2024, 4, 30)]
+    assert occurrence_date(date(2024, 11, 15), 'everyMonth', 2) == date(2025, 1, 15)
+    assert occurrence_date(start, 'everyWeek', 2) == date(2024, 2, 14)
+    assert occurrence_date(start, 'oneOff', 5) == start
+
+
+def test_run_due_matches_expanding_every_payment():
+    rng = random.Random(11)
+    executed, execute = _recorder()
+    scheduler = PaymentScheduler(execute)
+    expected = []
+    for index in range(200):
+        start = date(2025, 1, 1) + timedelta(days=rng.randrange(90))
+        period = rng.choice(('oneOff', 'everyWeek', 'everyMonth'))
+        end = start + timedelta(days=rng.randrange(200)) if period != 'oneOff' and rng.random() < 0.7 else None
+        reference = f"P{index:03d}"
+        scheduler.schedule("CUST", "5000000001", "NL00", 100, start, period, end, reference=reference)
+        occurrence = 0
+        while True:
+            nominal = occurrence_date(start, period, occurrence)
+            if nominal > date(2025, 12, 31) or (end is not None and nominal > end):
+                break
+            expected.append((nominal, reference))
+            if period == 'oneOff':
+                break
+            occurrence += 1
+
+    # Run day by day, as the runner thread would
+    day = date(2025, 1, 1)
+    while day <= date(2025, 12, 31):
+        scheduler.run_due(day)
+        day += timedelta(days=1)
+    assert sorted(executed) == sorted(expected)
+    assert [execution for execution, _ in executed] == sorted(execution for execution, _ in executed)
+
+
+def test_cancelled_payments_are_skipped_and_the_heap_compacted():
+    executed, execute = _recorder()
+    scheduler = PaymentScheduler(execute)
+    for index in range(10):
+        scheduler.schedule("CUST", "5000000001", "NL00", 100, date(2025, 1, 1), 'everyWeek', reference=f"P{index}")
+    for index in range(6):
+        assert scheduler.cancel("CUST", f"P{index}")["status"] == STATUS_CANCELLED
+    assert scheduler.cancel("OTHER", "P9") is None
+    assert len(scheduler._heap) == 4
+    assert scheduler.run_due(date(2025, 1, 1)) == 4
+    assert sorted(reference for _, reference in executed) == ["P6", "P7", "P8", "P9"]
+    assert [payment["reference"] for payment in scheduler.list("CUST", STATUS_CANCELLED)] == [
+        f"P{index}" for index in range(6)]
+
+
+def test_occurrences_roll_to_business_days():
+    executed, execute = _recorder()
+    scheduler = PaymentScheduler(execute, BusinessCalendar())
+    # Saturday 26 April 2025 is also King's Day; Monday the 28th is the next business day
+    public = scheduler.schedule("CUST", "5000000001", "NL00", 100, date(2025, 4, 26), 'everyMonth',
+                                date(2025, 5, 31))
+    assert public["nextPaymentDate"] == '2025-04-26'
+    assert scheduler.next_due() == date(2025, 4, 28)
+    scheduler.run_due(date(2025, 6, 30))
+    assert [execution for execution, _ in executed] == [date(2025, 4, 28), date(2025, 5, 26)]
+    assert scheduler.get(public["reference"])["status"] == STATUS_EXECUTED
+
+
+def test_outcomes_are_recorded_and_trimmed():
+    def execute(payment, execution_date):
+        if execution_date.day % 2:
+            raise RuntimeError("declined")
+
+    scheduler = PaymentScheduler(execute)
+    weekly = scheduler.schedule("CUST", "5000000001", "NL00", 100, date(2025, 1, 1), 'everyWeek')["reference"]
+    failing = scheduler.schedule("CUST", "5000000001", "NL00", 100, date(2025, 1, 1))["reference"]
+    scheduler.run_due(date(2025, 12, 31))
+    executions = scheduler._payments[weekly]["executions"]
+    assert len(executions) == MAX_EXECUTIONS
+    assert executions[-1]["date"] == '2025-12-31'
+    assert scheduler.get(weekly)["status"] == STATUS_SCHEDULED
+    assert scheduler.get(failing)["status"] == STATUS_FAILED
+    assert scheduler._payments[failing]["executions"] == [
+        {"date": '2025-01-01', "status": STATUS_FAILED, "error": "declined"}]
+
+
+def test_finished_payments_are_bounded():
+    scheduler = PaymentScheduler(lambda payment, execution_date: None, max_finished=5)
+    for index in range(20):
+        scheduler.schedule("CUST", "5000000001", "NL00", 100, date(2025, 1, 1) + timedelta(days=index))
+    scheduler.run_due(date(2025, 2, 1))
+    assert len(scheduler) == 5
+    assert len(scheduler.list("CUST", None)) == 5
+
+
+def test_schedule_rejects_duplicates_and_empty_ranges():
+    scheduler = PaymentScheduler(lambda payment, execution_date: None)
+    scheduler.schedule("CUST", "5000000001", "NL00", 100, date(2025, 1, 1), reference="P1")
+    with pytest.raises(ValueError):
+        scheduler.schedule("CUST", "5000000001", "NL00", 100, date(2025, 1, 1), reference="P1")
+    with pytest.raises(ValueError):
+        scheduler.schedule("CUST", "5000000001", "NL00", 100, date(2025, 2, 1), 'everyMonth', date(2025, 1, 1))
+
+
+def test_schedulers_sharing_a_ledger_book_each_occurrence_once(tmp_path):
+    """Two server processes hold the same schedule; the ledger claim keeps them from booking twice"""
+    ledger = Ledger(str(tmp_path))
+    account = ledger.open_account("5000000002", opening_balance=100.00)
+
+    def execute(payment, execution_date):
+        with account.claim():
+            if account.last_posting(payment["reference"], since=execution_date) is None:
+                account.append(execution_date, -payment["amount"], payment["description"], payment["reference"])
+
+    schedulers = [PaymentScheduler(execute), PaymentScheduler(execute)]
+    for scheduler in schedulers:
+        scheduler.schedule("CUST", "5000000002", "NL00", 250, date(2025, 1, 6), 'everyWeek', date(2025, 2, 28),
+                           reference="FPSHARED")
+    for scheduler in schedulers:
+        scheduler.run_due(date(2025, 3, 31))
+    assert len(account) == 8
+    assert account.balance == 10000 - 8 * 250
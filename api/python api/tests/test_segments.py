@@ -0,0 +1,112 @@
+import threading
+
+import pytest
+
+import segments
+from segments import TYPE_CODES, SegmentStore, decode_record
+
+CREDIT = TYPE_CODES['CREDIT']
+INTEREST = TYPE_CODES['INTEREST']
+
+
+@pytest.fixture
+def small_segments(monkeypatch):
+    """Segments of 40 records growing 16 at a time, so rollover and growth happen within a test"""
+    monkeypatch.setattr(segments, 'SEGMENT_RECORDS', 40)
+    monkeypatch.setattr(segments, 'GROW_RECORDS', 16)
+
+
+def test_append_keeps_running_totals(tmp_path):
+    store = SegmentStore(str(tmp_path), opening_balance=1000)
+    store.append(738000, 500, CREDIT, 'A', 'Deposit')
+    store.append(738001, -200, TYPE_CODES['DEBIT'], 'B', 'Withdrawal')
+    store.append(738001, 30, INTEREST, 'C', 'Interest')
+    assert len(store) == 3
+    assert store.cumulative(0) == (1000, 0, 0, 0)
+    assert store.cumulative(3) == (1330, 530, 200, 30)
+    fields = decode_record(store.record(1))
+    assert (fields["day"], fields["amount"], fields["balance"], fields["reference"]) == (738001, -200, 1300, 'B')
+
+
+def test_rollover_into_new_segments(tmp_path, small_segments):
+    store = SegmentStore(str(tmp_path))
+    for i in range(100):
+        store.append(738000 + i // 3, 1, CREDIT, f'R{i}', 'x')
+    assert len(store.segments) == 3
+    assert len(store) == 100
+    assert [decode_record(store.record(i))["reference"] for i in (0, 39, 40, 99)] == ['R0', 'R39', 'R40', 'R99']
+    assert store.cumulative(100)[0] == 100
+    assert store.bisect_left(738020) == 60
+    assert store.bisect_right(738020) == 63
+
+
+def test_appends_must_be_in_date_order(tmp_path):
+    store = SegmentStore(str(tmp_path))
+    store.append(738005, 1, CREDIT, 'A', 'x')
+    with pytest.raises(ValueError):
+        store.append(738004, 1, CREDIT, 'B', 'x')
+    assert len(store) == 1
+
+
+def test_sync_picks_up_another_stores_appends(tmp_path, small_segments):
+    writer = SegmentStore(str(tmp_path))
+    reader = SegmentStore(str(tmp_path))
+    for i in range(90):
+        writer.append(738000, 1, CREDIT, f'R{i}', 'x')
+    reader.sync()
+    assert len(reader) == 90
+    assert [segment.index for segment in reader.segments] == [0, 1, 2]
+    assert reader.cumulative(90) == writer.cumulative(90)
+
+
+def test_concurrent_syncs_add_each_segment_once(tmp_path, small_segments):
+    writer = SegmentStore(str(tmp_path))
+    for i in range(130):
+        writer.append(738000, 1, CREDIT, f'R{i}', 'x')
+    for _ in range(10):
+        reader = SegmentStore.__new__(SegmentStore)
+        reader.directory, reader.segments, reader._lock = str(tmp_path), [], threading.Lock()
+        barrier = threading.Barrier(8)
+        errors = []
+
+        def sync():
+            barrier.wait()
+            try:
+                reader.sync()
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=sync) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert errors == []
+        assert [segment.index for segment in reader.segments] == [0, 1, 2, 3]
+        assert len(reader) == 130
+
+
+def test_stores_appending_at_once_lose_nothing(tmp_path, small_segments):
+    # Separate stores on one directory stand in for separate processes; the file lock orders them
+    stores = [SegmentStore(str(tmp_path)) for _ in range(4)]
+
+    def append(store):
+        for i in range(50):
+            store.append(738000, 1, CREDIT, 'R', 'x')
+
+    threads = [threading.Thread(target=append, args=(store,)) for store in stores]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    check = SegmentStore(str(tmp_path))
+    assert len(check) == 200
+    assert [check.cumulative(i)[0] for i in range(201)] == list(range(201))
+
+
+def test_text_fields_are_truncated_on_a_character_boundary(tmp_path):
+    store = SegmentStore(str(tmp_path))
+    store.append(738000, 1, CREDIT, 'é' * 10, 'ü' * 40)
+    fields = decode_record(store.record(0))
+    assert fields["reference"] == 'é' * 8
+    assert fields["description"] == 'ü' * 29
@@ -0,0 +1,138 @@
+from datetime import date, datetime
+
+import pytest
+
+from iban import build_iban
+from ledger import Ledger
+from transfers import DAILY_LIMIT, SimulationError, TransferEngine
+
+# A Tuesday morning, before every cut-off
+NOW = datetime(2025, 3, 4, 10, 0)
+TARGET = build_iban('NL', 'ABNA0417164300')
+
+
+@pytest.fixture
+def engine(tmp_path):
+    ledger = Ledger(str(tmp_path))
+    accounts = {}
+    for account_number, balance, profile in (("4000000001", 50000.00, {"allowPaymentOrderOut": True,
+                                                                        "allowOwnTransferOut": True}),
+                                             ("4000000002", 100.00, {"allowPaymentOrderOut": True,
+                                                                     "allowOwnTransferOut": True}),
+                                             ("4000000003", 100.00, {})):
+        ledger.open_account(account_number, opening_balance=balance)
+        accounts[account_number] = {"accountNumber": account_number, "status": "active", "currencyCode": "EUR",
+                                    "IBAN": build_iban('NL', f"DHBN{account_number}"), "operationProfile": profile}
+    return TransferEngine(accounts.get, ledger)
+
+
+def _code(call, *args, **kwargs):
+    with pytest.raises(SimulationError) as error:
+        call(*args, now=NOW, **kwargs)
+    return error.value.code
+
+
+@pytest.mark.parametrize("payment_type, period, field", [
+    ('normal', 'oneOff', 'payment_date'),
+    ('normal', 'oneOff', 'start_date'),
+    ('future', 'oneOff', 'payment_date'),
+    ('future', 'everyMonth', 'start_date'),
+    ('periodic', 'everyWeek', 'end_date'),
+])
+@pytest.mark.parametrize("value", ['04-03-2025', '2025-02-30', 'tomorrow', 20250304])
+def test_malformed_dates_are_rejected_for_every_payment_type(engine, payment_type, period, field, value):
+    dates = {'payment_date': '2025-03-10', field: value}
+    assert _code(engine.simulate, "4000000001", TARGET, 10.00, payment_type=payment_type, period=period,
+                 **dates) == '470'
+
+
+def test_past_dates_keep_their_codes(engine):
+    assert _code(engine.simulate, "4000000001", TARGET, 10.00, payment_type='future',
+                 payment_date='2025-03-03') == '458'
+    assert _code(engine.simulate, "4000000001", TARGET, 10.00, payment_type='periodic', period='everyMonth',
+                 start_date='2025-03-03') == '459'
+    assert _code(engine.simulate, "4000000001", TARGET, 10.00, payment_type='periodic', period='everyMonth',
+                 start_date='2025-03-10', end_date='2025-03-09') == '460'
+    assert _code(engine.simulate_own_transfer, "4000000001", "4000000002", 10.00, payment_date='2025-03-03') == '459'
+    assert _code(engine.simulate_own_transfer, "4000000001", "4000000002", 10.00, payment_date='3 March') == '470'
+
+
+def test_fees_and_delivery_dates(engine):
+    normal = engine.simulate("4000000001", TARGET, 10.00, now=NOW)
+    assert (normal["fees"], normal["executionDate"], normal["estimatedDelivery"]) == (0.0, '2025-03-04', '2025-03-05')
+    urgent = engine.simulate("4000000001", TARGET, 10.00, payment_type='urgent', now=NOW)
+    assert (urgent["fees"], urgent["totalAmount"], urgent["estimatedDelivery"]) == (5.0, 15.0, '2025-03-04')
+    # After the cut-off a normal payment moves to the next business day
+    late = engine.simulate("4000000001", TARGET, 10.00, now=datetime(2025, 3, 7, 15, 30))
+    assert (late["executionDate"], late["estimatedDelivery"]) == ('2025-03-10', '2025-03-11')
+    # King's Day is not a business day
+    future = engine.simulate("4000000001", TARGET, 10.00, payment_type='future', payment_date='2025-04-26', now=NOW)
+    assert future["executionDate"] == '2025-04-28'
+
+
+def test_standing_order_lists_its_next_dates(engine):
+    simulation = engine.simulate("4000000001", TARGET, 10.00, payment_type='periodic', period='everyMonth',
+                                 start_date='2025-03-31', end_date='2025-05-31', now=NOW)
+    # An occurrence on a weekend moves to the next business day
+    assert simulation["nextPaymentDates"] == ['2025-03-31', '2025-04-30', '2025-06-02']
+
+
+def test_balance_permission_and_limit_checks(engine):
+    assert _code(engine.simulate, "4000000002", TARGET, 100.01) == '455'
+    assert engine.simulate("4000000002", TARGET, 100.00, now=NOW)["balanceAfter"] == 0.0
+    assert _code(engine.simulate, "4000000003", TARGET, 1.00) == '470'
+    assert _code(engine.simulate, "4000000001", TARGET, DAILY_LIMIT / 100 + 0.01) == '462'
+    assert _code(engine.simulate, "4000000001", 'NL00ABNA0417164300', 1.00) == '457'
+    assert _code(engine.simulate, "4000000001", TARGET, 0) == '470'
+    assert _code(engine.simulate, "4999999999", TARGET, 1.00) == '452'
+
+
+def test_own_transfer(engine):
+    simulation = engine.simulate_own_transfer("4000000001", "4000000002", 25.00, now=NOW)
+    assert (simulation["paymentDate"], simulation["balanceAfter"]) == (date(2025, 3, 4).isoformat(), 49975.0)
+    assert _code(engine.simulate_own_transfer, "4000000001", "4000000001", 1.00) == '460'
+    assert _code(engine.simulate_own_transfer, "4000000003", "4000000001", 1.00) == '470'
+
+
+def test_batch_matches_single_simulations(engine):
+    payments = [
+        {"sourceAccount": "4000000001", "targetIBAN": TARGET, "amount": 12.34},
+        {"sourceAccount": "4000000001", "targetIBAN": TARGET, "amount": 5.00, "paymentType": "urgent"},
+        {"sourceAccount": "4000000001", "targetIBAN": TARGET, "amount": 7.00, "paymentType": "future",
+         "paymentDate": "2025-04-26"},
+        {"sourceAccount": "4000000001", "targetIBAN": "NL00ABNA0417164300", "amount": 1.00},
+        {"sourceAccount": "4000000003", "targetIBAN": TARGET, "amount": 1.00},
+    ]
+    results = list(engine.simulate_batch(payments, now=NOW))
+    assert [result["index"] for result in results] == list(range(len(payments)))
+    for payment, result in zip(payments, results):
+        try:
+            single = engine.simulate(payment["sourceAccount"], payment["targetIBAN"], payment["amount"],
+                                     payment_type=payment.get("paymentType", "normal"),
+                                     payment_date=payment.get("paymentDate"), now=NOW)
+        except SimulationError as e:
+            assert result["status"] == "REJECTED"
+            assert result["error"]["code"] == e.code
+            continue
+        assert result["status"] == "SIMULATED"
+        for field in ("targetIBAN", "amount", "fees", "totalAmount", "executionDate", "estimatedDelivery"):
+            assert result[field] == single[field]
+
+
+def test_batch_items_share_balance_and_daily_limit(engine):
+    payments = [{"sourceAccount": "4000000002", "targetIBAN": TARGET, "amount": 60.00}] * 2
+    assert [result["status"] for result in engine.simulate_batch(payments, now=NOW)] == ["SIMULATED", "REJECTED"]
+
+    half = DAILY_LIMIT / 200
+    payments = [{"sourceAccount": "4000000001", "targetIBAN": TARGET, "amount": half}] * 3
+    payments.append({"sourceAccount": "4000000001", "targetIBAN": TARGET, "amount": half, "paymentType": "future",
+                     "paymentDate": "2025-03-05"})
+    results = list(engine.simulate_batch(payments, now=NOW))
+    assert [result["status"] for result in results] == ["SIMULATED", "SIMULATED", "REJECTED", "SIMULATED"]
+    assert results[2]["error"]["code"] == '462'
+    assert results[1]["balanceAfter"] == 50000.00 - 2 * half
+
+
+def test_batch_rejects_malformed_items_without_raising(engine):
+    results = list(engine.simulate_batch(["not a payment", {}, {"sourceAccount": "4999999999"}], now=NOW))
+    assert [result["error"]["code"] for result in results] == ['470', '456', '452']
@@ -0,0 +1,125 @@
+import random
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from vop import (CLOSE_MATCH, MATCH, NO_MATCH, NOT_APPLICABLE, HolderName, PayeeIndex, jaro_winkler, VerificationCache,
+                 match_name, normalize_name, verify_batch)
+
+IBAN = 'NL44DHBN2018470578'
+
+
+@pytest.mark.parametrize("first, second, expected", [
+    ("martha", "marhta", 0.9611),
+    ("dwayne", "duane", 0.84),
+    ("dixon", "dicksonx", 0.8133),
+    ("abc", "abc", 1.0),
+    ("abc", "", 0.0),
+    ("abc", "xyz", 0.0),
+])
+def test_jaro_winkler_reference_values(first, second, expected):
+    assert jaro_winkler(first, second) == pytest.approx(expected, abs=1e-4)
+    assert jaro_winkler(second, first) == pytest.approx(expected, abs=1e-4)
+
+
+def test_normalize_name():
+    assert normalize_name("Dhr. Jürgen  Müller") == ("jurgen", "muller")
+    assert normalize_name("Bakker & Zonen B.V.") == ("bakker", "zonen")
+    assert normalize_name("O'Brien-Smith Holding N.V.") == ("obrien", "smith")
+    assert normalize_name("") == normalize_name(None) == ()
+
+
+@pytest.mark.parametrize("holder, query, code", [
+    ("Lucy Lavender", "Lucy Lavender", MATCH),
+    ("Lucy Lavender", "lavender lucy", MATCH),
+    ("Lucy Lavender", "Mrs. LUCY LAVENDER", MATCH),
+    ("Lucy Jane Lavender", "Lucy Lavender", CLOSE_MATCH),
+    ("Lucy Jane Lavender", "L. Lavender", CLOSE_MATCH),
+    ("Lucy Jane Lavender", "LJ Lavender", CLOSE_MATCH),
+    ("Lucy Lavender", "Lucy Lavendar", CLOSE_MATCH),
+    ("Lucy Jane Lavender", "J. Lavender", NO_MATCH),
+    ("Lucy Lavender", "Pieter Jansen", NO_MATCH),
+    ("Lucy Lavender", "Lu", NO_MATCH),
+    ("Lucy Lavender", "", NO_MATCH),
+])
+def test_match_name(holder, query, code):
+    assert match_name(query, HolderName(holder))[0] == code
+
+
+def test_company_names_ignore_legal_forms():
+    holder = HolderName("Bakker Transport B.V.")
+    assert match_name("Bakker Transport", holder) == (MATCH, 1.0)
+    assert match_name("BAKKER TRANSPORT BV", holder) == (MATCH, 1.0)
+    assert match_name("Bakker Transprot", holder)[0] == CLOSE_MATCH
+
+
+def test_verify_discloses_the_name_only_on_a_close_match():
+    index = PayeeIndex()
+    index.add(IBAN, "Lucy Jane Lavender")
+    assert index.verify('nl44 dhbn 2018 4705 78', "Lucy Jane Lavender")["verificationStatus"] == 'VERIFIED'
+    close = index.verify(IBAN, "L. Lavender")
+    assert (close["partyNameMatch"], close["matchedName"]) == (CLOSE_MATCH, "Lucy Jane Lavender")
+    assert index.verify(IBAN, "Someone Else")["matchedName"] is None
+    unknown = index.verify('NL17DHBN2018470579', "Lucy Jane Lavender")
+    assert (unknown["partyNameMatch"], unknown["verificationStatus"]) == (NOT_APPLICABLE, 'NOT_POSSIBLE')
+    index.remove(IBAN)
+    assert index.verify(IBAN, "Lucy Jane Lavender")["partyNameMatch"] == NOT_APPLICABLE
+
+
+class CountingIndex(PayeeIndex):
+    def __init__(self, cache=None):
+        super().__init__(cache)
+        self.calls = 0
+
+    def verify(self, iban, beneficiary_name):
+        self.calls += 1
+        return super().verify(iban, beneficiary_name)
+
+
+def test_verify_batch_keeps_input_order_and_matches_duplicates_once():
+    rng = random.Random(9)
+    index = CountingIndex()
+    holders = {f"NL{number:02d}DHBN{number:010d}": f"Holder {number} Jansen" for number in range(50)}
+    for iban, name in holders.items():
+        index.add(iban, name)
+    pairs = [(rng.choice(list(holders)), rng.choice(("Holder {} Jansen", "H. Jansen", "Other {}")).format(number))
+             for number in range(2000)]
+    expected = [PayeeIndex.verify(index, iban, name) for iban, name in pairs]
+    index.calls = 0
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(verify_batch(index, pairs, executor, chunk_size=64))
+    assert results == expected
+    # Chunks on different threads may race to match the same pair; one worker shows the reuse exactly
+    index.calls = 0
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        assert list(verify_batch(index, pairs, executor, chunk_size=64)) == expected
+    assert index.calls == len(set(pairs))
+
+
+def test_cache_answers_repeats_until_the_holder_is_renamed():
+    cache = VerificationCache()
+    index = PayeeIndex(cache)
+    index.add(IBAN, "Lucy Lavender")
+    first = index.verify(IBAN, "Lucy Lavender")
+    # The same normalized name is the same cache key
+    assert index.verify(IBAN.lower(), "MRS. lucy  lavender") is first
+    assert (cache.hits, cache.misses) == (1, 1)
+    index.add(IBAN, "Pieter Jansen")
+    assert index.verify(IBAN, "Lucy Lavender")["partyNameMatch"] == NO_MATCH
+    assert cache.metrics()["invalidations"] == 1
+
+
+def test_cache_expires_and_is_bounded(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr('vop.time.monotonic', lambda: clock[0])
+    cache = VerificationCache(max_entries=3, ttl=10)
+    holder = HolderName("Lucy Lavender")
+    for number in range(5):
+        cache.put(number, holder, {"number": number})
+    assert cache.get(0, holder) is None
+    assert cache.get(4, holder) == {"number": 4}
+    clock[0] += 11
+    assert cache.get(4, holder) is None
+    metrics = cache.metrics()
+    assert (metrics["size"], metrics["evictions"], metrics["hits"], metrics["misses"]) == (2, 2, 1, 2)
+    assert metrics["hitRate"] == pytest.approx(1 / 3, abs=1e-4)
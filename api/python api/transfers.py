@@ -0,0 +1,381 @@
+"""Transfer simulation engine: balance, permission, fee and delivery-date checks"""
+import threading
+import uuid
+from datetime import datetime, time, timedelta
+
+from balances import BalanceBook, ConcurrentUpdateError, InsufficientFundsError
+from bankdays import BusinessCalendar
+from iban import InvalidIBANError, validate_iban
+from ledger import from_cents, parse_day, to_cents
+from scheduler import occurrence_date
+
+# Fee per payment type, in cents
+FEE_SCHEDULE = {
+    'normal': 0,
+    'future': 0,
+    'periodic': 0,
+    'urgent': 500
+}
+
+# Orders received after the cut-off are processed on the next business day
+CUT_OFF_TIMES = {
+    'normal': time(15, 0),
+    'urgent': time(16, 30)
+}
+
+# Business days between execution and crediting the beneficiary
+SETTLEMENT_DAYS = {
+    'normal': 1,
+    'future': 1,
+    'periodic': 1,
+    'urgent': 0
+}
+
+PERIODS = ('oneOff', 'everyWeek', 'everyMonth')
+
+# Maximum outgoing amount per source account and execution date, in cents
+DAILY_LIMIT = 2500000
+
+# Occurrences of a standing order listed in its simulation
+UPCOMING_DATES = 3
+
+
+class SimulationError(Exception):
+    """Simulation rejected; code is one of the YAML error codes"""
+
+    def __init__(self, code, description):
+        super().__init__(description)
+        self.code = code
+        self.description = description
+
+
+def _parse_date(value, field):
+    """Date of an optional request field, None when absent; a malformed value is rejected with 470"""
+    if not value:
+        return None
+    try:
+        return parse_day(value)
+    except (TypeError, ValueError):
+        raise SimulationError('470', f'{field} must be formatted as YYYY-MM-DD')
+
+
+class TransferEngine:
+    """Simulates payments against account rules and the ledger balance.
+
+    Per-account rules (status, currency, operationProfile flags, ledger) are
+    looked up once and memoized; call invalidate() when an account changes.
+    Money is moved through a BalanceBook so concurrent postings on the same
+    account are serialized.
+    """
+
+    def __init__(self, account_lookup, ledger, calendar=None, balances=None):
+        self.account_lookup = account_lookup
+        self.ledger = ledger
+        self.calendar = calendar or BusinessCalendar()
+        self.balances = balances or BalanceBook(ledger, account_lookup)
+        self._rules = {}
+        self._lock = threading.Lock()
+
+    def rules(self, account_number):
+        """Memoized rule set of a source account, or None if unknown"""
+        rules = self._rules.get(account_number)
+        if rules is None:
+            account = self.account_lookup(account_number)
+            if account is None:
+                return None
+            profile = account.get("operationProfile", {})
+            rules = {
+                "accountNumber": account["accountNumber"],
+                "IBAN": account.get("IBAN"),
+                "active": account.get("status") == "active",
+                "currencyCode": account.get("currencyCode", "EUR"),
+                "allowPaymentOrderOut": profile.get("allowPaymentOrderOut", False),
+                "allowOwnTransferOut": profile.get("allowOwnTransferOut", False),
+                "ledger": self.ledger.get(account["accountNumber"]),
+                "fallbackBalance": to_cents(account.get("detail", {}).get("balance", 0.0))
+            }
+            with self._lock:
+                self._rules[account_number] = rules
+        return rules
+
+    def invalidate(self, account_number=None):
+        """Forget memoized rules for one account (by number or IBAN) or all accounts"""
+        with self._lock:
+            if account_number is None:
+                self._rules.clear()
+                return
+            for key, rules in list(self._rules.items()):
+                if account_number in (key, rules["accountNumber"], rules["IBAN"]):
+                    del self._rules[key]
+
+    def available_balance(self, rules):
+        """Current balance of a source account in cents"""
+        account = rules["ledger"]
+        return account.balance if account is not None else rules["fallbackBalance"]
+
+    def delivery_dates(self, payment_type, requested_date, now, country_code='NL'):
+        """(executionDate, estimatedDelivery) for a payment"""
+        calendar = self.calendar
+        if requested_date is not None:
+            execution = calendar.next_business_day(requested_date, country_code)
+        else:
+            execution = now.date()
+            cut_off = CUT_OFF_TIMES.get(payment_type)
+            if not calendar.is_business_day(execution, country_code) or (cut_off and now.time() > cut_off):
+                execution = calendar.next_business_day(execution + timedelta(days=1), country_code)
+        delivery = calendar.add_business_days(execution, SETTLEMENT_DAYS.get(payment_type, 1), country_code)
+        return execution, delivery
+
+    def _evaluate(self, rules, target_iban, amount, currency_code, payment_type, period,
+                  payment_date, start_date, end_date, country_code, now, available, used_by_date, dates):
+        """Validate one payment against the rules.
+
+        Returns (normalized target IBAN, cents, fees, execution, delivery,
+        recurrence), recurrence being (start, end or None) of a standing
+        order and None for a single payment.
+
+        available is the source balance in cents, used_by_date maps execution
+        dates to amounts already committed against the daily limit, and dates
+        caches delivery dates per (payment type, requested date).
+        """
+        if not target_iban:
+            raise SimulationError('457', 'Target iban is null')
+        try:
+            target_iban = validate_iban(target_iban)
+        except InvalidIBANError as e:
+            raise SimulationError('457', f'Invalid target iban: {e}')
+        fees = FEE_SCHEDULE.get(payment_type)
+        if fees is None:
+            raise SimulationError('470', f'Unknown payment type: {payment_type}')
+        if period not in PERIODS:
+            raise SimulationError('470', f'Unknown period: {period}')
+        try:
+            cents = to_cents(amount)
+        except (TypeError, ValueError, OverflowError):
+            raise SimulationError('470', 'Amount must be a number')
+        if cents <= 0:
+            raise SimulationError('470', 'Amount must be positive')
+
+        if not rules["active"]:
+            raise SimulationError('470', 'Source account is not active')
+        if not rules["allowPaymentOrderOut"]:
+            raise SimulationError('470', 'Payment orders are not allowed from this account')
+        if currency_code != rules["currencyCode"]:
+            raise SimulationError('470', f'Currency {currency_code} does not match account currency')
+
+        # Dates are checked for format whatever the payment type, even where they go unused
+        today = now.date()
+        payment_day = _parse_date(payment_date, 'paymentDate')
+        start_day = _parse_date(start_date, 'startDate')
+        end_day = _parse_date(end_date, 'endDate')
+        requested_date = None
+        recurrence = None
+        if payment_type == 'periodic' and period == 'oneOff':
+            raise SimulationError('470', 'Periodic payments need everyWeek or everyMonth')
+        if period != 'oneOff':
+            # Every standing order, future or periodic, runs from its start date
+            start = start_day or today
+            if start < today:
+                raise SimulationError('459', 'Start date is less than sysdate')
+            if end_day is not None and end_day < start:
+                raise SimulationError('460', 'End date is less than start date')
+            recurrence = (start, end_day)
+        if payment_type == 'future':
+            if payment_day is None or payment_day < today:
+                raise SimulationError('458', 'Check payment date')
+            requested_date = payment_day
+        elif recurrence is not None:
+            requested_date = recurrence[0]
+
+        total = cents + fees
+        if total > available:
+            raise SimulationError('455', 'Account balance is not enough')
+
+        key = (payment_type, requested_date)
+        scheduled = dates.get(key)
+        if scheduled is None:
+            scheduled = dates[key] = self.delivery_dates(payment_type, requested_date, now, country_code)
+        execution, delivery = scheduled
+
+        if used_by_date.get(execution, 0) + total > DAILY_LIMIT:
+            raise SimulationError('462', 'Transaction amount exceeds daily transaction amount')
+        return target_iban, cents, fees, execution, delivery, recurrence
+
+    def simulate(self, source_account, target_iban, amount, currency_code='EUR', description='',
+                 payment_type='normal', period='oneOff', payment_date=None, start_date=None,
+                 end_date=None, country_code='NL', now=None):
+        """Simulate one payment; raises SimulationError when it would be rejected"""
+        now = now or datetime.now()
+        rules = self.rules(source_account)
+        if rules is None:
+            raise SimulationError('452', 'No data found')
+        available = self.available_balance(rules)
+        target_iban, cents, fees, execution, delivery, recurrence = self._evaluate(
+            rules, target_iban, amount, currency_code, payment_type, period,
+            payment_date, start_date, end_date, country_code, now, available, {}, {}
+        )
+        total = cents + fees
+        simulation = {
+            "simulationId": str(uuid.uuid4()),
+            "sourceAccount": source_account,
+            "targetIBAN": target_iban,
+            "amount": from_cents(cents),
+            "currencyCode": currency_code,
+            "description": description,
+            "paymentType": payment_type,
+            "period": period,
+            "fees": from_cents(fees),
+            "totalAmount": from_cents(total),
+            "availableBalance": from_cents(available),
+            "balanceAfter": from_cents(available - total),
+            "executionDate": execution.isoformat(),
+            "estimatedDelivery": delivery.isoformat(),
+            "status": "SIMULATED"
+        }
+        if recurrence is not None:
+            simulation["startDate"] = recurrence[0].isoformat()
+            simulation["endDate"] = recurrence[1].isoformat() if recurrence[1] else None
+            simulation["nextPaymentDates"] = self.upcoming_dates(recurrence[0], period, recurrence[1], country_code)
+        return simulation
+
+    def upcoming_dates(self, start, period, end=None, country_code='NL', count=UPCOMING_DATES):
+        """Execution dates of the first count occurrences of a standing order"""
+        dates = []
+        for index in range(count):
+            nominal = occurrence_date(start, period, index)
+            if end is not None and nominal > end:
+                break
+            dates.append(self.calendar.next_business_day(nominal, country_code).isoformat())
+        return dates
+
+    def execute(self, source_account, target_iban, cents, description, reference, execution_date,
+                expected_version=None):
+        """Book a payment of cents on execution_date: debit the source, credit an own target account.
+
+        Returns the source ledger row; expected_version (from a simulation)
+        makes the booking fail if the source account changed in between.
+        """
+        rules = self.rules(source_account)
+        if rules is None or rules["ledger"] is None:
+            raise SimulationError('452', 'No data found')
+        if not rules["active"]:
+            raise SimulationError('470', 'Source account is not active')
+        target = self.rules(target_iban) if target_iban else None
+        target_account = target["accountNumber"] if target is not None and target["ledger"] is not None else None
+        try:
+            return self.balances.transfer(rules["accountNumber"], target_account, cents, description,
+                                          reference, execution_date, expected_version)
+        except InsufficientFundsError:
+            raise SimulationError('455', 'Account balance is not enough')
+        except ConcurrentUpdateError:
+            raise SimulationError('470', 'Account was changed by another transaction, simulate again')
+
+    def simulate_own_transfer(self, source_account, target_account, amount, currency_code='EUR',
+                              description='', payment_date=None, now=None):
+        """Simulate a transfer between two own accounts; raises SimulationError when rejected"""
+        now = now or datetime.now()
+        if not target_account:
+            raise SimulationError('457', 'Target account number is null')
+        rules = self.rules(source_account)
+        target = self.rules(target_account)
+        if rules is None or target is None:
+            raise SimulationError('452', 'No data found')
+        if rules["accountNumber"] == target["accountNumber"]:
+            raise SimulationError('460', 'Source account number and target account number cannot be same')
+        if not rules["active"] or not rules["allowOwnTransferOut"]:
+            raise SimulationError('470', 'Source account is not allowed for own transfer')
+        if rules["ledger"] is None or target["ledger"] is None:
+            raise SimulationError('452', 'No data found')
+        if currency_code != rules["currencyCode"] or currency_code != target["currencyCode"]:
+            raise SimulationError('470', f'Currency {currency_code} does not match account currency')
+        try:
+            cents = to_cents(amount)
+        except (TypeError, ValueError, OverflowError):
+            raise SimulationError('470', 'Amount must be a number')
+        if cents <= 0:
+            raise SimulationError('470', 'Amount must be positive')
+        if cents > DAILY_LIMIT:
+            raise SimulationError('462', 'Transaction amount exceeds daily transaction amount')
+        day = _parse_date(payment_date, 'paymentDate') or now.date()
+        if day < now.date():
+            raise SimulationError('459', 'Payment date is less than sysdate')
+
+        available, version = self.balances.read(rules["accountNumber"])
+        if cents > available:
+            raise SimulationError('455', 'Account balance is not enough')
+        return {
+            "sourceAccountNumber": rules["accountNumber"],
+            "sourceIBAN": rules["IBAN"],
+            "targetAccountNumber": target["accountNumber"],
+            "targetIBAN": target["IBAN"],
+            "paymentDate": day.isoformat(),
+            "currencyCode": currency_code,
+            "amount": from_cents(cents),
+            "commissionAmount": 0.0,
+            "description": description,
+            "availableBalance": from_cents(available),
+            "balanceAfter": from_cents(available - cents),
+            "version": version
+        }
+
+    def simulate_batch(self, payments, country_code='NL', now=None, batch_id=None):
+        """Simulate a batch of payments in order, yielding one result per item.
+
+        Payments from the same source account share a running balance and
+        daily limit, so later items see the effect of earlier accepted ones.
+        Rejected items yield a REJECTED result instead of raising.
+        """
+        now = now or datetime.now()
+        batch_id = batch_id or uuid.uuid4().hex
+        sources = {}
+        dates = {}
+        date_text = {}
+        for index, payment in enumerate(payments):
+            source_account = None
+            try:
+                if not isinstance(payment, dict):
+                    raise SimulationError('470', 'Payment must be an object')
+                source_account = payment.get('sourceAccount')
+                if not source_account:
+                    raise SimulationError('456', 'Source account number is null')
+                state = sources.get(source_account)
+                if state is None:
+                    rules = self.rules(source_account)
+                    if rules is None:
+                        raise SimulationError('452', 'No data found')
+                    state = sources[source_account] = [rules, self.available_balance(rules), {}]
+                rules, available, used_by_date = state
+                target_iban, cents, fees, execution, delivery, _ = self._evaluate(
+                    rules, payment.get('targetIBAN'), payment.get('amount', 0),
+                    payment.get('currencyCode', 'EUR'), payment.get('paymentType', 'normal'),
+                    payment.get('period', 'oneOff'), payment.get('paymentDate'), payment.get('startDate'),
+                    payment.get('endDate'), country_code, now, available, used_by_date, dates
+                )
+            except SimulationError as e:
+                yield {
+                    "index": index,
+                    "sourceAccount": source_account,
+                    "status": "REJECTED",
+                    "error": {"code": e.code, "message": e.description}
+                }
+                continue
+
+            total = cents + fees
+            state[1] = available - total
+            used_by_date[execution] = used_by_date.get(execution, 0) + total
+            texts = date_text.get((execution, delivery))
+            if texts is None:
+                texts = date_text[(execution, delivery)] = (execution.isoformat(), delivery.isoformat())
+            yield {
+                "index": index,
+                "simulationId": f"{batch_id}-{index}",
+                "sourceAccount": source_account,
+                "targetIBAN": target_iban,
+                "amount": cents / 100,
+                "fees": fees / 100,
+                "totalAmount": total / 100,
+                "balanceAfter": (available - total) / 100,
+                "executionDate": texts[0],
+                "estimatedDelivery": texts[1],
+                "status": "SIMULATED"
+            }
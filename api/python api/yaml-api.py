@@ -1,11 +1,31 @@
-from flask import Flask, jsonify, request
+from flask import Flask, jsonify, request, Response
 from flask_cors import CORS
 import yaml
 import os
 import re
-from datetime import datetime, timedelta
+from datetime import MAXYEAR, MINYEAR, datetime, timedelta
 import uuid
 import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from ledger import create_seeded_ledger, to_cents
+from jobs import JobQueue, STATUS_COMPLETED
+from export import EXPORT_FORMATS, gzip_chunks
+from events import create_seeded_event_store, ACCOUNT_CLOSED, ACCOUNT_MODIFIED, ACCOUNT_OPENED, NOTICE_GIVEN
+from transfers import TransferEngine, SimulationError
+from balances import InsufficientFundsError
+from accounts import AccountIndex, INDEX_OPENED
+from idempotency import IdempotencyCache, idempotent
+from scheduler import PaymentScheduler
+from iban import InvalidIBANError, build_iban, derive_bic, validate_iban, validate_ibans
+from vop import PayeeIndex, VerificationCache, verify_batch
+from autocomplete import PrefixIndex, search_query, word_keys
+from eligibility import EligibilityIndex, TRANSACTION_FLAGS
+from postcodes import InvalidPostcodeError, PostcodeBook, address_indexes, normalize_postcode
+import documents
+from bundle import zip_chunks
+from overviews import AnnualOverviewStore, YearEndBatch
+from credentials import CredentialStore, CredentialsBusyError
 
 app = Flask(__name__)
 CORS(app)
@@ -46,9 +66,17 @@ def validate_required_headers():
 def create_error_response(error_code, description):
     """Create error response based on YAML error codes"""
     error_responses = {
+        '452': 'No data found',
         '453': 'Customer id is null',
         '454': 'Mobile phone number is null',
+        '455': 'Account balance is not enough',
         '456': 'Account number is null',
+        '457': 'Target iban is null',
+        '458': 'Check payment date',
+        '459': 'Start date is less than sysdate',
+        '460': 'End date is less than start date',
+        '462': 'Transaction amount exceeds daily transaction amount',
+        '464': 'Unauthorized transaction access',
         '470': 'Invalid request',
         '471': 'Unauthorized',
         '473': 'Invalid party name',
@@ -128,39 +156,10 @@ sof_questions_store = [
     }
 ]
 
-# Global password storage with file persistence
-PASSWORD_FILE = "current_password.txt"
-
-def load_current_password():
-    """Load current password from file, default to 'password123' if file doesn't exist"""
-    try:
-        if os.path.exists(PASSWORD_FILE):
-            with open(PASSWORD_FILE, 'r') as f:
-                return f.read().strip()
-        else:
-            # Create file with default password
-            with open(PASSWORD_FILE, 'w') as f:
-                f.write("password123")
-            return "password123"
-    except Exception as e:
-        print(f"Error loading password: {e}")
-        return "password123"
-
-def save_current_password(password):
-    """Save current password to file"""
-    try:
-        with open(PASSWORD_FILE, 'w') as f:
-            f.write(password)
-    except Exception as e:
-        print(f"Error saving password: {e}")
-
-# Initialize current password
-current_password = load_current_password()
-
 mock_accounts = [
     {
         "BIC": "DHBNNL2R",
-        "IBAN": "NL24DHBN2018470578",
+        "IBAN": "NL44DHBN2018470578",
         "accountName": "DHB SaveOnline",
         "accountNumber": "2018470578",
         "accountNumberLabel": "SaveOnline Account",
@@ -205,7 +204,7 @@ mock_accounts = [
     },
     {
         "BIC": "DHBNNL2R",
-        "IBAN": "NL24DHBN2018470579",
+        "IBAN": "NL17DHBN2018470579",
         "accountName": "DHB MaxiSpaar",
         "accountNumber": "2018470579",
         "accountNumberLabel": "MaxiSpaar Account",
@@ -250,6 +249,190 @@ mock_accounts = [
     }
 ]
 
+# Transaction ledger backing statements and period summaries
+account_ledger = create_seeded_ledger()
+
+# Append-only account event streams backing the saving history
+account_events = create_seeded_event_store(account_ledger)
+
+# Open accounts by IBAN and account number, updated when accounts are opened or closed
+account_index = AccountIndex(mock_accounts)
+
+# Helper function to find an open account by account number or IBAN
+def find_account(account_number):
+    """Find an open account by account number or IBAN"""
+    return account_index.get(account_number)
+
+# Payment simulation with memoized per-account rules
+transfer_engine = TransferEngine(find_account, account_ledger)
+
+# Helper function to book one due occurrence of a scheduled payment
+def execute_scheduled_payment(payment, execution_date):
+    """Debit the source ledger (and credit an own target account) for a scheduled payment"""
+    source = account_ledger.get(payment["sourceAccountNumber"])
+    if source is None:
+        raise LookupError(f"No ledger for account {payment['sourceAccountNumber']}")
+    # Every server process runs its own schedule; under the claim only the first books the occurrence
+    with source.claim():
+        if source.last_posting(payment["reference"], since=execution_date) is not None:
+            return
+        transfer_engine.execute(payment["sourceAccountNumber"], payment["targetIBAN"], payment["_cents"],
+                                payment["description"], payment["reference"], execution_date)
+
+# Future payments and standing orders, executed by a background thread when due
+payment_scheduler = PaymentScheduler(execute_scheduled_payment, transfer_engine.calendar)
+
+# Helper function to find where the demo standing order resumes after a restart
+def demo_order_start():
+    """First of next month, or of the month after the order's last booking in the ledger if later"""
+    start = (datetime.now().date().replace(day=1) + timedelta(days=32)).replace(day=1)
+    booked = account_ledger.get("2018470578").last_posting("PAY001")
+    if booked is not None and booked >= start:
+        start = (booked.replace(day=1) + timedelta(days=32)).replace(day=1)
+    return start
+
+# Helper function to schedule the payout of a notice withdrawal
+def schedule_notice_withdrawal(customer_id, account, counter, cents, withdrawal_date, reference):
+    """One-off transfer from a notice account to its counter account on the withdrawal date"""
+    return payment_scheduler.schedule(
+        customer_id, account["accountNumber"], counter["IBAN"], cents, withdrawal_date,
+        description="Notice withdrawal", source_iban=account["IBAN"],
+        target_account_number=counter["accountNumber"], target_name=counter["detail"]["holderName"],
+        transaction_type='ownTransfer', reference=reference
+    )
+
+# The schedule is in memory while the ledger persists, so occurrences already booked are not scheduled again
+payment_scheduler.schedule(
+    "CUST001", "2018470578", "NL17DHBN2018470579", 50000, demo_order_start(),
+    period='everyMonth', payment_type='periodic', description="Monthly transfer",
+    source_iban="NL44DHBN2018470578", target_account_number="2018470579",
+    target_name="Lucy Lavender", transaction_type='ownTransfer', reference="PAY001"
+)
+
+@app.before_request
+def start_payment_scheduler():
+    # Started on the first request so the reloader's parent process never books payments
+    payment_scheduler.start()
+
+# Account holder names by IBAN for Verification of Payee, with cached match results
+payee_index = PayeeIndex(VerificationCache(
+    max_entries=int(os.environ.get('DHB_VOP_CACHE_SIZE', '100000')),
+    ttl=int(os.environ.get('DHB_VOP_CACHE_TTL', '900'))
+))
+
+# The mock accounts belong to the demo customer; opened accounts to whoever opened them
+DEMO_CUSTOMER_ID = "CUST001"
+account_customers = {}
+
+# Helper function to find the customer an account belongs to
+def account_owner(account_number):
+    """Customer id owning an account number"""
+    return account_customers.get(account_number, DEMO_CUSTOMER_ID)
+
+# Notice withdrawals not yet paid out in an earlier run are scheduled again
+for stream in account_events:
+    for notice in stream.query([NOTICE_GIVEN]):
+        notice_account = account_index.get(stream.account_number)
+        notice_counter = account_index.get(notice["data"]["counterAccountNumber"])
+        if notice_account is None or notice_counter is None or account_ledger.get(
+                stream.account_number).last_posting(notice["data"]["reference"]) is not None:
+            continue
+        schedule_notice_withdrawal(account_owner(stream.account_number), notice_account, notice_counter,
+                                   to_cents(notice["amount"]), notice["data"]["withdrawalDate"],
+                                   notice["data"]["reference"])
+
+# Customer passwords as scrypt hashes, checked on a bounded pool instead of the request threads
+credential_store = CredentialStore(
+    max_workers=int(os.environ.get('DHB_KDF_WORKERS', '2')),
+    max_pending=int(os.environ.get('DHB_KDF_QUEUE', '32')),
+    cache_ttl=int(os.environ.get('DHB_CREDENTIAL_CACHE_TTL', '60'))
+)
+
+# The mock default becomes the demo customer's first hash; an old plaintext password file is
+# migrated instead with: python credentials.py import <customer id> [path]
+credential_store.setdefault(DEMO_CUSTOMER_ID, "password123")
+
+# Type-ahead over each customer's own accounts and saved payees, by IBAN, number and name
+customer_searches = {}
+
+# Accounts eligible per customer and transaction type, kept as bitsets
+account_eligibility = EligibilityIndex()
+
+# Helper function to get the type-ahead index of one customer
+def customer_search(customer_id):
+    """The PrefixIndex of a customer's accounts and payees (created on first use)"""
+    search = customer_searches.get(customer_id)
+    if search is None:
+        search = customer_searches.setdefault(customer_id, PrefixIndex())
+    return search
+
+# Helper function to add a payee the customer paid to their type-ahead
+def register_payee(customer_id, iban, name):
+    """Remember a payee for type-ahead unless the IBAN is one of the customer's own accounts"""
+    search = customer_search(customer_id)
+    if not iban or iban in search and search.get(iban)["accountNumber"]:
+        return
+    search.add(iban, {
+        "accountName": None,
+        "IBAN": iban,
+        "accountNumber": None,
+        "BIC": derive_bic(iban),
+        "isApprove": False,
+        "holderName": name or ""
+    }, [iban, *word_keys(name)])
+
+# Helper function to keep VOP holder names, type-ahead and transfer rules in step with the account index
+def on_account_index_change(event, account):
+    """Register opened accounts for VOP, type-ahead and eligibility and forget closed ones"""
+    customer_id = account_owner(account["accountNumber"])
+    search = customer_search(customer_id)
+    if event == INDEX_OPENED:
+        payee_index.add(account["IBAN"], account["detail"]["holderName"])
+        account_eligibility.update(customer_id, account)
+        search.add(account["IBAN"], account, [
+            account["IBAN"], account["accountNumber"],
+            *word_keys(account["detail"]["holderName"]), *word_keys(account["accountName"])
+        ])
+    else:
+        payee_index.remove(account["IBAN"])
+        search.remove(account["IBAN"])
+        account_eligibility.remove(customer_id, account["accountNumber"])
+        transfer_engine.invalidate(account["accountNumber"])
+
+for account in account_index:
+    on_account_index_change(INDEX_OPENED, account)
+account_index.subscribe(on_account_index_change)
+
+# Worker threads matching bulk VOP requests
+vop_executor = ThreadPoolExecutor(max_workers=int(os.environ.get('DHB_VOP_WORKERS', '4')))
+
+# Background document generation so print requests don't block request threads
+print_jobs = JobQueue(max_workers=int(os.environ.get('DHB_PRINT_WORKERS', '2')))
+
+# Year-end annual overviews: computed from the ledger by a batch, served as lookups
+annual_overviews = AnnualOverviewStore(ledger=account_ledger)
+year_end_batch = YearEndBatch(annual_overviews, account_ledger.directory,
+                              max_workers=int(os.environ.get('DHB_BATCH_WORKERS', '2')))
+
+# Helper function to describe a queued print job
+def print_job_response(job, **fields):
+    """Build the 202 response for a queued print job"""
+    return jsonify({
+        "success": True,
+        **fields,
+        "jobId": job["jobId"],
+        "status": job["status"],
+        "statusUrl": f"/downloads/jobs/{job['jobId']}",
+        "timestamp": datetime.now().isoformat()
+    }), 202
+
+# Stored responses for POST retries carrying an Idempotency-Key header
+idempotency_cache = IdempotencyCache(max_entries=10000, ttl=3600)
+idempotent_post = idempotent(
+    idempotency_cache,
+    lambda description: create_error_response('470', description)
+)
+
 # ============================================================================
 # CUSTOMER API ENDPOINTS
 # ============================================================================
@@ -481,6 +664,7 @@ def validate_net_banking_user():
         return create_error_response('500', f'System error occurred: {str(e)}')
 
 @app.route('/customer/profile/login', methods=['POST'])
+@idempotent_post
 def customer_login():
     """Customer login - maps to /customer/profile/login"""
     
@@ -492,6 +676,13 @@ def customer_login():
     try:
         data = request.get_json()
         
+        # Password logins are checked against the customer's stored hash
+        if data and data.get('password') is not None:
+            if not data.get('customerId'):
+                return create_error_response('453', 'Customer id is null')
+            if not credential_store.verify(data['customerId'], data['password'], request.headers.get('sessionId')):
+                return create_error_response('490', 'Invalid customer id or password')
+        
         # Mock response
         return jsonify({
             "success": True,
@@ -499,6 +690,8 @@ def customer_login():
             "message": "Login successful",
             "timestamp": datetime.now().isoformat()
         })
+    except CredentialsBusyError:
+        return create_error_response('503', 'Too many password checks in progress, retry shortly')
     except Exception as e:
         return create_error_response('500', f'System error occurred: {str(e)}')
 
@@ -524,6 +717,7 @@ def get_app_status():
         return create_error_response('500', f'System error occurred: {str(e)}')
 
 @app.route('/customer/messages/<customer_id>', methods=['POST'])
+@idempotent_post
 def create_customer_message(customer_id):
     """Create customer message - maps to /customer/messages/{customerId}"""
     
@@ -555,6 +749,51 @@ def create_customer_message(customer_id):
     except Exception as e:
         return create_error_response('500', f'System error occurred: {str(e)}')
 
+# Dutch postcode table, memory-mapped from the file built by postcodes.py
+POSTCODE_FILE = os.environ.get('DHB_POSTCODE_FILE', os.path.join(os.path.dirname(__file__), 'data', 'postcodes.bin'))
+postcode_book = PostcodeBook(POSTCODE_FILE) if os.path.exists(POSTCODE_FILE) else None
+
+# Street and city type-ahead, built from the postcode table on first use
+address_search = {}
+address_search_lock = threading.Lock()
+
+# Helper function to get the street and city type-ahead indexes
+def get_address_search():
+    """(street index, city index), building them once"""
+    with address_search_lock:
+        if not address_search:
+            address_search["streets"], address_search["cities"] = address_indexes(postcode_book)
+        return address_search["streets"], address_search["cities"]
+
+@app.route('/customer/profile/resolveAddress/autocomplete/<customer_id>', methods=['GET'])
+def autocomplete_address(customer_id):
+    """Street or city type-ahead for address entry, most common first"""
+    
+    # Validate required headers
+    header_valid, missing_headers = validate_required_headers()
+    if not header_valid:
+        return create_error_response('495', f"Missing required headers: {', '.join(missing_headers)}")
+    
+    # Validate customer ID
+    if not customer_id:
+        return create_error_response('453', 'Customer id is null')
+    
+    if postcode_book is None:
+        return create_error_response('503', 'Postcode data is not available')
+    
+    field = request.args.get('field', 'street')
+    if field not in ('street', 'city'):
+        return create_error_response('470', f'Unknown field: {field}')
+    query = request.args.get('query', '')
+    limit = min(max(request.args.get('limit', 10, type=int), 1), MAX_SEARCH_RESULTS)
+    
+    streets, cities = get_address_search()
+    return jsonify({
+        "field": field,
+        "query": query,
+        "results": (streets if field == 'street' else cities).search(query, limit)
+    })
+
 @app.route('/customer/profile/resolveAddress/<customer_id>/<post_code>', methods=['GET'])
 def resolve_address_by_postcode(customer_id, post_code):
     """Resolve address by postcode - maps to /customer/profile/resolveAddress/{customerId}/{postCode}"""
@@ -568,15 +807,17 @@ def resolve_address_by_postcode(customer_id, post_code):
     if not customer_id:
         return create_error_response('453', 'Customer id is null')
     
-    # Mock response
-    return jsonify([
-        {
-            "street": "Vondellaan",
-            "city": "Amsterdam",
-            "postCode": post_code,
-            "houseNumbers": ["170", "172", "174"]
-        }
-    ])
+    if postcode_book is None:
+        return create_error_response('503', 'Postcode data is not available')
+    
+    try:
+        addresses = postcode_book.streets(post_code)
+    except InvalidPostcodeError as e:
+        return create_error_response('470', str(e))
+    if not addresses:
+        return create_error_response('454', 'Resolve address not found')
+    
+    return jsonify(addresses)
 
 @app.route('/customer/profile/resolveAddress/<customer_id>/<post_code>/<house_no>', methods=['GET'])
 def resolve_address_by_house_number(customer_id, post_code, house_no):
@@ -591,13 +832,24 @@ def resolve_address_by_house_number(customer_id, post_code, house_no):
     if not customer_id:
         return create_error_response('453', 'Customer id is null')
     
-    # Mock response
+    if postcode_book is None:
+        return create_error_response('503', 'Postcode data is not available')
+    
+    try:
+        post_code = normalize_postcode(post_code)
+    except InvalidPostcodeError as e:
+        return create_error_response('470', str(e))
+    address = postcode_book.resolve(post_code, house_no)
+    if address is None:
+        return create_error_response('454', 'Resolve address not found')
+    street, city = address
+    
     return jsonify({
-        "street": "Vondellaan",
+        "street": street,
         "houseNumber": house_no,
         "postCode": post_code,
-        "city": "Amsterdam",
-        "fullAddress": f"Vondellaan {house_no}, {post_code} Amsterdam"
+        "city": city,
+        "fullAddress": f"{street} {house_no}, {post_code} {city}"
     })
 
 @app.route('/customer/profile/isNetBankingUserActive/<customer_id>', methods=['GET'])
@@ -770,6 +1022,55 @@ def get_customer_messages(customer_id):
     
     return jsonify(messages_store)
 
+# Annual overview document ids: FIN_<year>_001 and TAX_<year>_001
+ANNUAL_OVERVIEW_ID = re.compile(r'^(FIN|TAX)_(\d{4})_\d+$')
+
+# Helper function to list the account numbers of one customer
+def customer_account_list(customer_id):
+    """Account numbers of the customer's open accounts"""
+    return [account["accountNumber"] for account in account_eligibility.accounts(customer_id)]
+
+# Helper function to list the annual overview documents of a customer
+def annual_overview_documents(customer_id):
+    """A financial overview and a tax statement for every stored year, and last year before its batch ran"""
+    overview_documents = []
+    for year in annual_overviews.years(customer_id, customer_account_list(customer_id)):
+        overview_documents.append({
+            "documentType": "financial",
+            "name": f"Financial Overview {year}",
+            "year": str(year),
+            "id": f"FIN_{year}_001"
+        })
+        overview_documents.append({
+            "documentType": "tax",
+            "name": f"Tax Statement {year}",
+            "year": str(year),
+            "id": f"TAX_{year}_001"
+        })
+    return overview_documents
+
+# Helper function to look up the stored figures behind an annual overview document
+def annual_overview(customer_id, document_id):
+    """The customer's year-end overview for a document id, or None"""
+    found = ANNUAL_OVERVIEW_ID.match(document_id or '')
+    return annual_overviews.get(customer_id, int(found.group(2)), customer_account_list(customer_id)) if found else None
+
+# Mock contracts of the customer
+customer_contracts = [
+    {
+        "contractType": "savings",
+        "name": "DHB SaveOnline Contract",
+        "date": "2024-01-15",
+        "id": "CON_SAV_001"
+    },
+    {
+        "contractType": "maxispaar",
+        "name": "DHB MaxiSpaar Contract",
+        "date": "2024-06-20",
+        "id": "CON_MAX_001"
+    }
+]
+
 @app.route('/customer/downloads/financialAnnualOverview/<customer_id>', methods=['GET'])
 def get_financial_annual_overview(customer_id):
     """Get financial annual overview - maps to /customer/downloads/financialAnnualOverview/{customerId}"""
@@ -783,27 +1084,8 @@ def get_financial_annual_overview(customer_id):
     if not customer_id:
         return create_error_response('453', 'Customer id is null')
     
-    # Mock response
-    return jsonify([
-        {
-            "documentType": "financial",
-            "name": "Financial Overview 2024",
-            "year": "2024",
-            "id": "FIN_2024_001"
-        },
-        {
-            "documentType": "tax",
-            "name": "Tax Statement 2024",
-            "year": "2024",
-            "id": "TAX_2024_001"
-        },
-        {
-            "documentType": "financial",
-            "name": "Financial Overview 2023",
-            "year": "2023",
-            "id": "FIN_2023_001"
-        }
-    ])
+    # Precomputed by the year-end batch
+    return jsonify(annual_overview_documents(customer_id))
 
 @app.route('/customer/downloads/financialAnnualOverview/print/<customer_id>/<id>', methods=['GET'])
 def print_financial_annual_overview(customer_id, id):
@@ -818,13 +1100,12 @@ def print_financial_annual_overview(customer_id, id):
     if not customer_id:
         return create_error_response('453', 'Customer id is null')
     
-    # Mock response
-    return jsonify({
-        "success": True,
-        "documentId": id,
-        "downloadUrl": f"/downloads/financial/{id}.pdf",
-        "timestamp": datetime.now().isoformat()
-    })
+    overview = annual_overview(customer_id, id)
+    if overview is None:
+        return create_error_response('452', 'Annual overview not found')
+    
+    job = print_jobs.submit('financialAnnualOverview', documents.render_financial_annual_overview, customer_id, id, overview)
+    return print_job_response(job, documentId=id, downloadUrl=f"/downloads/jobs/{job['jobId']}/result")
 
 @app.route('/customer/downloads/contracts/<customer_id>', methods=['GET'])
 def get_customer_contracts(customer_id):
@@ -840,20 +1121,7 @@ def get_customer_contracts(customer_id):
         return create_error_response('453', 'Customer id is null')
     
     # Mock response
-    return jsonify([
-        {
-            "contractType": "savings",
-            "name": "DHB SaveOnline Contract",
-            "date": "2024-01-15",
-            "id": "CON_SAV_001"
-        },
-        {
-            "contractType": "maxispaar",
-            "name": "DHB MaxiSpaar Contract",
-            "date": "2024-06-20",
-            "id": "CON_MAX_001"
-        }
-    ])
+    return jsonify(customer_contracts)
 
 @app.route('/customer/downloads/contracts/print/<customer_id>/<id>', methods=['GET'])
 def print_customer_contract(customer_id, id):
@@ -868,13 +1136,152 @@ def print_customer_contract(customer_id, id):
     if not customer_id:
         return create_error_response('453', 'Customer id is null')
     
-    # Mock response
-    return jsonify({
-        "success": True,
-        "contractId": id,
-        "downloadUrl": f"/downloads/contracts/{id}.pdf",
-        "timestamp": datetime.now().isoformat()
-    })
+    if not any(contract["id"] == id for contract in customer_contracts):
+        return create_error_response('452', f'No contract found: {id}')
+    
+    job = print_jobs.submit('contract', documents.render_customer_contract, customer_id, id)
+    return print_job_response(job, contractId=id, downloadUrl=f"/downloads/jobs/{job['jobId']}/result")
+
+# Documents rendered ahead of the one being compressed into a bundle
+BUNDLE_WINDOW = int(os.environ.get('DHB_BUNDLE_WINDOW', '4'))
+
+# Bundle sections: folder in the archive and the renders for a customer
+BUNDLE_SECTIONS = ('contracts', 'statements', 'financialAnnualOverview')
+
+# Helper function to list the renders of a customer's document bundle
+def bundle_renders(customer_id, sections):
+    """(folder, renderer, args) for every document of the requested sections"""
+    if 'contracts' in sections:
+        for contract in customer_contracts:
+            yield 'contracts', documents.render_customer_contract, (customer_id, contract["id"])
+    if 'statements' in sections:
+        for account in account_eligibility.accounts(customer_id):
+            yield 'statements', documents.render_account_statement, (account_ledger.directory, account["accountNumber"])
+    if 'financialAnnualOverview' in sections:
+        for document in annual_overview_documents(customer_id):
+            yield 'financialAnnualOverview', documents.render_financial_annual_overview, (
+                customer_id, document["id"], annual_overview(customer_id, document["id"]))
+
+@app.route('/customer/downloads/bundle/<customer_id>', methods=['GET'])
+def download_document_bundle(customer_id):
+    """Download contracts, statements and annual overviews as one streamed ZIP archive"""
+    
+    # Validate required headers
+    header_valid, missing_headers = validate_required_headers()
+    if not header_valid:
+        return create_error_response('495', f"Missing required headers: {', '.join(missing_headers)}")
+    
+    # Validate customer ID
+    if not customer_id:
+        return create_error_response('453', 'Customer id is null')
+    
+    sections = request.args.get('include', ','.join(BUNDLE_SECTIONS)).split(',')
+    unknown = [section for section in sections if section not in BUNDLE_SECTIONS]
+    if unknown:
+        return create_error_response('470', f"Unknown bundle sections: {', '.join(unknown)}")
+    
+    renders = list(bundle_renders(customer_id, sections))
+    if not renders:
+        return create_error_response('452', 'No documents found')
+    
+    # Documents render in parallel on the print workers, at most BUNDLE_WINDOW ahead of the zip stream
+    results = print_jobs.map(((renderer, args) for _, renderer, args in renders), BUNDLE_WINDOW)
+    members = ((f"{folder}/{filename}", content)
+               for (folder, _, _), (filename, _, content) in zip(renders, results))
+    return Response(
+        zip_chunks(members),
+        mimetype='application/zip',
+        headers={
+            'Content-Disposition': f'attachment; filename="DHB_Documents_{customer_id}.zip"'
+        }
+    )
+
+# Helper function to group the indexed accounts by customer for the year-end batch
+def customer_account_numbers():
+    """{customer id: [account number]} over all open accounts"""
+    grouped = {}
+    for account in account_index:
+        customer_id = account_owner(account["accountNumber"])
+        grouped.setdefault(customer_id, []).append(account["accountNumber"])
+    return grouped
+
+@app.route('/batches/annualOverview/<int:year>', methods=['POST'])
+def start_annual_overview_batch(year):
+    """Start the year-end batch computing every customer's annual overview for a year"""
+    
+    # Validate required headers
+    header_valid, missing_headers = validate_required_headers()
+    if not header_valid:
+        return create_error_response('495', f"Missing required headers: {', '.join(missing_headers)}")
+    
+    if year >= datetime.now().year:
+        return create_error_response('470', f'Year {year} has not ended yet')
+    
+    status = year_end_batch.start(year, customer_account_numbers())
+    return jsonify({**status, "statusUrl": f"/batches/annualOverview/{year}"}), 202
+
+@app.route('/batches/annualOverview/<int:year>', methods=['GET'])
+def get_annual_overview_batch(year):
+    """Progress of the year-end batch for a year"""
+    
+    # Validate required headers
+    header_valid, missing_headers = validate_required_headers()
+    if not header_valid:
+        return create_error_response('495', f"Missing required headers: {', '.join(missing_headers)}")
+    
+    status = year_end_batch.status(year)
+    computed_at = annual_overviews.computed_at(year)
+    if status is None:
+        # Stored by an earlier run or another process
+        if computed_at is None:
+            return create_error_response('452', f'No annual overview batch for {year}')
+        status = {"year": year, "status": STATUS_COMPLETED}
+    return jsonify({**status, "computedAt": computed_at})
+
+@app.route('/downloads/jobs/<job_id>', methods=['GET'])
+def get_print_job_status(job_id):
+    """Get print job status - poll until status is COMPLETED or FAILED"""
+    
+    # Validate required headers
+    header_valid, missing_headers = validate_required_headers()
+    if not header_valid:
+        return create_error_response('495', f"Missing required headers: {', '.join(missing_headers)}")
+    
+    job = print_jobs.status(job_id)
+    if job is None:
+        return create_error_response('477', f'Print job {job_id} not found or expired')
+    
+    if job["status"] == 'COMPLETED':
+        job["downloadUrl"] = f"/downloads/jobs/{job_id}/result"
+    return jsonify(job)
+
+@app.route('/downloads/jobs/<job_id>/result', methods=['GET'])
+def get_print_job_result(job_id):
+    """Download the document produced by a completed print job"""
+    
+    # Validate required headers
+    header_valid, missing_headers = validate_required_headers()
+    if not header_valid:
+        return create_error_response('495', f"Missing required headers: {', '.join(missing_headers)}")
+    
+    job = print_jobs.status(job_id)
+    if job is None:
+        return create_error_response('477', f'Print job {job_id} not found or expired')
+    
+    if job["status"] == 'FAILED':
+        return create_error_response('490', job.get("error", 'Document generation failed'))
+    
+    result = print_jobs.result(job_id)
+    if result is None:
+        # Still queued or running
+        return jsonify(job), 202
+    
+    filename, mimetype, content = result
+    return Response(
+        content,
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
 
 @app.route('/customer/campaigns/list/<customer_id>', methods=['GET'])
 def get_customer_campaigns(customer_id):
@@ -938,6 +1345,267 @@ def get_saving_modification(customer_id, account_number):
         ]
     })
 
+# Helper function to record a modification and switch the account to another product
+def modify_product(account, product, day, amount=None):
+    """Append ACCOUNT_MODIFIED, applying product (or None to keep the current one) first"""
+    changes = None
+    if product is not None and product["productType"]["code"] != account["productType"]["code"]:
+        account["accountName"] = product["accountName"]
+        account["accountNumberLabel"] = product["accountNumberLabel"]
+        account["productGroup"] = dict(product["productGroup"])
+        account["productType"] = dict(product["productType"])
+        account["detail"]["noticeDays"] = product.get("noticeDays")
+        changes = {"productCode": product["productType"]["code"], "accountName": product["accountName"]}
+    # Only recomputes the eligibility bits when the account's status, currency or profile changed
+    account_eligibility.update(account_owner(account["accountNumber"]), account)
+    if account_events.get(account["accountNumber"]) is not None:
+        account_events.append(account["accountNumber"], ACCOUNT_MODIFIED, day, "Account modified", amount, changes)
+
+@app.route('/accounts/saving/modification/<customer_id>/<account_number>', methods=['PUT'])
+@idempotent_post
+def modify_saving_account(customer_id, account_number):
+    """Saving account modification - maps to /accounts/saving/modification/{customerId}/{accountNumber}"""
+    
+    # Validate required headers
+    header_valid, missing_headers = validate_required_headers()
+    if not header_valid:
+        return create_error_response('495', f"Missing required headers: {', '.join(missing_headers)}")
+    
+    # Validate customer ID
+    if not customer_id:
+        return create_error_response('453', 'Customer id is null')
+    
+    account = account_index.get(account_number)
+    if account is None:
+        return create_error_response('477', f'No open account found: {account_number}')
+    if account_owner(account["accountNumber"]) != customer_id:
+        return create_error_response('464', f'Account {account_number} does not belong to customer {customer_id}')
+    
+    # Closing pays the account out, so it is never implied by a missing field
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return create_error_response('470', 'Request body must be a JSON object')
+    close_option = data.get('closeOption')
+    if not close_option:
+        return create_error_response('470', 'closeOption is required')
+    if close_option not in ('principalAmount', 'principalAndAccruedInterestAmount', 'differentAmount'):
+        return create_error_response('470', f'Unknown closeOption: {close_option}')
+    
+    # Money goes to the approved counter account
+    counter = account_index.get(data.get('targetAccountNumber')) if data.get('targetAccountNumber') else next(
+        (other for other in account_index
+         if other is not account and account_owner(other["accountNumber"]) == customer_id
+         and other["operationProfile"].get("allowSourceForOpening")), None)
+    if counter is None or counter is account:
+        return create_error_response('457', 'Not approved counter account')
+    if account_owner(counter["accountNumber"]) != customer_id:
+        return create_error_response('464', f'Account {counter["accountNumber"]} does not belong to customer {customer_id}')
+    
+    product = None
+    if data.get('productClass'):
+        product = saving_products.get(data['productClass'])
+        if product is None:
+            return create_error_response('470', f"Unknown product class: {data['productClass']}")
+        if close_option != 'differentAmount':
+            return create_error_response('470', 'A closed account cannot change product')
+    
+    balance, _ = transfer_engine.balances.read(account["accountNumber"])
+    if close_option == 'differentAmount':
+        try:
+            cents = to_cents(data.get('amount', 0))
+        except (TypeError, ValueError, OverflowError):
+            return create_error_response('456', 'Invalid amount')
+        if cents <= 0:
+            return create_error_response('456', 'Invalid amount')
+        if cents > balance:
+            return create_error_response('455', 'Account balance is not enough')
+    else:
+        cents = balance
+    
+    reference = f"CL{uuid.uuid4().hex[:12].upper()}"
+    today = datetime.now().date()
+    
+    # Withdrawals from a notice account are paid out once the notice period has passed
+    notice_days = account["detail"].get("noticeDays")
+    if close_option == 'differentAmount' and notice_days:
+        withdrawal_date = today + timedelta(days=notice_days)
+        schedule_notice_withdrawal(customer_id, account, counter, cents, withdrawal_date, reference)
+        account_events.append(account["accountNumber"], NOTICE_GIVEN, today, "Notice given", cents / 100, {
+            "withdrawalDate": withdrawal_date.isoformat(),
+            "reference": reference,
+            "counterAccountNumber": counter["accountNumber"]
+        })
+        modify_product(account, product, today)
+        return jsonify({
+            "transactionNumber": uuid.uuid4().hex,
+            "reference": reference,
+            "accountNumber": account["accountNumber"],
+            "counterAccountNumber": counter["accountNumber"],
+            "amount": cents / 100,
+            "withdrawalDate": withdrawal_date.isoformat(),
+            "status": account["status"]
+        }), 201
+    
+    try:
+        if cents:
+            transfer_engine.balances.transfer(account["accountNumber"], counter["accountNumber"], cents,
+                                              "Saving account withdrawal", reference, today)
+    except InsufficientFundsError:
+        return create_error_response('455', 'Account balance is not enough')
+    except ValueError as e:
+        return create_error_response('470', str(e))
+    
+    closed = close_option != 'differentAmount'
+    if closed:
+        # Closing the index entry drops the account from eligibility, type-ahead and VOP
+        account["status"] = "closed"
+        account_index.close(account["accountNumber"])
+        mock_accounts[:] = [other for other in mock_accounts if other is not account]
+        account_events.append(account["accountNumber"], ACCOUNT_CLOSED, today.isoformat(), "Account closed")
+    else:
+        modify_product(account, product, today, -cents / 100)
+    
+    return jsonify({
+        "transactionNumber": uuid.uuid4().hex,
+        "reference": reference,
+        "accountNumber": account["accountNumber"],
+        "counterAccountNumber": counter["accountNumber"],
+        "amount": cents / 100,
+        "status": account["status"]
+    })
+
+# Saving products that can be opened, by product code
+saving_products = {
+    "SAV_ONLINE": {
+        "accountName": "DHB SaveOnline",
+        "accountNumberLabel": "SaveOnline Account",
+        "productGroup": {"code": "saveOnline", "name": "SaveOnline"},
+        "productType": {"code": "SAV_ONLINE", "name": "Online Savings"}
+    },
+    "SAV_MAXI": {
+        "accountName": "DHB MaxiSpaar",
+        "accountNumberLabel": "MaxiSpaar Account",
+        "productGroup": {"code": "maxiSpaar", "name": "MaxiSpaar"},
+        "productType": {"code": "SAV_MAXI", "name": "Maxi Savings"}
+    },
+    "SAV_COMBI": {
+        "accountName": "DHB Combispaar",
+        "accountNumberLabel": "Combispaar Account",
+        "productGroup": {"code": "combiSpaar", "name": "Combispaar"},
+        "productType": {"code": "SAV_COMBI", "name": "Combi Savings"},
+        # Withdrawals are paid out this many days after notice is given
+        "noticeDays": 33
+    }
+}
+
+@app.route('/accounts/saving/new/<customer_id>', methods=['POST'])
+@idempotent_post
+def open_saving_account(customer_id):
+    """Open new saving account - maps to /accounts/saving/new/{customerId}"""
+    
+    # Validate required headers
+    header_valid, missing_headers = validate_required_headers()
+    if not header_valid:
+        return create_error_response('495', f"Missing required headers: {', '.join(missing_headers)}")
+    
+    # Validate customer ID
+    if not customer_id:
+        return create_error_response('453', 'Customer id is null')
+    
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return create_error_response('470', 'Request body must be a JSON object')
+    product_class = data.get('productClass')
+    if not product_class:
+        return create_error_response('452', 'Product class is null')
+    product = saving_products.get(product_class) or next(
+        (option for option in saving_products.values() if option["productGroup"]["code"] == product_class), None)
+    if product is None:
+        return create_error_response('470', f'Unknown product class: {product_class}')
+    
+    try:
+        cents = to_cents(data.get('amount', 0))
+    except (TypeError, ValueError, OverflowError):
+        return create_error_response('456', 'Invalid account opening amount')
+    if cents <= 0:
+        return create_error_response('456', 'Invalid account opening amount')
+    
+    source = account_index.get(data.get('sourceAccountNumber'))
+    if source is None:
+        return create_error_response('457', 'Not approved counter account')
+    if account_owner(source["accountNumber"]) != customer_id:
+        return create_error_response('464', f'Account {source["accountNumber"]} does not belong to customer {customer_id}')
+    if not source["operationProfile"].get("allowSourceForOpening") or source["status"] != "active":
+        return create_error_response('458', 'Source account is not allowed for account opening')
+    if data.get('currencyCode', source["currencyCode"]) != source["currencyCode"]:
+        return create_error_response('470', 'Currency does not match the source account')
+    if cents > transfer_engine.balances.read(source["accountNumber"])[0]:
+        return create_error_response('455', 'Account balance is not enough')
+    
+    # Skip numbers whose ledger already exists from an earlier run
+    account_number = account_index.allocate_account_number()
+    while account_ledger.get(account_number) is not None:
+        account_number = account_index.allocate_account_number()
+    now = datetime.now()
+    account = {
+        "BIC": "DHBNNL2R",
+        "IBAN": build_iban("NL", f"DHBN{account_number}"),
+        "accountName": product["accountName"],
+        "accountNumber": account_number,
+        "accountNumberLabel": product["accountNumberLabel"],
+        "address": source["address"],
+        "branch": dict(source["branch"]),
+        "currencyCode": source["currencyCode"],
+        "customerName": source["customerName"],
+        "detail": {
+            "balance": 0.0,
+            "holderName": source["detail"]["holderName"],
+            "interestRate": source["detail"]["interestRate"],
+            "noticeDays": product.get("noticeDays")
+        },
+        "minPaymentDate": now.strftime("%Y-%m-%dT00:00:00Z"),
+        "moduleType": {"code": "SAV", "name": "Savings"},
+        "operationProfile": {
+            "allowClosing": True,
+            "allowModification": True,
+            "allowOwnTransferOut": True,
+            "allowPaymentOrderOut": True,
+            "allowPrintStatement": True,
+            "allowSourceForOpening": True
+        },
+        "productClass": {"code": "SAVINGS", "name": "Savings Account"},
+        "productGroup": dict(product["productGroup"]),
+        "productType": dict(product["productType"]),
+        "status": "active"
+    }
+    account_ledger.open_account(account_number, 0.0, account["accountName"], account["currencyCode"])
+    account_customers[account_number] = customer_id
+    account_index.add(account)
+    
+    reference = f"NA{uuid.uuid4().hex[:12].upper()}"
+    try:
+        transfer_engine.balances.transfer(source["accountNumber"], account_number, cents,
+                                          "Account opening deposit", reference, now.date())
+    except (InsufficientFundsError, ValueError) as e:
+        account_index.close(account_number)
+        if isinstance(e, InsufficientFundsError):
+            return create_error_response('455', 'Account balance is not enough')
+        return create_error_response('491', f'Transaction not created: {e}')
+    
+    mock_accounts.append(account)
+    account_events.append(account_number, ACCOUNT_OPENED, now.date().isoformat(), "Account opened", cents / 100, {
+        "productCode": account["productType"]["code"],
+        "accountName": account["accountName"],
+        "interestRate": account["detail"]["interestRate"]
+    })
+    
+    return jsonify({
+        "transactionNumber": uuid.uuid4().hex,
+        "reference": reference,
+        "accountNumber": account_number,
+        "IBAN": account["IBAN"]
+    }), 201
+
 @app.route('/accounts/saving/new/<customer_id>', methods=['GET'])
 def get_new_saving_account_options(customer_id):
     """Get new saving account options - maps to /accounts/saving/new/{customerId}"""
@@ -995,19 +1663,54 @@ def get_customer_match_by_account(customer_id, account_number):
     if not customer_id:
         return create_error_response('453', 'Customer id is null')
     
-    # Validate account number
+    # Validate account number; IBANs are checked before any lookup
     if not account_number:
         return create_error_response('456', 'Account number is null')
+    if account_number[:2].isalpha():
+        try:
+            account_number = validate_iban(account_number)
+        except InvalidIBANError as e:
+            return create_error_response('456', f'Account number invalid: {e}')
+    
+    account = account_index.get(account_number)
+    if account is None or account_owner(account["accountNumber"]) != customer_id:
+        return create_error_response('457', 'Customer does not match by account')
     
-    # Mock response
     return jsonify({
         "customerId": customer_id,
-        "accountNumber": account_number,
+        "accountNumber": account["accountNumber"],
+        "IBAN": account["IBAN"],
         "isMatch": True,
-        "customerName": "Lucy Lavender",
-        "accountHolder": "Lucy Lavender"
+        "customerName": account["customerName"],
+        "accountHolder": account["detail"]["holderName"]
     })
 
+# Most type-ahead results returned for one search
+MAX_SEARCH_RESULTS = 50
+
+# Helper function to format an amount the way the frontend shows balances
+def format_euro(amount):
+    """Amount as Dutch formatted euros, e.g. € 10.566,55"""
+    return "€ " + f"{amount:,.2f}".replace(",", " ").replace(".", ",").replace(" ", ".")
+
+# Helper function to format an account or a saved payee as a TargetAccount
+def target_account(match):
+    """TargetAccount entry for one of the customer's accounts or a saved payee"""
+    if "detail" not in match:
+        return dict(match)
+    return {
+        "accountName": match["accountName"],
+        "IBAN": match["IBAN"],
+        "accountNumber": match["accountNumber"],
+        "accountNumberLabel": match["accountNumberLabel"],
+        "BIC": match["BIC"],
+        "isApprove": True,
+        "balance": match["detail"]["balance"],
+        "availableBalance": match["detail"]["balance"],
+        "currencyCode": match["currencyCode"],
+        "holderName": match["detail"]["holderName"]
+    }
+
 @app.route('/accounts/targetAccounts/<customer_id>/<account_number>/<transaction_type>', methods=['GET'])
 def get_target_accounts(customer_id, account_number, transaction_type):
     """Get target accounts - maps to /accounts/targetAccounts/{customerId}/{accountNumber}/{transactionType}"""
@@ -1025,21 +1728,30 @@ def get_target_accounts(customer_id, account_number, transaction_type):
     if not account_number:
         return create_error_response('456', 'Account number is null')
     
-    # Mock response
-    return jsonify([
-        {
-            "accountNumber": "2018470580",
-            "accountName": "Target Account 1",
-            "iban": "NL24DHBN2018470580",
-            "holderName": "John Doe"
-        },
-        {
-            "accountNumber": "2018470581",
-            "accountName": "Target Account 2",
-            "iban": "NL24DHBN2018470581",
-            "holderName": "Jane Smith"
-        }
-    ])
+    if transaction_type not in TRANSACTION_FLAGS:
+        return create_error_response('470', f'Unknown transaction type: {transaction_type}')
+    
+    source = find_account(account_number)
+    accounts = account_eligibility.eligible(customer_id, transaction_type, request.args.get('currencyCode'),
+                                            exclude=source["accountNumber"] if source else None)
+    
+    # Type-ahead over the eligible accounts, and for payments also the saved payees
+    search = request.args.get('search')
+    if search:
+        limit = min(max(request.args.get('limit', 10, type=int), 1), MAX_SEARCH_RESULTS)
+        eligible = {account["accountNumber"] for account in accounts}
+        index = customer_search(customer_id)
+        # Skipped matches are the ineligible own accounts, plus every payee for other types than payment
+        lookahead = limit + len(account_eligibility.accounts(customer_id)) if transaction_type == 'payment' else len(index)
+        matches = []
+        for match in index.search(search_query(search), lookahead):
+            if match["accountNumber"] in eligible or (match["accountNumber"] is None and transaction_type == 'payment'):
+                matches.append(match)
+                if len(matches) == limit:
+                    break
+        return jsonify([target_account(match) for match in matches])
+    
+    return jsonify([target_account(account) for account in accounts])
 
 @app.route('/accounts/saving/transactions/receipt/<account_number>', methods=['GET'])
 def get_transaction_receipt(account_number):
@@ -1075,39 +1787,57 @@ def get_account_statement(account_number, page_index, page_size):
     if not account_number:
         return create_error_response('456', 'Account number is null')
     
-    # Mock response based on AccountStatement schema
+    account = account_ledger.get(account_number)
+    if account is None:
+        return create_error_response('477', f'No statement found for account {account_number}')
+    
+    if page_size <= 0:
+        return create_error_response('470', 'Page size must be positive')
+    
+    transactions, total_records = account.page(page_index, page_size)
+    
     return jsonify({
         "accountNumber": account_number,
-        "accountName": "DHB SaveOnline",
-        "currencyCode": "EUR",
-        "transactions": [
-            {
-                "transactionDate": "2025-01-15",
-                "valueDate": "2025-01-15",
-                "description": "Salary payment",
-                "amount": 2500.00,
-                "balance": 10566.55,
-                "type": "CREDIT",
-                "reference": "REF001"
-            },
-            {
-                "transactionDate": "2025-01-14",
-                "valueDate": "2025-01-14",
-                "description": "Online purchase",
-                "amount": -125.50,
-                "balance": 8066.55,
-                "type": "DEBIT",
-                "reference": "REF002"
-            }
-        ],
+        "accountName": account.account_name,
+        "currencyCode": account.currency_code,
+        "transactions": transactions,
         "pagination": {
             "pageIndex": page_index,
             "pageSize": page_size,
-            "totalRecords": 2,
-            "totalPages": 1
+            "totalRecords": total_records,
+            "totalPages": (total_records + page_size - 1) // page_size
         }
     })
 
+@app.route('/accounts/saving/statement/summary/<account_number>', methods=['GET'])
+def get_account_statement_summary(account_number):
+    """Get statement summary for a date range - totals come from the ledger prefix sums"""
+    
+    # Validate required headers
+    header_valid, missing_headers = validate_required_headers()
+    if not header_valid:
+        return create_error_response('495', f"Missing required headers: {', '.join(missing_headers)}")
+    
+    # Validate account number
+    if not account_number:
+        return create_error_response('456', 'Account number is null')
+    
+    account = account_ledger.get(account_number)
+    if account is None:
+        return create_error_response('477', f'No statement found for account {account_number}')
+    
+    from_date = request.args.get('fromDate')
+    to_date = request.args.get('toDate')
+    
+    try:
+        summary = account.summary(from_date, to_date)
+        if request.args.get('groupBy') == 'month':
+            summary["months"] = account.monthly_rollups(from_date, to_date)
+    except ValueError:
+        return create_error_response('470', 'Dates must be formatted as YYYY-MM-DD')
+    
+    return jsonify(summary)
+
 @app.route('/accounts/saving/statement/print/<account_number>', methods=['GET'])
 def print_account_statement(account_number):
     """Print account statement - maps to /accounts/saving/statement/print/{accountNumber}"""
@@ -1121,13 +1851,51 @@ def print_account_statement(account_number):
     if not account_number:
         return create_error_response('456', 'Account number is null')
     
-    # Mock response
-    return jsonify({
-        "success": True,
-        "accountNumber": account_number,
-        "statementUrl": f"/statements/{account_number}/statement.pdf",
-        "timestamp": datetime.now().isoformat()
-    })
+    if account_ledger.get(account_number) is None:
+        return create_error_response('477', f'No statement found for account {account_number}')
+    
+    job = print_jobs.submit('statement', documents.render_account_statement, account_ledger.directory, account_number)
+    return print_job_response(job, accountNumber=account_number, statementUrl=f"/downloads/jobs/{job['jobId']}/result")
+
+@app.route('/accounts/saving/statement/export/<account_number>/<export_format>', methods=['GET'])
+def export_account_statement(account_number, export_format):
+    """Export full statement history as streamed CSV or CAMT.053 XML"""
+    
+    # Validate required headers
+    header_valid, missing_headers = validate_required_headers()
+    if not header_valid:
+        return create_error_response('495', f"Missing required headers: {', '.join(missing_headers)}")
+    
+    # Validate account number
+    if not account_number:
+        return create_error_response('456', 'Account number is null')
+    
+    if export_format not in EXPORT_FORMATS:
+        return create_error_response('470', f"Unsupported export format: {export_format}")
+    
+    account = account_ledger.get(account_number)
+    if account is None:
+        return create_error_response('477', f'No statement found for account {account_number}')
+    
+    from_date = request.args.get('fromDate')
+    to_date = request.args.get('toDate')
+    try:
+        account.summary(from_date, to_date)
+    except ValueError:
+        return create_error_response('470', 'Dates must be formatted as YYYY-MM-DD')
+    
+    generate, mimetype, extension = EXPORT_FORMATS[export_format]
+    chunks = generate(account, from_date, to_date)
+    headers = {
+        'Content-Disposition': f'attachment; filename="Statement_{account_number}.{extension}"',
+        'Vary': 'Accept-Encoding'
+    }
+    # Quality-aware: "gzip;q=0" refuses gzip, while "*" accepts it
+    if request.accept_encodings['gzip'] > 0:
+        chunks = gzip_chunks(chunks)
+        headers['Content-Encoding'] = 'gzip'
+    
+    return Response(chunks, mimetype=mimetype, headers=headers, direct_passthrough=True)
 
 @app.route('/accounts/saving/rates/<customer_id>', methods=['GET'])
 def get_saving_rates(customer_id):
@@ -1170,6 +1938,22 @@ def get_saving_rates(customer_id):
         ]
     })
 
+# Helper function to build the saving history rows of an account
+def build_saving_history(account_number, event_types=None, from_date=None, to_date=None):
+    """Saving history rows from the account event stream, or None for unknown accounts"""
+    stream = account_events.get(account_number)
+    if stream is None:
+        return None
+    return [
+        {
+            "date": event["date"],
+            "action": event["action"],
+            "description": event["description"],
+            "amount": event["amount"]
+        }
+        for event in stream.query(event_types, from_date, to_date)
+    ]
+
 @app.route('/accounts/saving/history/<account_number>', methods=['GET'])
 def get_saving_history(account_number):
     """Get saving history - maps to /accounts/saving/history/{accountNumber}"""
@@ -1183,23 +1967,23 @@ def get_saving_history(account_number):
     if not account_number:
         return create_error_response('456', 'Account number is null')
     
-    # Mock response
+    # Optional filters: action=INTEREST_PAID,NOTICE_GIVEN&fromDate=...&toDate=...
+    actions = request.args.get('action')
+    event_types = [action.strip() for action in actions.split(',') if action.strip()] if actions else None
+    
+    try:
+        history = build_saving_history(account_number, event_types,
+                                       request.args.get('fromDate'), request.args.get('toDate'))
+    except ValueError:
+        return create_error_response('470', 'Dates must be formatted as YYYY-MM-DD')
+    
+    if history is None:
+        return create_error_response('477', f'No history found for account {account_number}')
+    
     return jsonify({
         "accountNumber": account_number,
-        "history": [
-            {
-                "date": "2025-01-15",
-                "action": "ACCOUNT_OPENED",
-                "description": "Account opened",
-                "amount": 1000.00
-            },
-            {
-                "date": "2025-01-20",
-                "action": "INTEREST_PAID",
-                "description": "Interest payment",
-                "amount": 5.50
-            }
-        ]
+        "state": account_events.get(account_number).state(),
+        "history": history
     })
 
 @app.route('/accounts/saving/history/print/<account_number>', methods=['GET'])
@@ -1215,13 +1999,12 @@ def print_saving_history(account_number):
     if not account_number:
         return create_error_response('456', 'Account number is null')
     
-    # Mock response
-    return jsonify({
-        "success": True,
-        "accountNumber": account_number,
-        "historyUrl": f"/history/{account_number}/history.pdf",
-        "timestamp": datetime.now().isoformat()
-    })
+    history = build_saving_history(account_number)
+    if history is None:
+        return create_error_response('477', f'No history found for account {account_number}')
+    
+    job = print_jobs.submit('history', documents.render_saving_history, account_number, history)
+    return print_job_response(job, accountNumber=account_number, historyUrl=f"/downloads/jobs/{job['jobId']}/result")
 
 @app.route('/accounts/saving/calculate/<customer_id>', methods=['GET'])
 def calculate_saving(customer_id):
@@ -1292,29 +2075,132 @@ def get_transfer_simulation(customer_id, source_account):
     if not source_account:
         return create_error_response('456', 'Account number is null')
     
-    # Get query parameters
-    target_iban = request.args.get('targetIBAN', '')
-    amount = request.args.get('amount', '0')
-    currency_code = request.args.get('currencyCode', 'EUR')
-    description = request.args.get('description', '')
-    payment_type = request.args.get('paymentType', 'normal')
-    period = request.args.get('period', 'oneOff')
+    try:
+        simulation = transfer_engine.simulate(
+            source_account,
+            request.args.get('targetIBAN', ''),
+            request.args.get('amount', '0'),
+            currency_code=request.args.get('currencyCode', 'EUR'),
+            description=request.args.get('description', ''),
+            payment_type=request.args.get('paymentType', 'normal'),
+            period=request.args.get('period', 'oneOff'),
+            payment_date=request.args.get('paymentDate'),
+            start_date=request.args.get('startDate'),
+            end_date=request.args.get('endDate'),
+            country_code=request.headers.get('countryCode', 'NL')
+        )
+    except SimulationError as e:
+        return create_error_response(e.code, e.description)
+    
+    return jsonify(simulation)
+
+@app.route('/transfers/payment/<customer_id>/<source_account>', methods=['POST'])
+@idempotent_post
+def create_payment(customer_id, source_account):
+    """New payment - maps to /transfers/payment/{customerId}/{sourceAccountNumber}"""
+    
+    # Validate required headers
+    header_valid, missing_headers = validate_required_headers()
+    if not header_valid:
+        return create_error_response('495', f"Missing required headers: {', '.join(missing_headers)}")
+    
+    # Validate customer ID
+    if not customer_id:
+        return create_error_response('453', 'Customer id is null')
+    
+    # Validate source account
+    if not source_account:
+        return create_error_response('456', 'Account number is null')
+    
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return create_error_response('470', 'Request body must be a JSON object')
+    payment_type = data.get('paymentType', 'normal')
+    period = data.get('period', 'oneOff')
+    country_code = request.headers.get('countryCode', 'NL')
+    try:
+        simulation = transfer_engine.simulate(
+            source_account,
+            data.get('targetIBAN', ''),
+            data.get('amount', 0),
+            currency_code=data.get('currencyCode', 'EUR'),
+            description=data.get('description', ''),
+            payment_type=payment_type,
+            period=period,
+            payment_date=data.get('paymentDate'),
+            start_date=data.get('startDate'),
+            end_date=data.get('endDate'),
+            country_code=country_code
+        )
+    except SimulationError as e:
+        return create_error_response(e.code, e.description)
+    
+    # Every payment goes through the scheduler; immediate ones are due on their execution date
+    rules = transfer_engine.rules(source_account)
+    target = find_account(simulation["targetIBAN"])
+    payment = payment_scheduler.schedule(
+        customer_id, rules["accountNumber"], simulation["targetIBAN"],
+        round(simulation["amount"] * 100),
+        simulation["startDate"] if period != 'oneOff' and data.get('startDate') else simulation["executionDate"],
+        period=period, end_date=simulation.get("endDate"), payment_type=payment_type,
+        currency_code=simulation["currencyCode"], description=simulation["description"],
+        source_iban=rules["IBAN"], target_account_number=target["accountNumber"] if target else None,
+        target_name=data.get('targetName'), country_code=country_code
+    )
+    if target is None:
+        register_payee(customer_id, simulation["targetIBAN"], data.get('targetName'))
     
-    # Mock response based on TransferSimulation schema
     return jsonify({
-        "simulationId": str(uuid.uuid4()),
-        "sourceAccount": source_account,
-        "targetIBAN": target_iban,
-        "amount": float(amount),
-        "currencyCode": currency_code,
-        "description": description,
-        "paymentType": payment_type,
-        "period": period,
-        "fees": 0.00,
-        "totalAmount": float(amount),
-        "estimatedDelivery": datetime.now().strftime("%Y-%m-%d"),
-        "status": "SIMULATED"
-    })
+        "success": True,
+        **payment,
+        "executionDate": simulation["executionDate"],
+        "estimatedDelivery": simulation["estimatedDelivery"],
+        "fees": simulation["fees"],
+        "timestamp": datetime.now().isoformat()
+    }), 201
+
+# Largest payment file accepted by the batch simulation endpoint
+MAX_BATCH_PAYMENTS = 100000
+
+@app.route('/transfers/payment/batch/<customer_id>', methods=['POST'])
+def simulate_payment_batch(customer_id):
+    """Simulate a batch of payments - streams one JSON line per payment, in input order"""
+    
+    # Validate required headers
+    header_valid, missing_headers = validate_required_headers()
+    if not header_valid:
+        return create_error_response('495', f"Missing required headers: {', '.join(missing_headers)}")
+    
+    # Validate customer ID
+    if not customer_id:
+        return create_error_response('453', 'Customer id is null')
+    
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return create_error_response('470', 'Request body must be a JSON object')
+    payments = data.get('payments')
+    if not isinstance(payments, list) or not payments:
+        return create_error_response('470', 'payments must be a non-empty list')
+    if len(payments) > MAX_BATCH_PAYMENTS:
+        return create_error_response('470', f'A batch holds at most {MAX_BATCH_PAYMENTS} payments')
+    
+    batch_id = uuid.uuid4().hex
+    results = transfer_engine.simulate_batch(payments, request.headers.get('countryCode', 'NL'), batch_id=batch_id)
+    
+    def generate():
+        encode = json.JSONEncoder(separators=(',', ':')).encode
+        lines = []
+        for result in results:
+            lines.append(encode(result))
+            if len(lines) == 1000:
+                lines.append('')
+                yield '\n'.join(lines)
+                lines = []
+        if lines:
+            lines.append('')
+            yield '\n'.join(lines)
+    
+    return Response(generate(), mimetype='application/x-ndjson', headers={'X-Batch-Id': batch_id})
 
 @app.route('/transfers/ownAccountTransfer/<customer_id>/<source_account>', methods=['GET'])
 def get_own_account_transfer(customer_id, source_account):
@@ -1333,6 +2219,22 @@ def get_own_account_transfer(customer_id, source_account):
     if not source_account:
         return create_error_response('456', 'Account number is null')
     
+    # Simulate the transfer when a target account is given
+    target_account = request.args.get('targetAccountNumber')
+    if target_account:
+        try:
+            simulation = transfer_engine.simulate_own_transfer(
+                source_account,
+                target_account,
+                request.args.get('amount', '0'),
+                currency_code=request.args.get('currencyCode', 'EUR'),
+                description=request.args.get('description', ''),
+                payment_date=request.args.get('paymentDate')
+            )
+        except SimulationError as e:
+            return create_error_response(e.code, e.description)
+        return jsonify(simulation)
+    
     # Mock response
     return jsonify({
         "customerId": customer_id,
@@ -1341,11 +2243,72 @@ def get_own_account_transfer(customer_id, source_account):
             {
                 "accountNumber": "2018470579",
                 "accountName": "DHB MaxiSpaar",
-                "iban": "NL24DHBN2018470579"
+                "iban": "NL17DHBN2018470579"
             }
         ]
     })
 
+@app.route('/transfers/ownAccountTransfer/<customer_id>/<source_account>', methods=['POST'])
+@idempotent_post
+def create_own_account_transfer(customer_id, source_account):
+    """Own account transfer - maps to /transfers/ownAccountTransfer/{customerId}/{sourceAccountNumber}"""
+    
+    # Validate required headers
+    header_valid, missing_headers = validate_required_headers()
+    if not header_valid:
+        return create_error_response('495', f"Missing required headers: {', '.join(missing_headers)}")
+    
+    # Validate customer ID
+    if not customer_id:
+        return create_error_response('453', 'Customer id is null')
+    
+    # Validate source account
+    if not source_account:
+        return create_error_response('456', 'Source account number is null')
+    
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return create_error_response('470', 'Request body must be a JSON object')
+    reference = data.get('reference') or f"OT{uuid.uuid4().hex[:12].upper()}"
+    try:
+        simulation = transfer_engine.simulate_own_transfer(
+            source_account,
+            data.get('targetAccountNumber'),
+            data.get('amount', 0),
+            currency_code=data.get('currencyCode', 'EUR'),
+            description=data.get('description', ''),
+            payment_date=data.get('paymentDate')
+        )
+        cents = round(simulation["amount"] * 100)
+        if simulation["paymentDate"] > datetime.now().date().isoformat():
+            # Dated transfers are booked by the scheduler on their payment date
+            payment_scheduler.schedule(
+                customer_id, simulation["sourceAccountNumber"], simulation["targetIBAN"], cents,
+                simulation["paymentDate"], payment_type='future', currency_code=simulation["currencyCode"],
+                description=simulation["description"], source_iban=simulation["sourceIBAN"],
+                target_account_number=simulation["targetAccountNumber"], transaction_type='ownTransfer',
+                country_code=request.headers.get('countryCode', 'NL'), reference=reference
+            )
+            message_key = 'ownTransfer.scheduled'
+        else:
+            # version pins the balance the client saw in its simulation, when given
+            transfer_engine.execute(
+                simulation["sourceAccountNumber"], simulation["targetAccountNumber"], cents,
+                simulation["description"], reference, simulation["paymentDate"],
+                expected_version=data.get('version')
+            )
+            message_key = 'ownTransfer.completed'
+    except SimulationError as e:
+        return create_error_response(e.code, e.description)
+    except ValueError as e:
+        return create_error_response('470', str(e))
+    
+    return jsonify({
+        "transactionNumber": uuid.uuid4().hex,
+        "reference": reference,
+        "messageKey": message_key
+    }), 201
+
 @app.route('/transfers/utilities/holidays', methods=['GET'])
 def get_holidays():
     """Get holidays - maps to /transfers/utilities/holidays"""
@@ -1355,18 +2318,21 @@ def get_holidays():
     if not header_valid:
         return create_error_response('495', f"Missing required headers: {', '.join(missing_headers)}")
     
-    # Mock response
+    try:
+        year = int(request.args.get('year', datetime.now().year))
+    except ValueError:
+        return create_error_response('470', 'year must be a number')
+    if not MINYEAR <= year <= MAXYEAR:
+        return create_error_response('470', f'year must be between {MINYEAR} and {MAXYEAR}')
+    
+    holidays = transfer_engine.calendar.holidays(year, request.headers.get('countryCode'))
     return jsonify([
         {
-            "date": "2025-01-01",
-            "description": "New Year's Day",
-            "isHoliday": True
-        },
-        {
-            "date": "2025-12-25",
-            "description": "Christmas Day",
+            "date": day.isoformat(),
+            "description": name,
             "isHoliday": True
         }
+        for day, name in holidays
     ])
 
 @app.route('/transfers/utilities/bankDate', methods=['GET'])
@@ -1378,10 +2344,14 @@ def get_bank_date():
     if not header_valid:
         return create_error_response('495', f"Missing required headers: {', '.join(missing_headers)}")
     
-    # Mock response
+    calendar = transfer_engine.calendar.country(request.headers.get('countryCode'))
+    today = datetime.now().date()
     return jsonify({
-        "bankDate": datetime.now().strftime("%Y-%m-%d"),
-        "isBusinessDay": True
+        "bankDate": calendar.next_business_day(today).isoformat(),
+        "isBusinessDay": calendar.is_business_day(today),
+        "previousBusinessDay": calendar.previous_business_day(today - timedelta(days=1)).isoformat(),
+        "nextBusinessDay": calendar.next_business_day(today + timedelta(days=1)).isoformat(),
+        "countryCode": calendar.country_code
     })
 
 @app.route('/transfers/payment/futurePayment/list/<customer_id>', methods=['GET'])
@@ -1397,18 +2367,7 @@ def get_future_payment_list(customer_id):
     if not customer_id:
         return create_error_response('453', 'Customer id is null')
     
-    # Mock response
-    return jsonify([
-        {
-            "paymentId": "PAY001",
-            "sourceAccount": "2018470578",
-            "targetIBAN": "NL24DHBN2018470579",
-            "amount": 500.00,
-            "description": "Monthly transfer",
-            "scheduledDate": "2025-02-01",
-            "status": "SCHEDULED"
-        }
-    ])
+    return jsonify(payment_scheduler.list(customer_id))
 
 @app.route('/transfers/payment/<customer_id>/<reference>', methods=['GET'])
 def get_payment_by_reference(customer_id, reference):
@@ -1432,11 +2391,36 @@ def get_payment_by_reference(customer_id, reference):
         "timestamp": datetime.now().isoformat()
     })
 
+@app.route('/transfers/payment/<customer_id>/<reference>', methods=['DELETE'])
+def delete_future_payment(customer_id, reference):
+    """Delete future payment - maps to /transfers/payment/{customerId}/{reference}"""
+    
+    # Validate required headers
+    header_valid, missing_headers = validate_required_headers()
+    if not header_valid:
+        return create_error_response('495', f"Missing required headers: {', '.join(missing_headers)}")
+    
+    # Validate customer ID
+    if not customer_id:
+        return create_error_response('453', 'Customer id is null')
+    
+    payment = payment_scheduler.cancel(customer_id, reference)
+    if payment is None:
+        return create_error_response('477', f'No scheduled payment found with reference: {reference}')
+    
+    return jsonify({
+        "success": True,
+        "reference": reference,
+        "status": payment["status"],
+        "timestamp": datetime.now().isoformat()
+    })
+
 # ============================================================================
 # VOP ENDPOINTS
 # ============================================================================
 
 @app.route('/vop/requestPayeeVerification', methods=['POST'])
+@idempotent_post
 def request_payee_verification():
     """Request payee verification - maps to /vop/requestPayeeVerification"""
     
@@ -1455,18 +2439,108 @@ def request_payee_verification():
         if not data.get('beneficiaryName'):
             return create_error_response('473', 'Invalid party name')
         
-        # Mock VOP response
+        try:
+            target_iban = validate_iban(data['targetIBAN'])
+        except InvalidIBANError as e:
+            return create_error_response('474', f'Invalid party account IBAN: {e}')
+        
+        # A given party agent BIC must belong to the bank of the IBAN
+        target_bic = derive_bic(target_iban)
+        party_bic = (data.get('partyAgentBIC') or '').upper()
+        if party_bic and target_bic and party_bic[:8] != target_bic[:8]:
+            return create_error_response('475', f'Invalid party agent BICFI: {party_bic}')
+        
+        result = payee_index.verify(target_iban, data['beneficiaryName'])
         return jsonify({
             "vopGuid": str(uuid.uuid4()),
-            "verificationStatus": "VERIFIED",
             "beneficiaryName": data.get('beneficiaryName'),
             "targetIBAN": data.get('targetIBAN'),
+            "targetBIC": target_bic,
             "verificationDate": datetime.now().isoformat() + "Z",
-            "confidence": "HIGH"
+            **result
         })
     except Exception as e:
         return create_error_response('500', f'System error occurred: {str(e)}')
 
+@app.route('/vop/cache/metrics', methods=['GET'])
+def get_vop_cache_metrics():
+    """VOP result cache hit/miss metrics"""
+    
+    # Validate required headers
+    header_valid, missing_headers = validate_required_headers()
+    if not header_valid:
+        return create_error_response('495', f"Missing required headers: {', '.join(missing_headers)}")
+    
+    return jsonify({
+        "success": True,
+        "data": payee_index.cache.metrics(),
+        "timestamp": datetime.now().isoformat()
+    })
+
+# Largest payee list accepted by the bulk VOP endpoint
+MAX_VOP_BATCH = 10000
+
+@app.route('/vop/requestPayeeVerification/batch', methods=['POST'])
+def request_payee_verification_batch():
+    """Bulk payee verification - streams one JSON line per payee, in input order"""
+    
+    # Validate required headers
+    header_valid, missing_headers = validate_required_headers()
+    if not header_valid:
+        return create_error_response('495', f"Missing required headers: {', '.join(missing_headers)}")
+    
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return create_error_response('470', 'Request body must be a JSON object')
+    payees = data.get('payees')
+    if not isinstance(payees, list) or not payees:
+        return create_error_response('470', 'payees must be a non-empty list')
+    if len(payees) > MAX_VOP_BATCH:
+        return create_error_response('470', f'A batch holds at most {MAX_VOP_BATCH} payees')
+    
+    # Invalid lines are answered without matching
+    errors = {}
+    pairs = []
+    checked = validate_ibans([payee.get('targetIBAN') if isinstance(payee, dict) else None for payee in payees])
+    for index, (payee, (target_iban, iban_error)) in enumerate(zip(payees, checked)):
+        if iban_error:
+            errors[index] = {"code": "474", "message": f"Invalid party account IBAN: {iban_error}"}
+        elif not isinstance(payee.get('beneficiaryName'), str) or not payee['beneficiaryName']:
+            errors[index] = {"code": "473", "message": "Invalid party name"}
+        else:
+            pairs.append((target_iban, payee['beneficiaryName']))
+    
+    batch_id = uuid.uuid4().hex
+    verification_date = datetime.now().isoformat() + "Z"
+    results = verify_batch(payee_index, pairs, vop_executor)
+    
+    def generate():
+        encode = json.JSONEncoder(separators=(',', ':')).encode
+        lines = []
+        for index, payee in enumerate(payees):
+            error = errors.get(index)
+            if error is not None:
+                line = {"index": index, "verificationStatus": "REJECTED", "error": error}
+            else:
+                line = {
+                    "index": index,
+                    "requestGuid": f"{batch_id}-{index}",
+                    "targetIBAN": payee['targetIBAN'],
+                    "beneficiaryName": payee['beneficiaryName'],
+                    "verificationDate": verification_date,
+                    **next(results)
+                }
+            lines.append(encode(line))
+            if len(lines) == 1000:
+                lines.append('')
+                yield '\n'.join(lines)
+                lines = []
+        if lines:
+            lines.append('')
+            yield '\n'.join(lines)
+    
+    return Response(generate(), mimetype='application/x-ndjson', headers={'X-Batch-Id': batch_id})
+
 # ============================================================================
 # LEGACY ENDPOINTS - FOR BACKWARD COMPATIBILITY
 # ============================================================================
@@ -1490,7 +2564,7 @@ def legacy_get_combispaar():
                 "type": "combispaar",
                 "balance": 15000.00,
                 "currency": "EUR",
-                "iban": "NL24DHBN2018470580",
+                "iban": "NL87DHBN2018470580",
                 "interest_rate": 1.1,
                 "holder_name": "Lucy Lavender"
             }
@@ -1515,7 +2589,7 @@ def legacy_get_combispaar_page_data():
         "data": {
             "accountName": "DHB SaveOnline",
             "balance": "€ 10.566,55",
-            "iban": "NL24DHBN2018470578",
+            "iban": "NL44DHBN2018470578",
             "interestRate": 1.1,
             "title": "Save and still be able to withdraw money",
             "description": "The DHB CombiSpaarrekening offers a higher interest rate than the DHB SaveOnline because withdrawals are planned in advance. Depending on the chosen account, you can give 33, 66, or 99 days' notice for withdrawals. A longer notice period results in a higher interest rate."
@@ -1579,18 +2653,34 @@ def legacy_get_combispaar_iban_options():
     if not header_valid:
         return create_error_response('495', f"Missing required headers: {', '.join(missing_headers)}")
     
+    # Type-ahead over the demo customer's own accounts
+    search = request.args.get('search')
+    if search:
+        limit = min(max(request.args.get('limit', 10, type=int), 1), MAX_SEARCH_RESULTS)
+        matches = [match for match in customer_search(DEMO_CUSTOMER_ID).search(search_query(search), limit) if "detail" in match]
+        return jsonify({
+            "success": True,
+            "data": [{
+                "iban": match["IBAN"],
+                "accountName": match["accountName"],
+                "balance": format_euro(match["detail"]["balance"]),
+                "holderName": match["detail"]["holderName"]
+            } for match in matches],
+            "timestamp": datetime.now().isoformat()
+        })
+    
     # Mock response
     return jsonify({
         "success": True,
         "data": [
             {
-                "iban": "NL24DHBN2018470578",
+                "iban": "NL44DHBN2018470578",
                 "accountName": "DHB SaveOnline",
                 "balance": "€ 10.566,55",
                 "holderName": "Lucy Lavender"
             },
             {
-                "iban": "NL24DHBN2018470579",
+                "iban": "NL17DHBN2018470579",
                 "accountName": "DHB MaxiSpaar",
                 "balance": "€ 31.960,23",
                 "holderName": "Lucy Lavender"
@@ -1671,7 +2761,7 @@ def legacy_get_dashboard():
                     "type": "savings",
                     "balance": 10566.55,
                     "currency": "EUR",
-                    "iban": "NL24DHBN2018470578",
+                    "iban": "NL44DHBN2018470578",
                     "interest_rate": 1.1,
                     "holder_name": "Lucy Lavender"
                 },
@@ -1681,7 +2771,7 @@ def legacy_get_dashboard():
                     "type": "savings",
                     "balance": 31960.23,
                     "currency": "EUR",
-                    "iban": "NL24DHBN2018470579",
+                    "iban": "NL17DHBN2018470579",
                     "interest_rate": 1.1,
                     "holder_name": "Lucy Lavender"
                 }
@@ -1694,7 +2784,7 @@ def legacy_get_dashboard():
                         "type": "combispaar",
                         "balance": 15000.00,
                         "currency": "EUR",
-                        "iban": "NL24DHBN2018470580",
+                        "iban": "NL87DHBN2018470580",
                         "interest_rate": 1.1,
                         "holder_name": "Lucy Lavender"
                     }
@@ -1743,7 +2833,7 @@ def legacy_get_maxispaar_page_data():
         "data": {
             "accountName": "DHB MaxiSpaar",
             "balance": "€ 31.960,23",
-            "iban": "NL24DHBN2018470579",
+            "iban": "NL17DHBN2018470579",
             "interest_rate": 1.1,
             "title": "MaxiSpaar Account",
             "description": "High-yield savings account with flexible terms",
@@ -1828,9 +2918,7 @@ def legacy_update_password():
         new_password = data.get('password')
         
         if new_password:
-            global current_password
-            current_password = new_password
-            save_current_password(new_password)
+            credential_store.set_password(request.headers.get('customerId', DEMO_CUSTOMER_ID), new_password)
             
             return jsonify({
                 "success": True,
@@ -1847,6 +2935,8 @@ def legacy_update_password():
             })
         else:
             return create_error_response('470', 'Password is required')
+    except CredentialsBusyError:
+        return create_error_response('503', 'Too many password checks in progress, retry shortly')
     except Exception as e:
         return create_error_response('500', f'System error occurred: {str(e)}')
 
@@ -1862,8 +2952,10 @@ def legacy_validate_password():
     try:
         data = request.get_json()
         provided_password = data.get('password')
+        customer_id = request.headers.get('customerId', DEMO_CUSTOMER_ID)
         
-        if provided_password == current_password:
+        # Repeated checks within a session are answered from the credential cache
+        if credential_store.verify(customer_id, provided_password, request.headers.get('sessionId')):
             return jsonify({
                 "success": True,
                 "valid": True,
@@ -1877,6 +2969,8 @@ def legacy_validate_password():
                 "message": "Password is incorrect",
                 "timestamp": datetime.now().isoformat()
             })
+    except CredentialsBusyError:
+        return create_error_response('503', 'Too many password checks in progress, retry shortly')
     except Exception as e:
         return create_error_response('500', f'System error occurred: {str(e)}')
 
@@ -1995,4 +3089,7 @@ def legacy_download_document():
     )
 
 if __name__ == '__main__':
+    # Compute last year's overviews on first start
+    if annual_overviews.computed_at(datetime.now().year - 1) is None:
+        year_end_batch.start(datetime.now().year - 1, customer_account_numbers())
     app.run(debug=True, host='0.0.0.0', port=5003)